@@ -17,7 +17,7 @@ config = context.config
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -54,6 +54,7 @@ def run_migrations_offline():
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
+        render_as_batch=settings.is_sqlite,
     )
 
     with context.begin_transaction():
@@ -61,8 +62,16 @@ def run_migrations_offline():
 
 
 def do_run_migrations(connection):
+    # One transaction per migration lets the helpers in
+    # app.core.online_migrations step outside it (e.g. CREATE INDEX
+    # CONCURRENTLY) without committing other migrations' work halfway
     context.configure(
-        connection=connection, target_metadata=target_metadata, compare_type=True
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=True,
+        transaction_per_migration=True,
+        # SQLite can't ALTER most things; autogenerate batch (copy-and-move) ops
+        render_as_batch=connection.dialect.name == "sqlite",
     )
 
     with context.begin_transaction():
@@ -78,9 +87,23 @@ async def run_migrations_online():
     """
     configuration = config.get_section(config.config_ini_section)
     configuration["sqlalchemy.url"] = get_url()
+    if settings.is_sqlite:
+        # Wait for the app's writer rather than failing with "database is locked"
+        connect_args = {"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+    else:
+        connect_args = {
+            "server_settings": {
+                "lock_timeout": settings.MIGRATION_LOCK_TIMEOUT,
+                "statement_timeout": settings.MIGRATION_STATEMENT_TIMEOUT,
+            }
+        }
     connectable = AsyncEngine(
         engine_from_config(
-            configuration, prefix="sqlalchemy.", poolclass=pool.NullPool, future=True
+            configuration,
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+            future=True,
+            connect_args=connect_args,
         )
     )
 
@@ -0,0 +1,33 @@
+"""Add email directory
+
+Revision ID: 3b9d7e41c2a6
+Revises: d82931760c84
+Create Date: 2026-10-19 10:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d7e41c2a6'
+down_revision: Union[str, Sequence[str], None] = 'd82931760c84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'email_directory',
+        sa.Column('email_normalized', sa.String(length=255), nullable=False),
+        sa.Column('username_normalized', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('email_normalized'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('email_directory')
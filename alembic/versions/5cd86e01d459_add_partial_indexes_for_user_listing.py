@@ -0,0 +1,53 @@
+"""Add partial indexes for keyset-paginated user listing
+
+Revision ID: 5cd86e01d459
+Revises: e1ff5b3aa2a0
+Create Date: 2026-10-18 11:03:27.519882
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5cd86e01d459'
+down_revision: Union[str, Sequence[str], None] = 'e1ff5b3aa2a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_users_active_id',
+        'users',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('is_active'),
+        sqlite_where=sa.text('is_active'),
+    )
+    op.create_index(
+        'ix_users_active_username',
+        'users',
+        ['username'],
+        unique=False,
+        postgresql_where=sa.text('is_active'),
+        sqlite_where=sa.text('is_active'),
+    )
+    op.create_index(
+        'ix_users_superuser_id',
+        'users',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('is_superuser'),
+        sqlite_where=sa.text('is_superuser'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_superuser_id', table_name='users')
+    op.drop_index('ix_users_active_username', table_name='users')
+    op.drop_index('ix_users_active_id', table_name='users')
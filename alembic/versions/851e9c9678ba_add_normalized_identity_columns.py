@@ -0,0 +1,144 @@
+"""Add normalized username/email lookup columns
+
+Revision ID: 851e9c9678ba
+Revises: 5cd86e01d459
+Create Date: 2026-10-18 13:27:55.880213
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision: str = '851e9c9678ba'
+down_revision: Union[str, Sequence[str], None] = '5cd86e01d459'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.Integer),
+    sa.column('username', sa.String),
+    sa.column('email', sa.String),
+    sa.column('username_normalized', sa.String),
+    sa.column('email_normalized', sa.String),
+)
+
+
+def normalize(value: str) -> str:
+    """Frozen copy of app.models.user.normalize_identity at this revision."""
+    return value.lower()
+
+
+def backfill() -> None:
+    """Fill the normalized columns in batches, committing after each one.
+
+    Only rows that are still NULL are selected, so an interrupted run
+    resumes where it stopped.
+    """
+    if context.is_offline_mode():
+        op.execute(
+            users.update()
+            .where(users.c.username_normalized.is_(None))
+            .values(
+                username_normalized=sa.func.lower(users.c.username),
+                email_normalized=sa.func.lower(users.c.email),
+            )
+        )
+        return
+
+    bind = op.get_bind()
+    pending = (
+        sa.select(users.c.id, users.c.username, users.c.email)
+        .where(users.c.username_normalized.is_(None))
+        .order_by(users.c.id)
+        .limit(BATCH_SIZE)
+    )
+    update = (
+        users.update()
+        .where(users.c.id == sa.bindparam('row_id'))
+        .values(
+            username_normalized=sa.bindparam('row_username'),
+            email_normalized=sa.bindparam('row_email'),
+        )
+    )
+    with context.get_context().autocommit_block():
+        while rows := bind.execute(pending).all():
+            bind.execute(
+                update,
+                [
+                    {
+                        'row_id': row.id,
+                        'row_username': normalize(row.username),
+                        'row_email': normalize(row.email),
+                    }
+                    for row in rows
+                ],
+            )
+
+
+def check_collisions() -> None:
+    """Fail with a readable message if existing rows differ only by case."""
+    if context.is_offline_mode():
+        return
+
+    bind = op.get_bind()
+    for column in ('username_normalized', 'email_normalized'):
+        duplicates = bind.execute(
+            sa.select(users.c[column])
+            .group_by(users.c[column])
+            .having(sa.func.count() > 1)
+            .limit(10)
+        ).scalars().all()
+        if duplicates:
+            raise RuntimeError(
+                f"Cannot add a unique index on users.{column}; these values are "
+                f"shared by several accounts and must be resolved first: "
+                f"{', '.join(duplicates)}"
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The backfill commits as it goes, so a re-run may find the columns in place
+    existing = set()
+    if not context.is_offline_mode():
+        existing = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('users')}
+    if 'username_normalized' not in existing:
+        op.add_column(
+            'users',
+            sa.Column('username_normalized', sa.String(length=50), nullable=True),
+        )
+    if 'email_normalized' not in existing:
+        op.add_column(
+            'users', sa.Column('email_normalized', sa.String(length=255), nullable=True)
+        )
+
+    backfill()
+    check_collisions()
+
+    op.create_index(
+        op.f('ix_users_username_normalized'),
+        'users',
+        ['username_normalized'],
+        unique=True,
+    )
+    op.create_index(
+        op.f('ix_users_email_normalized'), 'users', ['email_normalized'], unique=True
+    )
+    # Batch mode rebuilds the table on SQLite, which can't alter columns
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('username_normalized', nullable=False)
+        batch_op.alter_column('email_normalized', nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_email_normalized'), table_name='users')
+    op.drop_index(op.f('ix_users_username_normalized'), table_name='users')
+    op.drop_column('users', 'email_normalized')
+    op.drop_column('users', 'username_normalized')
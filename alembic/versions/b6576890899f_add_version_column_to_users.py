@@ -0,0 +1,77 @@
+"""Add version column to users
+
+Revision ID: b6576890899f
+Revises: 851e9c9678ba
+Create Date: 2026-10-18 23:22:57.707418
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6576890899f'
+down_revision: Union[str, Sequence[str], None] = '851e9c9678ba'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.models.user.USER_VERSION_FUNCTION/TRIGGER at this revision,
+# and of SQLITE_USER_VERSION_TRIGGER for SQLite databases
+BUMP_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION users_bump_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+BUMP_VERSION_TRIGGER = """
+CREATE TRIGGER users_bump_version
+BEFORE UPDATE ON users
+FOR EACH ROW WHEN (
+    (OLD.username, OLD.email, OLD.full_name, OLD.is_active, OLD.is_superuser)
+    IS DISTINCT FROM
+    (NEW.username, NEW.email, NEW.full_name, NEW.is_active, NEW.is_superuser)
+)
+EXECUTE FUNCTION users_bump_version()
+"""
+SQLITE_BUMP_VERSION_TRIGGER = """
+CREATE TRIGGER users_bump_version
+AFTER UPDATE ON users
+FOR EACH ROW WHEN NEW.version = OLD.version AND (
+    NEW.username IS NOT OLD.username
+    OR NEW.email IS NOT OLD.email
+    OR NEW.full_name IS NOT OLD.full_name
+    OR NEW.is_active IS NOT OLD.is_active
+    OR NEW.is_superuser IS NOT OLD.is_superuser
+)
+BEGIN
+    UPDATE users SET version = OLD.version + 1 WHERE id = NEW.id;
+END
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant server default keeps this a metadata-only change on Postgres 11+
+    op.add_column(
+        'users',
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    )
+    if op.get_context().dialect.name == 'sqlite':
+        op.execute(SQLITE_BUMP_VERSION_TRIGGER)
+        return
+    op.execute(BUMP_VERSION_FUNCTION)
+    op.execute(BUMP_VERSION_TRIGGER)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS users_bump_version')
+    else:
+        op.execute('DROP TRIGGER IF EXISTS users_bump_version ON users')
+        op.execute('DROP FUNCTION IF EXISTS users_bump_version()')
+    op.drop_column('users', 'version')
@@ -0,0 +1,45 @@
+"""Add token sessions
+
+Revision ID: d82931760c84
+Revises: fc4562b3b09f
+Create Date: 2026-10-18 23:50:28.676819
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd82931760c84'
+down_revision: Union[str, Sequence[str], None] = 'fc4562b3b09f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'token_sessions',
+        sa.Column('id', sa.String(length=64), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('token_type', sa.String(length=16), nullable=False),
+        sa.Column('jti', sa.String(length=32), nullable=False),
+        sa.Column('epoch', sa.Integer(), nullable=False),
+        sa.Column('issued_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        op.f('ix_token_sessions_expires_at'),
+        'token_sessions',
+        ['expires_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_token_sessions_expires_at'), table_name='token_sessions')
+    op.drop_table('token_sessions')
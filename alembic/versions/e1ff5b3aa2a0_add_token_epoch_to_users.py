@@ -0,0 +1,32 @@
+"""Add token_epoch to users
+
+Revision ID: e1ff5b3aa2a0
+Revises: 53445a221ad4
+Create Date: 2026-10-18 09:12:41.204511
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1ff5b3aa2a0'
+down_revision: Union[str, Sequence[str], None] = '53445a221ad4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant server default keeps this a metadata-only change on Postgres 11+
+    op.add_column(
+        'users',
+        sa.Column('token_epoch', sa.Integer(), server_default='0', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_epoch')
@@ -0,0 +1,55 @@
+"""Add login events and last_login_at
+
+Revision ID: fc4562b3b09f
+Revises: b6576890899f
+Create Date: 2026-10-18 23:28:28.671063
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'fc4562b3b09f'
+down_revision: Union[str, Sequence[str], None] = 'b6576890899f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'login_events',
+        sa.Column(
+            'id',
+            sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+            nullable=False,
+        ),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('user_agent', sa.String(length=255), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_login_events_user_id_occurred_at',
+        'login_events',
+        ['user_id', 'occurred_at'],
+        unique=False,
+    )
+    # Nullable without a default: a metadata-only change
+    op.add_column(
+        'users', sa.Column('last_login_at', sa.DateTime(timezone=True), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'last_login_at')
+    op.drop_index('ix_login_events_user_id_occurred_at', table_name='login_events')
+    op.drop_table('login_events')
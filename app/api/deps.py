@@ -2,32 +2,65 @@
 
 from __future__ import annotations
 
-from typing import Annotated
+from typing import Annotated, AsyncGenerator
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_session
-from app.core.security import convert_user_in_db_to_user, get_token_service, get_user
-from app.schemas.user import User
+from app.core.config import settings
+from app.core.database import get_session, get_session_router
+from app.core.etag import conditional_headers, etag_matches, user_etag
+from app.core.export import SessionOpener
+from app.core.logging import bind_request_context
+from app.core.security import (
+    TokenType,
+    convert_user_in_db_to_user,
+    get_user,
+    get_user_versions,
+    is_token_epoch_current,
+)
+from app.core.sessions import get_token_provider
+from app.core.tracing import traced
+from app.schemas.user import User, UserInDB
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/token")
 
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
+async def get_read_session(
     session: Annotated[AsyncSession, Depends(get_session)],
-) -> User:
-    """Get the current user from the JWT token."""
+) -> AsyncGenerator[AsyncSession, None]:
+    """Get a session for read-only lookups, routed to a replica when possible."""
+    router = get_session_router()
+    if not router.has_replicas:
+        yield session
+        return
+
+    async with router.read_session() as read_session:
+        yield read_session
+
+
+def get_read_session_opener() -> SessionOpener:
+    """Get a way to open read sessions outside the request's dependencies.
+
+    For work that outlives the request's dependencies, like streamed bodies.
+    """
+    return get_session_router().read_session
+
+
+@traced("get_current_user")
+async def get_current_user_in_db(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+) -> UserInDB:
+    """Get the current user, as stored in the database, from the bearer token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token_service = get_token_service()
-    payload = token_service.decode_access_token(token)
+    payload = await get_token_provider().resolve_token(token, TokenType.ACCESS)
     if payload is None:
         raise credentials_exception
 
@@ -39,11 +72,54 @@ async def get_current_user(
     if user is None:
         raise credentials_exception
 
+    # The epoch may have been bumped by another worker since the token was decoded
+    if not is_token_epoch_current(payload, user.token_epoch):
+        raise credentials_exception
+
     if user.disabled:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
         )
 
+    bind_request_context(user=user.username)
+    return user
+
+
+async def check_current_user_not_modified(
+    request: Request, token: Annotated[str, Depends(oauth2_scheme)]
+) -> None:
+    """Answer a conditional GET of the current user with 304, from memory.
+
+    When the token is valid and the user's row version was seen within
+    ``USER_VERSION_CACHE_SECONDS``, a matching If-None-Match is answered
+    without touching the database. Anything else falls through to the
+    regular, database-backed dependencies.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return
+
+    payload = await get_token_provider().resolve_token(token, TokenType.ACCESS)
+    username = payload.get("sub") if payload is not None else None
+    if not isinstance(username, str):
+        return
+
+    version = get_user_versions().get(username, settings.USER_VERSION_CACHE_SECONDS)
+    if version is None:
+        return
+
+    etag = user_etag(username, version)
+    if etag_matches(if_none_match, etag):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=conditional_headers(etag),
+        )
+
+
+async def get_current_user(
+    user: Annotated[UserInDB, Depends(get_current_user_in_db)],
+) -> User:
+    """Get the current user from the JWT token."""
     return convert_user_in_db_to_user(user)
 
 
@@ -54,3 +130,15 @@ async def get_current_active_user(
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+
+async def get_current_superuser(
+    user: Annotated[UserInDB, Depends(get_current_user_in_db)],
+) -> UserInDB:
+    """Get the current user, requiring superuser privileges."""
+    if not user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges",
+        )
+    return user
@@ -1,11 +1,18 @@
 """FastAPI exception handlers."""
 
+import logging
+
 from fastapi import Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
+from app.core.config import settings
+from app.core.database import is_database_unavailable
 from app.core.security import OAuth2Error
 
+logger = logging.getLogger(__name__)
+
 
 async def oauth2_exception_handler(request: Request, exc: OAuth2Error) -> JSONResponse:
     """Handle OAuth2Error exceptions with proper OAuth2 error format."""
@@ -29,4 +36,28 @@ async def validation_exception_handler(
             },
         )
     # For other endpoints, return default validation error
-    return JSONResponse(status_code=422, content={"detail": exc.errors()})
+    return JSONResponse(
+        status_code=422, content={"detail": jsonable_encoder(exc.errors())}
+    )
+
+
+async def database_unavailable_handler(
+    request: Request, exc: Exception
+) -> JSONResponse:
+    """Report an unreachable or unresponsive database as a retryable 503.
+
+    Other database errors (constraint violations, bad SQL...) are bugs, not
+    outages: they are logged and answered with a plain 500.
+    """
+    if not is_database_unavailable(exc):
+        logger.error(
+            f"Unhandled database error: {type(exc).__name__}: {exc}", exc_info=exc
+        )
+        return JSONResponse(
+            status_code=500, content={"detail": "Internal Server Error"}
+        )
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database unavailable, please retry later"},
+        headers={"Retry-After": str(settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS)},
+    )
@@ -1,9 +1,9 @@
 import asyncio
-import socket
 
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import Response
 from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_session
@@ -15,9 +15,15 @@ router = APIRouter(prefix="/health", tags=["health"])
 async def health_check(
     request: Request, session: AsyncSession = Depends(get_session)
 ) -> Response:
-    """Simple health check with database connectivity test."""
+    """Simple health check with database connectivity test.
+
+    Fails after a second without an answer, though asyncpg may then spend up
+    to DATABASE_COMMAND_TIMEOUT_SECONDS trying to cancel the query.
+    """
     try:
         await asyncio.wait_for(session.execute(text("SELECT 1")), timeout=1)
-    except (asyncio.TimeoutError, socket.gaierror):
+    except (OSError, SQLAlchemyError):
+        # Don't hold the probe up with a rollback over a dead connection
+        await session.invalidate()
         return Response(status_code=503)
     return Response(status_code=204)
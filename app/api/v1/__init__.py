@@ -2,7 +2,11 @@
 
 from fastapi import APIRouter
 
+from app.api.v1.admin import router as admin_router
 from app.api.v1.auth import router as auth_router
+from app.api.v1.users import router as users_router
 
 router = APIRouter()
 router.include_router(auth_router)
+router.include_router(users_router)
+router.include_router(admin_router)
@@ -0,0 +1,181 @@
+"""Administrative endpoints (superuser only)."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import (
+    get_current_superuser,
+    get_read_session,
+    get_read_session_opener,
+)
+from app.core.export import MEDIA_TYPES, ExportFormat, SessionOpener, stream_export
+from app.core.memory import (
+    MemoryProfilingOffError,
+    StatGrouping,
+    get_memory_profiler,
+    memory_report,
+)
+from app.core.pagination import (
+    UserOrder,
+    decode_cursor,
+    estimate_user_count,
+    list_users_page,
+)
+from app.core.profiling import ProfilerBusyError, profile_process
+from app.schemas.memory import MemoryDiff, MemorySnapshot, MemoryStructures
+from app.schemas.user import UserListItem, UserPage
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(get_current_superuser)],
+)
+
+
+@router.get("/users/export")
+async def export_users(
+    open_session: Annotated[SessionOpener, Depends(get_read_session_opener)],
+    export_format: Annotated[ExportFormat, Query(alias="format")] = "ndjson",
+    fetch_size: Annotated[int, Query(ge=1, le=50_000)] = 1000,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """Stream the users table as NDJSON or CSV with chunked transfer."""
+    filename = f"users.{export_format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        stream_export(open_session, export_format, fetch_size, compress=gzip),
+        media_type=MEDIA_TYPES[export_format],
+        headers=headers,
+    )
+
+
+@router.get("/users", response_model=UserPage)
+async def list_users(
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    order_by: UserOrder = "id",
+    limit: Annotated[int, Query(ge=1, le=100)] = 50,
+    cursor: str | None = None,
+    is_active: bool | None = None,
+    is_superuser: bool | None = None,
+) -> UserPage:
+    """List users with keyset pagination and an estimated total."""
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, order_by)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+            ) from e
+
+    users, next_cursor = await list_users_page(
+        session,
+        order_by=order_by,
+        limit=limit,
+        after=after,
+        is_active=is_active,
+        is_superuser=is_superuser,
+    )
+    estimated_total = await estimate_user_count(
+        session, is_active=is_active, is_superuser=is_superuser
+    )
+
+    return UserPage(
+        items=[UserListItem.model_validate(user) for user in users],
+        next_cursor=next_cursor,
+        estimated_total=estimated_total,
+    )
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_cpu(
+    seconds: Annotated[float, Query(gt=0, le=60)] = 5.0,
+    interval_ms: Annotated[float, Query(ge=1, le=1000)] = 10.0,
+    threads: Literal["all", "loop"] = "all",
+    route: str | None = None,
+) -> PlainTextResponse:
+    """Sample the process's stacks for a while and return collapsed stacks.
+
+    ``threads=loop`` samples only the event loop thread; ``route`` keeps
+    only event loop samples taken while serving that route (template or
+    path, e.g. ``/api/v1/token``). The output feeds straight into
+    flamegraph tools.
+    """
+    loop_thread_id = threading.get_ident()
+    try:
+        profiler = await asyncio.to_thread(
+            profile_process,
+            seconds,
+            interval=interval_ms / 1000,
+            thread_ids=[loop_thread_id] if threads == "loop" else None,
+            route=route,
+            loop=asyncio.get_running_loop(),
+            loop_thread_id=loop_thread_id,
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"X-Profile-Samples": str(profiler.samples)},
+    )
+
+
+@router.post(
+    "/memory/snapshots",
+    response_model=MemorySnapshot,
+    status_code=status.HTTP_201_CREATED,
+)
+async def take_memory_snapshot(
+    group_by: StatGrouping = "lineno",
+    limit: Annotated[int, Query(ge=1, le=500)] = 25,
+) -> MemorySnapshot:
+    """Snapshot the traced allocations and list the largest allocation sites.
+
+    Needs MEMORY_PROFILING_ENABLED. The latest snapshots are kept, to be
+    diffed against later ones by id.
+    """
+    try:
+        return await asyncio.to_thread(get_memory_profiler().snapshot, group_by, limit)
+    except MemoryProfilingOffError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+
+
+@router.get("/memory/snapshots/{base_id}/diff", response_model=MemoryDiff)
+async def diff_memory_snapshots(
+    base_id: int,
+    target: int | None = None,
+    group_by: StatGrouping = "lineno",
+    limit: Annotated[int, Query(ge=1, le=500)] = 25,
+) -> MemoryDiff:
+    """Show what grew since a snapshot, up to ``target`` or a new snapshot."""
+    try:
+        return await asyncio.to_thread(
+            get_memory_profiler().diff, base_id, target, group_by, limit
+        )
+    except KeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Snapshot {e.args[0]} not found",
+        ) from e
+    except MemoryProfilingOffError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+
+
+@router.get("/memory/structures", response_model=MemoryStructures)
+async def memory_structures(request: Request) -> MemoryStructures:
+    """Report the size of the in-process structures that grow with traffic.
+
+    Works with memory profiling off, as it walks the structures themselves.
+    """
+    return await asyncio.to_thread(memory_report, request.app.state.limiter)
@@ -5,25 +5,44 @@ from __future__ import annotations
 from datetime import timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
+from app.api.deps import (
+    check_current_user_not_modified,
+    get_current_superuser,
+    get_current_user,
+    get_current_user_in_db,
+    get_read_session,
+)
 from app.core.config import settings
 from app.core.database import get_session
+from app.core.etag import conditional_headers, etag_matches, user_etag
+from app.core.login_events import LoginEventWriter, get_login_event_writer
 from app.core.security import (
     OAuth2Error,
+    TokenType,
     authenticate_user,
     convert_user_in_db_to_user,
     create_user,
-    get_token_blacklist,
-    get_token_service,
     get_user,
+    get_users_by_usernames,
+    is_token_epoch_current,
+    revoke_user_tokens,
     user_exists,
 )
-from app.schemas.token import AccessTokenResponse, RefreshTokenRequest, Token
-from app.schemas.user import User, UserCreate
+from app.core.sessions import get_token_provider
+from app.models import normalize_identity
+from app.schemas.token import (
+    AccessTokenResponse,
+    IntrospectionRequest,
+    IntrospectionResponse,
+    RefreshTokenRequest,
+    Token,
+    TokenIntrospection,
+)
+from app.schemas.user import User, UserCreate, UserInDB
 
 router = APIRouter()
 
@@ -63,11 +82,22 @@ async def register_user(
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Annotated[AsyncSession, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    login_events: Annotated[LoginEventWriter, Depends(get_login_event_writer)],
 ) -> Token:
     """Login endpoint that returns access and refresh tokens."""
     user = await authenticate_user(session, form_data.username, form_data.password)
+
+    # Buffered only; written out in batches off the request path
+    await login_events.record(
+        user.username if user else form_data.username,
+        success=user is not None,
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent"),
+    )
+
     if not user:
         raise OAuth2Error(
             error="invalid_grant",
@@ -75,17 +105,17 @@ async def login_for_access_token(
             status_code=status.HTTP_401_UNAUTHORIZED,
         )
 
-    token_service = get_token_service()
+    token_provider = get_token_provider()
 
     # Create both tokens
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = token_service.create_access_token(
-        user=user, expires_delta=access_token_expires
+    access_token = await token_provider.issue_token(
+        user, TokenType.ACCESS, access_token_expires
     )
 
     refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    refresh_token = token_service.create_refresh_token(
-        user=user, expires_delta=refresh_token_expires
+    refresh_token = await token_provider.issue_token(
+        user, TokenType.REFRESH, refresh_token_expires
     )
 
     return Token(
@@ -99,14 +129,16 @@ async def login_for_access_token(
 @router.post("/refresh", response_model=AccessTokenResponse)
 async def refresh_access_token(
     refresh_request: RefreshTokenRequest,
-    session: Annotated[AsyncSession, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_read_session)],
 ) -> AccessTokenResponse:
     """Use refresh token to get a new access token."""
 
-    token_service = get_token_service()
+    token_provider = get_token_provider()
 
     # Decode and validate refresh token
-    payload = token_service.decode_refresh_token(refresh_request.refresh_token)
+    payload = await token_provider.resolve_token(
+        refresh_request.refresh_token, TokenType.REFRESH
+    )
     if payload is None:
         raise OAuth2Error(
             error="invalid_grant",
@@ -124,7 +156,7 @@ async def refresh_access_token(
 
     # Get user from database
     user = await get_user(session, username)
-    if user is None:
+    if user is None or not is_token_epoch_current(payload, user.token_epoch):
         raise OAuth2Error(
             error="invalid_grant",
             error_description="Invalid refresh token",
@@ -138,8 +170,8 @@ async def refresh_access_token(
 
     # Create new access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = token_service.create_access_token(
-        user=convert_user_in_db_to_user(user), expires_delta=access_token_expires
+    access_token = await token_provider.issue_token(
+        convert_user_in_db_to_user(user), TokenType.ACCESS, access_token_expires
     )
 
     return AccessTokenResponse(
@@ -155,20 +187,100 @@ async def logout(
     current_user: Annotated[User, Depends(get_current_user)],
 ) -> dict[str, str]:
     """Logout the current user by invalidating their token."""
-    # Extract JTI from token and blacklist it
-    token_service = get_token_service()
-    payload = token_service.decode_access_token(token)
-
-    if payload and payload.get("jti"):
-        blacklist = get_token_blacklist()
-        blacklist.blacklist_token(payload["jti"])
+    # Blacklists a JWT's JTI, or deletes an opaque token's session
+    await get_token_provider().revoke_token(token)
 
     return {"message": "Successfully logged out"}
 
 
-@router.get("/users/me", response_model=User)
-async def read_users_me(
+@router.post("/logout/all", status_code=status.HTTP_200_OK)
+async def logout_everywhere(
     current_user: Annotated[User, Depends(get_current_user)],
-) -> User:
-    """Get current user profile."""
-    return current_user
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> dict[str, str]:
+    """Logout the current user everywhere by revoking all of their tokens."""
+    await revoke_user_tokens(session, current_user.username)
+
+    return {"message": "Successfully logged out of all sessions"}
+
+
+@router.post(
+    "/introspect",
+    response_model=IntrospectionResponse,
+    dependencies=[Depends(get_current_superuser)],
+)
+async def introspect_tokens(
+    introspection_request: IntrospectionRequest,
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+) -> IntrospectionResponse:
+    """Introspect a batch of tokens (RFC 7662 style).
+
+    Only superusers (e.g. the gateway's service account) may introspect, as
+    the answers reveal other users' token state. Every token is decoded in
+    one pass and all subjects are resolved with a single query, so gateways
+    can validate many tokens per round trip.
+    """
+    payloads = await get_token_provider().resolve_tokens(introspection_request.tokens)
+
+    usernames = {
+        payload["sub"]
+        for payload in payloads
+        if payload is not None and isinstance(payload.get("sub"), str)
+    }
+    users = await get_users_by_usernames(session, usernames)
+
+    results = []
+    for payload in payloads:
+        user = (
+            users.get(normalize_identity(str(payload.get("sub"))))
+            if payload is not None
+            else None
+        )
+        if (
+            payload is None
+            or user is None
+            or user.disabled
+            or not is_token_epoch_current(payload, user.token_epoch)
+        ):
+            results.append(TokenIntrospection(active=False))
+            continue
+
+        results.append(
+            TokenIntrospection(
+                active=True,
+                sub=user.username,
+                username=user.username,
+                token_type=payload.get("type"),
+                exp=payload.get("exp"),
+                iat=payload.get("iat"),
+                jti=payload.get("jti"),
+            )
+        )
+
+    return IntrospectionResponse(results=results)
+
+
+@router.get(
+    "/users/me",
+    response_model=User,
+    dependencies=[Depends(check_current_user_not_modified)],
+    responses={304: {"description": "Profile unchanged since the given ETag"}},
+)
+async def read_users_me(
+    request: Request,
+    response: Response,
+    current_user: Annotated[UserInDB, Depends(get_current_user_in_db)],
+) -> User | Response:
+    """Get current user profile.
+
+    Sends a strong ETag derived from the user's row version and answers a
+    matching If-None-Match with an empty 304.
+    """
+    headers = conditional_headers(
+        user_etag(current_user.username, current_user.version)
+    )
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return convert_user_in_db_to_user(current_user)
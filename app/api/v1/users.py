@@ -0,0 +1,63 @@
+"""User endpoints."""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_superuser, get_read_session
+from app.core.security import (
+    convert_user_in_db_to_user,
+    get_users_by_ids,
+    get_users_by_usernames,
+)
+from app.models import normalize_identity
+from app.schemas.user import (
+    UserInDB,
+    UserLookupRequest,
+    UserLookupResponse,
+    UserLookupResult,
+)
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+
+@router.post(
+    "/lookup",
+    response_model=UserLookupResponse,
+    dependencies=[Depends(get_current_superuser)],
+)
+async def lookup_users(
+    lookup_request: UserLookupRequest,
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+) -> UserLookupResponse:
+    """Look up many users by username or id with a single query.
+
+    Only superusers may look users up, as the results include other users'
+    emails and names. Results follow the request order; unknown keys are
+    reported as misses.
+    """
+    matches: list[tuple[str | int, UserInDB | None]]
+    if lookup_request.usernames is not None:
+        by_username = await get_users_by_usernames(session, lookup_request.usernames)
+        matches = [
+            (key, by_username.get(normalize_identity(key)))
+            for key in lookup_request.usernames
+        ]
+    else:
+        ids = lookup_request.ids or []
+        by_id = await get_users_by_ids(session, ids)
+        matches = [(key, by_id.get(key)) for key in ids]
+
+    results = [
+        UserLookupResult(
+            key=key,
+            found=user is not None,
+            user=convert_user_in_db_to_user(user) if user is not None else None,
+        )
+        for key, user in matches
+    ]
+
+    return UserLookupResponse(results=results)
@@ -28,11 +28,13 @@ class Settings(BaseSettings):
     VERSION: str = "0.1.0"
     V1_STR: str = "/api/v1"
 
-    # Database components - REQUIRED in production
-    POSTGRES_HOST: str
-    POSTGRES_DB: str
-    POSTGRES_USER: str
-    POSTGRES_PASSWORD: SecretStr
+    # Database components - REQUIRED in production, unless SQLITE_PATH is set
+    POSTGRES_HOST: str | None = None
+    POSTGRES_DB: str | None = None
+    POSTGRES_USER: str | None = None
+    POSTGRES_PASSWORD: SecretStr | None = None
+    # Embedded SQLite database file for single-node installs, instead of Postgres
+    SQLITE_PATH: str | None = None
     DATABASE_URL: str | None = None
     FIRST_USERNAME: str
     FIRST_PASSWORD: SecretStr
@@ -43,7 +45,23 @@ class Settings(BaseSettings):
         if isinstance(v, str):
             return v
         values = info.data if hasattr(info, "data") else {}
-        password: SecretStr = values.get("POSTGRES_PASSWORD", SecretStr(""))
+        if values.get("SQLITE_PATH"):
+            return f"sqlite+aiosqlite:///{values['SQLITE_PATH']}"
+        missing = [
+            name
+            for name in (
+                "POSTGRES_HOST",
+                "POSTGRES_DB",
+                "POSTGRES_USER",
+                "POSTGRES_PASSWORD",
+            )
+            if not values.get(name)
+        ]
+        if missing:
+            raise ValueError(
+                f"{', '.join(missing)} required unless DATABASE_URL or SQLITE_PATH is set"
+            )
+        password: SecretStr = values["POSTGRES_PASSWORD"]
         return "postgresql+asyncpg://{user}:{password}@{host}/{db}".format(
             user=values.get("POSTGRES_USER"),
             password=password.get_secret_value(),
@@ -51,10 +69,112 @@ class Settings(BaseSettings):
             db=values.get("POSTGRES_DB"),
         )
 
+    # Database timeouts (Postgres) - fail requests instead of hanging on a stalled server
+    DATABASE_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    DATABASE_COMMAND_TIMEOUT_SECONDS: float = 10.0
+
+    # SQLite tuning - only used when the database is SQLite
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KIB: int = 64 * 1024
+    SQLITE_READER_POOL_SIZE: int = 4
+    SQLITE_WRITER_TIMEOUT_SECONDS: float = 30.0
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def is_sqlite(self) -> bool:
+        """Whether the database is an embedded SQLite file."""
+        return str(self.DATABASE_URL).startswith("sqlite")
+
+    # Read replicas - OPTIONAL, read-only lookups are spread across them
+    DATABASE_REPLICA_URLS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 1.0
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def replica_urls(self) -> list[str]:
+        """Get configured read replica URLs as a list."""
+        if isinstance(self.DATABASE_REPLICA_URLS, str):
+            return [self.DATABASE_REPLICA_URLS] if self.DATABASE_REPLICA_URLS else []
+        return list(self.DATABASE_REPLICA_URLS)
+
+    # Sharding - OPTIONAL, users are spread across the primary and these databases
+    DATABASE_SHARD_URLS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+    # Shard count before the last added shards, while their users are moved
+    SHARD_PREVIOUS_COUNT: int | None = None
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def shard_urls(self) -> list[str]:
+        """Get the configured extra shard URLs as a list."""
+        if isinstance(self.DATABASE_SHARD_URLS, str):
+            return [self.DATABASE_SHARD_URLS] if self.DATABASE_SHARD_URLS else []
+        return list(self.DATABASE_SHARD_URLS)
+
+    # Migrations - DDL gives up instead of queueing behind long-running queries
+    MIGRATION_LOCK_TIMEOUT: str = "5s"
+    MIGRATION_STATEMENT_TIMEOUT: str = "0"
+
+    # Load shedding - per-route-class adaptive concurrency limits on the v1 API
+    LOAD_SHEDDING_ENABLED: bool = True
+    LOAD_SHEDDING_RETRY_AFTER_SECONDS: int = 1
+
+    # Idempotency-Key support on /register and /token
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: float = 300.0
+    IDEMPOTENCY_MAX_ENTRIES: int = 10_000
+
+    # Username filter - Bloom filter ruling out unknown usernames at login
+    USERNAME_FILTER_ENABLED: bool = True
+    USERNAME_FILTER_ERROR_RATE: float = 0.01
+    USERNAME_FILTER_REFRESH_SECONDS: float = 5.0
+    USERNAME_FILTER_REBUILD_SECONDS: float = 600.0
+
+    # Login events - buffered in memory and written in batches
+    LOGIN_EVENTS_BATCH_SIZE: int = 500
+    LOGIN_EVENTS_FLUSH_INTERVAL_SECONDS: float = 1.0
+    LOGIN_EVENTS_MAX_BUFFER: int = 10_000
+
+    # Tokens - signed JWTs, or short opaque tokens backed by a session store
+    TOKEN_MODE: Literal["jwt", "opaque"] = "jwt"
+    SESSION_STORE: Literal["memory", "redis", "postgres"] = "memory"
+    SESSION_STORE_SHARDS: int = 64
+
+    # Token revocation - per process, or a memory-mapped table shared by a host's workers
+    REVOCATION_TABLE_PATH: str | None = None
+    REVOCATION_TABLE_SLOTS: int = 1 << 20
+
     # Redis components - REQUIRED in production
     REDIS_HOST: str | None = None
     REDIS_PORT: int | None = None
 
+    # Logging - JSON lines written from a background thread
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_SQL: bool = False
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+    LOG_QUEUE_SIZE: int = 10_000
+
+    # Tracing - spans for auth, security and DB work, off unless enabled
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: Literal["file", "memory", "none"] = "file"
+    TRACING_FILE_PATH: str = "traces.ndjson"
+    TRACING_SAMPLE_RATE: float = 1.0
+
+    # Event loop monitoring - lag histogram and stack capture of stalls
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.05
+    LOOP_LAG_THRESHOLD_SECONDS: float = 0.1
+    # Stacks of stalls at the same location are logged at most this often
+    LOOP_STALL_LOG_INTERVAL_SECONDS: float = 60.0
+
+    # Memory profiling - tracemalloc snapshots to diff, off (slow) unless enabled
+    MEMORY_PROFILING_ENABLED: bool = False
+    MEMORY_PROFILING_FRAMES: int = 10
+
     # Environment
     ENVIRONMENT: Literal["development", "testing", "production"] = "development"
 
@@ -125,6 +245,9 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     ALGORITHM: str = "HS256"
 
+    # Conditional GETs of /users/me trust an in-memory row version this long
+    USER_VERSION_CACHE_SECONDS: float = 5.0
+
     @field_validator("SECRET_KEY", mode="before")
     @classmethod
     def validate_secret_key(
@@ -2,18 +2,88 @@
 
 from __future__ import annotations
 
-from typing import AsyncGenerator
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import logging
+import math
+import socket
+import time
+from collections.abc import AsyncIterator, Iterable, Sequence
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import text
+from sqlalchemy.exc import (
+    DBAPIError,
+    InterfaceError,
+    OperationalError,
+    SQLAlchemyError,
+)
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 from app.core.config import settings
+from app.core.sqlite import create_sqlite_engines
+from app.core.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseUnavailableError(Exception):
+    """The database couldn't be reached or stopped answering mid-request."""
+
+
+def is_database_unavailable(exc: BaseException) -> bool:
+    """Check whether an error means the database can't be reached or stopped answering.
+
+    As opposed to rejecting a query: resets, refusals and timeouts (asyncpg
+    raises them unwrapped, as socket errors), pool exhaustion, and driver
+    errors that invalidated their connection. Other OSErrors, like file I/O
+    failures, don't count. The API reports these as 503.
+    """
+    if isinstance(exc, DatabaseUnavailableError):
+        return True
+    if isinstance(exc, DBAPIError):
+        return exc.connection_invalidated or isinstance(
+            exc, (OperationalError, InterfaceError)
+        )
+    return isinstance(
+        exc, (ConnectionError, TimeoutError, socket.gaierror, PoolTimeoutError)
+    )
+
+
+def create_postgres_engine(url: str, **kwargs: Any) -> AsyncEngine:
+    """Create an asyncpg engine that gives up on an unresponsive server.
+
+    Without timeouts a database that accepts connections but never answers
+    holds every request forever; with them, connecting and each query fail
+    with a timeout, which the API reports as 503.
+    """
+    return create_async_engine(
+        url,
+        future=True,
+        connect_args={
+            "timeout": settings.DATABASE_CONNECT_TIMEOUT_SECONDS,
+            "command_timeout": settings.DATABASE_COMMAND_TIMEOUT_SECONDS,
+        },
+        **kwargs,
+    )
+
 
 # Create async engine
-engine = create_async_engine(
-    str(settings.DATABASE_URL),
-    echo=settings.ENVIRONMENT == "development",
-    future=True,
-)
+# SQL logging is controlled by LOG_SQL (see app.core.logging), not echo
+if settings.is_sqlite:
+    # One writer connection; reads go through a separate reader pool
+    engine, _sqlite_reader = create_sqlite_engines(str(settings.DATABASE_URL))
+else:
+    engine = create_postgres_engine(str(settings.DATABASE_URL))
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -22,8 +92,302 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Seconds a replica is behind its primary; zero when caught up or not a standby
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+
+class _Replica:
+    """A read replica together with its last observed replication lag."""
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        # Unknown, so unused, until first measured
+        self.lag_seconds = math.inf
+
+
+class SessionRouter:
+    """Route read-only sessions to replicas, falling back to the primary.
+
+    Replicas are used round-robin. A replica whose lag exceeds
+    ``max_lag_seconds`` is skipped, and every read goes to the primary for
+    ``read_your_writes_seconds`` after a write was recorded in this process.
+
+    Lag is measured in the background (see ``start``) every
+    ``lag_check_interval_seconds``, so choosing a replica never waits on a
+    probe; until a replica's lag is first known, reads use the primary.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replicas: Sequence[AsyncEngine] = (),
+        *,
+        max_lag_seconds: float = 5.0,
+        lag_check_interval_seconds: float = 1.0,
+        read_your_writes_seconds: float = 5.0,
+    ) -> None:
+        self._primary = primary
+        self._replicas = [_Replica(replica) for replica in replicas]
+        self._next_replica = itertools.cycle(range(len(self._replicas)))
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval_seconds = lag_check_interval_seconds
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._last_write_at = -math.inf
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def engines(self) -> list[AsyncEngine]:
+        """The replicas' engines."""
+        return [replica.engine for replica in self._replicas]
+
+    @property
+    def has_replicas(self) -> bool:
+        """Whether any replicas are configured."""
+        return bool(self._replicas)
+
+    def record_write(self) -> None:
+        """Pin reads to the primary until the write is visible on replicas."""
+        self._last_write_at = time.monotonic()
+
+    def _recently_written(self) -> bool:
+        elapsed = time.monotonic() - self._last_write_at
+        return elapsed < self.read_your_writes_seconds
+
+    async def _measure_lag(self, replica: _Replica) -> float:
+        """Query how far behind the primary a replica is, in seconds."""
+        if replica.engine.dialect.name != "postgresql":
+            return 0.0  # e.g. SQLite readers share the writer's file
+        async with replica.engine.connect() as conn:
+            lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+        return float(lag or 0.0)
+
+    async def _check_replica(self, replica: _Replica) -> None:
+        try:
+            # A probe slower than the interval can't keep the lag current
+            replica.lag_seconds = await asyncio.wait_for(
+                self._measure_lag(replica), self.lag_check_interval_seconds
+            )
+        except (OSError, SQLAlchemyError, TimeoutError):
+            replica.lag_seconds = math.inf
+
+    async def check_lag(self) -> None:
+        """Measure every replica's lag once; unreachable ones lag infinitely."""
+        await asyncio.gather(
+            *(self._check_replica(replica) for replica in self._replicas)
+        )
+
+    def start(self) -> None:
+        """Keep measuring the replicas' lag in the background."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop measuring the replicas' lag."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check_lag()
+            except Exception:
+                logger.exception("Failed to measure replica lag")
+            await asyncio.sleep(self.lag_check_interval_seconds)
+
+    def _choose_replica(self) -> _Replica | None:
+        """Pick the next healthy replica, or ``None`` to use the primary."""
+        if not self._replicas or self._recently_written():
+            return None
+
+        for _ in range(len(self._replicas)):
+            replica = self._replicas[next(self._next_replica)]
+            if replica.lag_seconds <= self.max_lag_seconds:
+                return replica
+
+        return None
+
+    @asynccontextmanager
+    async def read_session(self) -> AsyncIterator[AsyncSession]:
+        """Open a session for read-only queries."""
+        replica = self._choose_replica()
+        factory = replica.sessionmaker if replica is not None else self._primary
+        async with factory() as session:
+            yield session
+
+    async def dispose(self) -> None:
+        """Close all replica connection pools."""
+        for replica in self._replicas:
+            await replica.engine.dispose()
+
+
+if settings.is_sqlite:
+    # Readers see every commit at once, so there is no lag to wait out
+    _session_router = SessionRouter(
+        AsyncSessionLocal, [_sqlite_reader], read_your_writes_seconds=0.0
+    )
+else:
+    _session_router = SessionRouter(
+        AsyncSessionLocal,
+        [create_postgres_engine(url) for url in settings.replica_urls],
+        max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+        lag_check_interval_seconds=settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+        read_your_writes_seconds=settings.READ_YOUR_WRITES_SECONDS,
+    )
+
+
+def get_session_router() -> SessionRouter:
+    """Get the read/write session router."""
+    return _session_router
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Map a 64-bit key to one of ``buckets`` buckets (jump consistent hash).
+
+    Growing from n to n + 1 buckets moves only the keys that land in the
+    new bucket, about 1 / (n + 1) of them, and never moves a key between
+    the existing buckets.
+    """
+    if buckets < 1:
+        raise ValueError("buckets must be at least 1")
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_key(username_key: str) -> int:
+    """Stable 64-bit hash of a normalized username; unlike hash(), not salted."""
+    digest = hashlib.blake2b(username_key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class ShardIdCollisionError(Exception):
+    """Two shards hold different users under the same id.
+
+    Ids are only unique across shards once ``prepare_id_sequences`` (see
+    app.core.rebalance) has run on every shard.
+    """
+
+
+class ShardMap:
+    """Route users to databases by a jump hash of their normalized username.
+
+    Shard 0 is the primary database, which callers already hold a session
+    for; the others are extra databases with the same schema. Shards can
+    only be appended. While a rebalance moves users onto added shards,
+    ``previous_count`` makes lookups also try the shard a user lived on
+    before.
+    """
+
+    def __init__(
+        self,
+        shards: Sequence[AsyncEngine] = (),
+        *,
+        previous_count: int | None = None,
+    ) -> None:
+        self._engines = list(shards)
+        self._sessionmakers = [
+            async_sessionmaker(shard, class_=AsyncSession, expire_on_commit=False)
+            for shard in self._engines
+        ]
+        self.previous_count = previous_count
+
+    def __len__(self) -> int:
+        return len(self._engines) + 1
+
+    @property
+    def engines(self) -> list[AsyncEngine]:
+        """The extra shards' engines."""
+        return list(self._engines)
+
+    @property
+    def sharded(self) -> bool:
+        """Whether users are spread over more than the primary."""
+        return len(self) > 1
+
+    def shard_for(self, username_key: str) -> int:
+        """Get the shard a (normalized) username belongs on."""
+        return jump_hash(shard_key(username_key), len(self))
+
+    def candidates(self, username_key: str) -> list[int]:
+        """Get the shards that may hold a username, most likely first."""
+        current = self.shard_for(username_key)
+        if self.previous_count is None:
+            return [current]
+        previous = jump_hash(shard_key(username_key), self.previous_count)
+        return [current] if previous == current else [current, previous]
+
+    def group(self, username_keys: Iterable[str]) -> dict[int, list[str]]:
+        """Group usernames by the shards that may hold them."""
+        groups: dict[int, list[str]] = {}
+        for username_key in username_keys:
+            for index in self.candidates(username_key):
+                groups.setdefault(index, []).append(username_key)
+        return groups
+
+    @asynccontextmanager
+    async def session(
+        self, index: int, primary: AsyncSession
+    ) -> AsyncIterator[AsyncSession]:
+        """Open a session on a shard; shard 0 reuses the caller's session."""
+        if index == 0:
+            yield primary
+            return
+        async with self._sessionmakers[index - 1]() as session:
+            yield session
+
+    async def dispose(self) -> None:
+        """Close all extra shards' connection pools."""
+        for shard in self._engines:
+            await shard.dispose()
+
+
+# Global instance - a single shard (the primary) unless DATABASE_SHARD_URLS is set
+_shard_map = ShardMap(
+    [create_postgres_engine(url) for url in settings.shard_urls],
+    previous_count=settings.SHARD_PREVIOUS_COUNT,
+)
+
+
+def get_shard_map() -> ShardMap:
+    """Get the map of user shards."""
+    return _shard_map
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session."""
     async with AsyncSessionLocal() as session:
-        yield session
+        tracer = get_tracer()
+        if tracer.enabled:
+            # Check out eagerly so pool wait time shows up as its own span
+            with tracer.span("db.session.checkout", kind="client"):
+                await session.connection()
+        try:
+            yield session
+        except Exception as e:
+            if not is_database_unavailable(e):
+                raise
+            # Drop the connection rather than wait on a rollback over it
+            await session.invalidate()
+            if isinstance(e, OSError):
+                # Unwrapped socket errors get a type the API can map to 503
+                raise DatabaseUnavailableError(str(e)) from e
+            raise
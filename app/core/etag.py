@@ -0,0 +1,36 @@
+"""Entity tags for conditional requests."""
+
+from __future__ import annotations
+
+import hashlib
+
+# Responses vary by user, so shared caches must key on the credentials
+CONDITIONAL_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def user_etag(username: str, version: int) -> str:
+    """Build a strong ETag for a user representation at a row version."""
+    digest = hashlib.sha256(f"{username}:{version}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so
+    ``W/`` prefixes are ignored; ``*`` matches any current representation.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def conditional_headers(etag: str) -> dict[str, str]:
+    """Headers sent with both full and 304 responses for an ETag."""
+    return {"ETag": etag, **CONDITIONAL_HEADERS}
@@ -0,0 +1,314 @@
+"""Idempotency-Key support for expensive, retried POST endpoints.
+
+Clients send an ``Idempotency-Key`` header with a request they may retry.
+The first request with a given key and payload runs normally and its
+response is kept for a while; duplicates arriving while it runs wait for
+it, and later retries get the stored response back without repeating the
+work. A response replayed this way carries ``Idempotent-Replayed: true``.
+
+Requests are matched on the key *and* a fingerprint of the request, so
+reusing a key with a different payload runs that request separately.
+Credentials in the body (passwords, client secrets) only enter the
+fingerprint through an HMAC under a random per-process key, so stored keys
+can't be used to guess them offline. Server errors are not stored, so
+retrying after one runs the request again. A stored response that hands out
+tokens is replayed only while those tokens are still valid; after a logout
+or revocation the retry logs in again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.security import SingleFlight
+from app.core.sessions import get_token_provider
+
+MAX_KEY_LENGTH = 255
+
+# Body fields fingerprinted only through an HMAC under _CREDENTIAL_KEY
+CREDENTIAL_FIELDS = frozenset({"password", "client_secret"})
+_CREDENTIAL_KEY = secrets.token_bytes(32)
+
+# Response fields holding tokens, re-checked before a response is replayed
+TOKEN_FIELDS = ("access_token", "refresh_token")
+
+# Header names dropped from stored responses; the outer middleware adds fresh ones
+_PER_REQUEST_HEADERS = {b"x-request-id", b"traceparent", b"date", b"server"}
+
+
+class StoredResponse:
+    """A complete response, as kept for replay, and the tokens it issued."""
+
+    def __init__(
+        self, status: int, headers: list[tuple[bytes, bytes]], body: bytes
+    ) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.tokens = issued_tokens(status, body)
+
+
+class IdempotencyStore:
+    """Bounded, in-process store of responses with a TTL.
+
+    Holds at most ``max_entries`` responses, evicting the oldest first, and
+    forgets each after ``ttl`` seconds. ``flights`` coalesces requests for
+    the same key that are still running.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flights: SingleFlight[StoredResponse] = SingleFlight()
+        self._responses: OrderedDict[tuple[str, str], tuple[StoredResponse, float]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def get(self, key: tuple[str, str]) -> StoredResponse | None:
+        """Get the stored response for a key, if it hasn't expired."""
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._responses[key]
+            return None
+        return entry[0]
+
+    def put(self, key: tuple[str, str], response: StoredResponse) -> None:
+        """Store a response for ``ttl`` seconds."""
+        self._responses.pop(key, None)
+        self._responses[key] = (response, time.monotonic() + self.ttl)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+
+    def discard(self, key: tuple[str, str]) -> None:
+        """Forget the stored response for a key, if any."""
+        self._responses.pop(key, None)
+
+
+# Global instance - responses are stored per process
+_idempotency_store = IdempotencyStore(
+    max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+)
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Get the idempotency store."""
+    return _idempotency_store
+
+
+def issued_tokens(status: int, body: bytes) -> list[str]:
+    """Get the tokens a successful JSON response hands out."""
+    if status != 200:
+        return []
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return []
+    if not isinstance(payload, dict):
+        return []
+    return [
+        payload[name] for name in TOKEN_FIELDS if isinstance(payload.get(name), str)
+    ]
+
+
+def _split_credentials(scope: Scope, body: bytes) -> tuple[bytes, bytes]:
+    """Split a form or JSON body into its other fields and its credentials.
+
+    Both come back in a canonical encoding. Other bodies have no credentials
+    to split off and are returned whole.
+    """
+    content_type = b""
+    for name, value in scope["headers"]:
+        if name == b"content-type":
+            content_type = value.split(b";")[0].strip().lower()
+            break
+
+    if content_type == b"application/x-www-form-urlencoded":
+        fields = sorted(parse_qsl(body, keep_blank_values=True))
+        payload = [
+            (k, v) for k, v in fields if k.decode("latin-1") not in CREDENTIAL_FIELDS
+        ]
+        credentials = [
+            (k, v) for k, v in fields if k.decode("latin-1") in CREDENTIAL_FIELDS
+        ]
+        return urlencode(payload).encode(), urlencode(credentials).encode()
+
+    if content_type == b"application/json":
+        try:
+            document: Any = json.loads(body)
+        except ValueError:
+            return body, b""
+        if isinstance(document, dict):
+            secret_fields = {
+                name: document.pop(name)
+                for name in CREDENTIAL_FIELDS.intersection(document)
+            }
+            return (
+                json.dumps(document, sort_keys=True).encode(),
+                json.dumps(secret_fields, sort_keys=True).encode(),
+            )
+
+    return body, b""
+
+
+def request_fingerprint(scope: Scope, body: bytes) -> str:
+    """Hash what identifies a request's payload: method, path, query and body.
+
+    Credential fields of form and JSON bodies are replaced by their HMAC.
+    """
+    payload, credentials = _split_credentials(scope, body)
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode()):
+        digest.update(part + b"\0")
+    digest.update(scope.get("query_string", b"") + b"\0")
+    digest.update(hmac.digest(_CREDENTIAL_KEY, credentials, "sha256"))
+    digest.update(payload)
+    return digest.hexdigest()
+
+
+async def _tokens_still_valid(response: StoredResponse) -> bool:
+    """Check that no token of a stored response was revoked since."""
+    if not response.tokens:
+        return True
+    resolved = await get_token_provider().resolve_tokens(response.tokens)
+    return None not in resolved
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware honouring Idempotency-Key on selected POST paths.
+
+    The request body is read up front to fingerprint it; bodies larger than
+    ``max_body_bytes`` are passed through without idempotency.
+    """
+
+    def __init__(
+        self, app: ASGIApp, paths: Sequence[str], max_body_bytes: int = 65536
+    ) -> None:
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = None
+        for name, value in scope["headers"]:
+            if name == b"idempotency-key":
+                key = value.decode("latin-1")
+                break
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                status_code=400,
+                content={
+                    "detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"
+                },
+            )
+            await response(scope, receive, send)
+            return
+
+        chunks: list[bytes] = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                return  # client went away before sending the body
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more_body = message.get("more_body", False)
+            if size > self.max_body_bytes and more_body:
+                await self.app(scope, _replay_receive(chunks, receive, True), send)
+                return
+        body = b"".join(chunks)
+
+        store = get_idempotency_store()
+        cache_key = (key, request_fingerprint(scope, body))
+        stored = store.get(cache_key)
+        if stored is not None and not await _tokens_still_valid(stored):
+            store.discard(cache_key)
+            stored = None
+        executed = False
+
+        async def run() -> StoredResponse:
+            nonlocal executed
+            executed = True
+            response = await self._capture(scope, _replay_receive([body], receive))
+            if response.status < 500:
+                store.put(cache_key, response)
+            return response
+
+        if stored is None:
+            stored = await store.flights.do(cache_key, run)
+
+        headers = list(stored.headers)
+        if not executed:
+            headers.append((b"idempotent-replayed", b"true"))
+        await send(
+            {"type": "http.response.start", "status": stored.status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def _capture(self, scope: Scope, receive: Receive) -> StoredResponse:
+        """Run the app and collect its whole response."""
+        status = 500
+        headers: list[tuple[bytes, bytes]] = []
+        body: list[bytes] = []
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [
+                    (name, value)
+                    for name, value in message.get("headers", [])
+                    if name.lower() not in _PER_REQUEST_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture_send)
+        return StoredResponse(status, headers, b"".join(body))
+
+
+def _replay_receive(
+    chunks: list[bytes], receive: Receive, more_body: bool = False
+) -> Receive:
+    """Receive that first hands back an already-read body, then delegates."""
+    pending = [b"".join(chunks)]
+
+    async def replay() -> Message:
+        if pending:
+            return {
+                "type": "http.request",
+                "body": pending.pop(),
+                "more_body": more_body,
+            }
+        return await receive()
+
+    return replay
@@ -0,0 +1,279 @@
+"""Adaptive concurrency limiting and load shedding per route class.
+
+Each route class (credential checks, admin, everything else) gets its own
+concurrency limit, so slow bcrypt-bound logins cannot starve cheap
+requests. Limits adapt with AIMD: they grow slowly while latency stays under
+the class target and shrink quickly when it doesn't. Requests over the limit
+wait in a short bounded queue until their deadline, after which they are
+rejected immediately with ``503`` and ``Retry-After`` instead of piling up.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Sequence
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a bounded, deadline-aware wait queue.
+
+    A request whose latency exceeds ``target_latency`` multiplies the limit
+    by ``backoff``; only requests admitted after the previous decrease
+    count, so one slow burst shrinks the limit once rather than once per
+    request. A fast request that found the limit saturated raises it by
+    ``1 / limit``, i.e. by about one per window of requests.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        target_latency: float = 0.5,
+        backoff: float = 0.9,
+        max_queue: int = 50,
+        queue_timeout: float = 1.0,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._last_backoff_at = -float("inf")
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Requests currently waiting for a slot."""
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting up to ``queue_timeout`` for one.
+
+        Returns False if the queue is full or the deadline passed, in which
+        case the request should be shed.
+        """
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait([waiter], timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if waiter.done():
+            return True  # the slot was handed over by release()
+        self._abandon(waiter)
+        return False
+
+    def release(self, admitted_at: float, latency: float | None = None) -> None:
+        """Give back a slot and feed the request's latency into the limit.
+
+        ``admitted_at`` is the ``time.monotonic()`` at which the slot was
+        taken. Pass ``latency=None`` when no usable sample was observed.
+        """
+        if latency is not None:
+            if latency > self.target_latency:
+                if admitted_at >= self._last_backoff_at:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_backoff_at = time.monotonic()
+            elif self._in_flight >= self.limit:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand free slots to waiters, oldest first."""
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._in_flight += 1
+
+    def _abandon(self, waiter: asyncio.Future[None]) -> None:
+        """Withdraw a waiter that gave up, returning its slot if it got one."""
+        if waiter.done() and not waiter.cancelled():
+            self._in_flight -= 1
+            self._wake()
+        else:
+            waiter.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+
+class RouteClass:
+    """A group of routes sharing one adaptive limit.
+
+    ``prefixes`` are matched against the path below the API version prefix;
+    an empty prefix matches everything.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prefixes: Sequence[str],
+        *,
+        initial_limit: int,
+        max_limit: int,
+        target_latency: float,
+        max_queue: int,
+        queue_timeout: float,
+    ) -> None:
+        self.name = name
+        self.prefixes = tuple(prefixes)
+        self.initial_limit = initial_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+    def matches(self, path: str) -> bool:
+        """Check whether a path (relative to the API prefix) is in this class."""
+        return any(path.startswith(prefix) for prefix in self.prefixes)
+
+    def create_limiter(self) -> AdaptiveLimiter:
+        """Build a fresh limiter with this class's settings."""
+        return AdaptiveLimiter(
+            initial_limit=self.initial_limit,
+            max_limit=self.max_limit,
+            target_latency=self.target_latency,
+            max_queue=self.max_queue,
+            queue_timeout=self.queue_timeout,
+        )
+
+
+# Matched in order; the last class catches every other v1 route
+ROUTE_CLASSES = (
+    # bcrypt-bound: one login costs ~250ms of CPU
+    RouteClass(
+        "credentials",
+        ("/token", "/register"),
+        initial_limit=8,
+        max_limit=64,
+        target_latency=1.0,
+        max_queue=16,
+        queue_timeout=2.0,
+    ),
+    # Exports and listings over the whole table
+    RouteClass(
+        "admin",
+        ("/admin",),
+        initial_limit=4,
+        max_limit=16,
+        target_latency=2.0,
+        max_queue=8,
+        queue_timeout=5.0,
+    ),
+    RouteClass(
+        "default",
+        ("",),
+        initial_limit=32,
+        max_limit=512,
+        target_latency=0.25,
+        max_queue=64,
+        queue_timeout=0.5,
+    ),
+)
+
+
+class LoadShedder:
+    """Map request paths to the limiter of their route class."""
+
+    def __init__(
+        self, route_classes: Sequence[RouteClass] = ROUTE_CLASSES, prefix: str = ""
+    ) -> None:
+        self.prefix = prefix
+        self.route_classes = tuple(route_classes)
+        self.limiters = {rc.name: rc.create_limiter() for rc in self.route_classes}
+
+    def limiter_for(self, path: str) -> AdaptiveLimiter | None:
+        """Get the limiter for a path, or None if the path is not limited."""
+        if not path.startswith(self.prefix):
+            return None
+        relative = path[len(self.prefix) :]
+        for route_class in self.route_classes:
+            if route_class.matches(relative):
+                return self.limiters[route_class.name]
+        return None
+
+
+# Global instance - limits are per process
+_load_shedder = LoadShedder(prefix=settings.V1_STR)
+
+
+def get_load_shedder() -> LoadShedder:
+    """Get the load shedder service."""
+    return _load_shedder
+
+
+class LoadSheddingMiddleware:
+    """Pure ASGI middleware applying the load shedder to HTTP requests.
+
+    Latency is measured to the start of the response, so long-running
+    streamed bodies don't read as overload; the slot is held until the
+    body has been sent.
+    """
+
+    def __init__(self, app: ASGIApp, retry_after_seconds: int = 1) -> None:
+        self.app = app
+        self.retry_after_seconds = retry_after_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = get_load_shedder().limiter_for(scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is overloaded, please retry later"},
+                headers={"Retry-After": str(self.retry_after_seconds)},
+            )
+            await response(scope, receive, send)
+            return
+
+        admitted_at = time.monotonic()
+        latency: float | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                latency = time.monotonic() - admitted_at
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            limiter.release(admitted_at, latency)
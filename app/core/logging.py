@@ -0,0 +1,291 @@
+"""Structured, non-blocking logging.
+
+Log calls on the event loop only filter and enqueue records; a
+``QueueListener`` thread formats them as JSON lines and writes them out.
+The queue is bounded: when the sink can't keep up, records are dropped
+(and counted) rather than buffered without limit or blocking the loop.
+
+Every record carries the current request's context (request id, route,
+user, time spent in the database), and successful access log lines can be
+sampled to cut volume under load.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+access_logger = logging.getLogger("app.access")
+
+# Fields describing the request being handled; empty outside requests
+_request_context: ContextVar[dict[str, Any] | None] = ContextVar(
+    "request_context", default=None
+)
+# ASGI scope of the request being handled, for tools looking at other tasks
+request_scope: ContextVar[Scope | None] = ContextVar("request_scope", default=None)
+
+
+def get_request_context() -> dict[str, Any]:
+    """Get the context of the current request (empty outside requests)."""
+    return _request_context.get() or {}
+
+
+def bind_request_context(**fields: Any) -> None:
+    """Add fields to the current request's context, e.g. the user."""
+    context = _request_context.get()
+    if context is not None:
+        context.update(fields)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update(getattr(record, "context", None) or {})
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of access log lines for successful requests.
+
+    Everything else, including access lines for 4xx and 5xx responses,
+    passes.
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.name != access_logger.name:
+            return True
+        fields = getattr(record, "fields", None) or {}
+        if fields.get("status", 500) >= 400:
+            return True
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that snapshots request context and never blocks.
+
+    Records are only prepared lightly on the calling thread: the message
+    is interpolated (so later mutation of its arguments can't change it)
+    and the request context copied. JSON encoding, traceback rendering and
+    I/O happen on the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue[logging.LogRecord]) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        record.context = dict(get_request_context())
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LoggingState:
+    """The installed queue handler and its listener thread."""
+
+    def __init__(self) -> None:
+        self.handler: DroppingQueueHandler | None = None
+        self.listener: QueueListener | None = None
+
+
+_state = _LoggingState()
+
+
+def setup_logging(
+    level: str | None = None,
+    *,
+    json_format: bool | None = None,
+    sample_rate: float | None = None,
+    queue_size: int | None = None,
+    stream: Any = None,
+) -> DroppingQueueHandler:
+    """Route all logging through a bounded queue to a background writer.
+
+    Safe to call more than once; later calls replace the earlier setup.
+    Defaults come from settings.
+    """
+    shutdown_logging()
+
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(
+        maxsize=queue_size or settings.LOG_QUEUE_SIZE
+    )
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(
+        SamplingFilter(
+            settings.LOG_SUCCESS_SAMPLE_RATE if sample_rate is None else sample_rate
+        )
+    )
+
+    sink = logging.StreamHandler(stream or sys.stdout)
+    use_json = settings.LOG_JSON if json_format is None else json_format
+    sink.setFormatter(
+        JsonFormatter()
+        if use_json
+        else logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    )
+    listener = QueueListener(log_queue, sink, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level or settings.LOG_LEVEL)
+
+    # Server loggers log through the queue too, instead of their own handlers
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        server_logger = logging.getLogger(name)
+        server_logger.handlers.clear()
+        server_logger.propagate = True
+
+    # Replaces engine echo: SQL statements are logged at INFO by this logger
+    logging.getLogger("sqlalchemy.engine").setLevel(
+        logging.INFO if settings.LOG_SQL else logging.WARNING
+    )
+
+    listener.start()
+    _state.handler, _state.listener = handler, listener
+    return handler
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background writer."""
+    if _state.listener is not None:
+        _state.listener.stop()
+    if _state.handler is not None:
+        logging.getLogger().removeHandler(_state.handler)
+    _state.handler = _state.listener = None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_db_timer(
+    conn: Any, cursor: Any, statement: Any, parameters: Any, context: Any, many: Any
+) -> None:
+    conn.info["query_started_at"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_db_timer(
+    conn: Any, cursor: Any, statement: Any, parameters: Any, context: Any, many: Any
+) -> None:
+    started = conn.info.pop("query_started_at", None)
+    request_context = _request_context.get()
+    if started is not None and request_context is not None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        request_context["db_time_ms"] = (
+            request_context.get("db_time_ms", 0.0) + elapsed_ms
+        )
+
+
+def route_template(scope: Scope) -> str | None:
+    """Get the full path template of the matched route, e.g. /api/v1/users/me.
+
+    Routes of included routers only know their path below the router's
+    prefix, so the prefix is recovered from the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None)
+    path_regex = getattr(route, "path_regex", None)
+    if not isinstance(template, str) or path_regex is None:
+        return None
+
+    path: str = scope["path"]
+    for index, char in enumerate(path):
+        if char == "/" and path_regex.match(path[index:]):
+            return path[:index] + template
+    return template
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware binding request context and writing access logs.
+
+    Uses the client's X-Request-ID when present, otherwise generates one,
+    and echoes it on the response.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = ""
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        context: dict[str, Any] = {"request_id": request_id or uuid.uuid4().hex}
+        token = _request_context.set(context)
+        scope_token = request_scope.set(scope)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", context["request_id"].encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            context["route"] = route_template(scope)
+            context["db_time_ms"] = round(context.get("db_time_ms", 0.0), 3)
+            access_logger.log(
+                logging.INFO if status_code < 500 else logging.WARNING,
+                "%s %s %d",
+                scope["method"],
+                scope["path"],
+                status_code,
+                extra={
+                    "fields": {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    }
+                },
+            )
+            request_scope.reset(scope_token)
+            _request_context.reset(token)
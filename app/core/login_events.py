@@ -0,0 +1,272 @@
+"""Write-behind recording of login events and last-login times.
+
+Logins only append to an in-memory buffer; a background task writes the
+buffer out in batches, so the login path never waits on an audit write.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Callable, Sequence
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    Table,
+    bindparam,
+    column,
+    insert,
+    or_,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_shard_map
+from app.models import LoginEvent, normalize_identity
+from app.models import User as UserModel
+
+logger = logging.getLogger(__name__)
+
+
+async def write_login_events(
+    session: AsyncSession, events: Sequence[dict[str, Any]]
+) -> None:
+    """Insert a batch of login events and advance the users' last-login times.
+
+    Events are inserted with one multi-row INSERT, and successful logins
+    are coalesced into one UPDATE setting each user's latest login time
+    (once per shard).
+
+    With sharding, each event is written to its user's shard (unknown
+    usernames to the primary), and the other shards are committed here.
+    The caller commits the primary.
+    """
+    if not events:
+        return
+
+    shards = get_shard_map()
+    keys = {normalize_identity(event["username"]) for event in events}
+    located: dict[str, tuple[int, int | None]] = {}
+    for index, shard_keys in shards.group(keys).items():
+        async with shards.session(index, session) as shard_session:
+            result = await shard_session.execute(
+                select(UserModel.username_normalized, UserModel.id).where(
+                    UserModel.username_normalized.in_(shard_keys)
+                )
+            )
+            for username_key, found_id in result.all():
+                located.setdefault(username_key, (index, found_id))
+
+    shard_rows: dict[int, list[dict[str, Any]]] = {}
+    for event in events:
+        shard, user_id = located.get(normalize_identity(event["username"]), (0, None))
+        shard_rows.setdefault(shard, []).append({**event, "user_id": user_id})
+
+    for index, rows in shard_rows.items():
+        async with shards.session(index, session) as shard_session:
+            await _write_shard_login_events(shard_session, rows)
+            if index != 0:
+                await shard_session.commit()
+
+
+async def _write_shard_login_events(
+    session: AsyncSession, rows: Sequence[dict[str, Any]]
+) -> None:
+    """Write login events for users on the session's shard; see above."""
+    await session.execute(insert(LoginEvent), rows)
+
+    last_logins: dict[int, datetime] = {}
+    for row in rows:
+        user_id = row["user_id"]
+        if row["success"] and user_id is not None:
+            previous = last_logins.get(user_id)
+            if previous is None or row["occurred_at"] > previous:
+                last_logins[user_id] = row["occurred_at"]
+    if not last_logins:
+        return
+
+    if session.get_bind().dialect.name == "sqlite":
+        # SQLite can't name the columns of a VALUES list; use a Core executemany
+        users = UserModel.__table__
+        assert isinstance(users, Table)
+        await session.execute(
+            update(users)
+            .where(users.c.id == bindparam("user_id"))
+            .where(
+                or_(
+                    users.c.last_login_at.is_(None),
+                    users.c.last_login_at < bindparam("occurred_at"),
+                )
+            )
+            .values(last_login_at=bindparam("occurred_at")),
+            [
+                {"user_id": user_id, "occurred_at": occurred_at}
+                for user_id, occurred_at in last_logins.items()
+            ],
+        )
+        return
+
+    latest = values(
+        column("id", Integer),
+        column("last_login_at", DateTime(timezone=True)),
+        name="latest",
+    ).data(list(last_logins.items()))
+    await session.execute(
+        update(UserModel)
+        .where(UserModel.id == latest.c.id)
+        # Never move a login time backwards if another worker got there first
+        .where(
+            or_(
+                UserModel.last_login_at.is_(None),
+                UserModel.last_login_at < latest.c.last_login_at,
+            )
+        )
+        .values(last_login_at=latest.c.last_login_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+class LoginEventWriter:
+    """Buffer login events in memory and write them out in batches.
+
+    A flush happens once ``batch_size`` events are buffered or every
+    ``flush_interval`` seconds, whichever comes first, and on ``stop()``.
+    When the buffer holds ``max_buffer`` events, ``record`` waits up to
+    ``full_wait`` seconds for a flush to make room and then drops the event,
+    so a stalled database slows logins down by at most that much.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_buffer: int = 10_000,
+        full_wait: float = 0.05,
+    ) -> None:
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.full_wait = full_wait
+        self.dropped = 0
+        self._buffer: list[dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._closing = False
+
+    @property
+    def pending(self) -> int:
+        """Events buffered and not yet written."""
+        return len(self._buffer)
+
+    async def record(
+        self,
+        username: str,
+        *,
+        success: bool,
+        ip_address: str | None = None,
+        user_agent: str | None = None,
+        occurred_at: datetime | None = None,
+    ) -> bool:
+        """Buffer one login attempt. Returns False if it had to be dropped."""
+        if len(self._buffer) >= self.max_buffer:
+            self._wakeup.set()
+            self._drained.clear()
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._drained.wait(), self.full_wait)
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                logger.warning("Login event buffer full, dropping event")
+                return False
+
+        self._buffer.append(
+            {
+                "username": username[:50],
+                "occurred_at": occurred_at or datetime.now(timezone.utc),
+                "ip_address": ip_address[:45] if ip_address else None,
+                "user_agent": user_agent[:255] if user_agent else None,
+                "success": success,
+            }
+        )
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> int:
+        """Write out every buffered event now. Returns how many were written.
+
+        On failure the events go back to the front of the buffer (as far as
+        it has room) to be retried by the next flush, and the error is
+        re-raised.
+        """
+        async with self._flush_lock:
+            batch, self._buffer = self._buffer, []
+            self._drained.set()
+            if not batch:
+                return 0
+            try:
+                async with self._session_factory() as session:
+                    await write_login_events(session, batch)
+                    await session.commit()
+            except Exception:
+                room = max(self.max_buffer - len(self._buffer), 0)
+                self._buffer[:0] = batch[-room:] if room else []
+                self.dropped += len(batch) - min(room, len(batch))
+                raise
+            return len(batch)
+
+    def start(self) -> None:
+        """Start flushing in the background."""
+        if self._task is None or self._task.done():
+            # Fresh primitives: the previous ones may belong to another loop
+            self._wakeup = asyncio.Event()
+            self._drained = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write out whatever is left."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            if self._closing:
+                break
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to write login events, will retry")
+
+
+# Global instance - started and stopped by the application lifespan
+_login_event_writer = LoginEventWriter(
+    AsyncSessionLocal,
+    batch_size=settings.LOGIN_EVENTS_BATCH_SIZE,
+    flush_interval=settings.LOGIN_EVENTS_FLUSH_INTERVAL_SECONDS,
+    max_buffer=settings.LOGIN_EVENTS_MAX_BUFFER,
+)
+
+
+def get_login_event_writer() -> LoginEventWriter:
+    """Get the login event writer."""
+    return _login_event_writer
@@ -0,0 +1,182 @@
+"""Event loop lag monitoring with a watchdog for blocking calls.
+
+A task on the loop sleeps for a fixed interval and measures how late it
+wakes up: that scheduling delay is how long every other coroutine waited
+too, and it goes into a histogram. Measuring from the loop only reveals a
+stall after it ends, so a watchdog thread also watches the task's
+heartbeat; when the loop has been stuck longer than the threshold, it
+grabs the loop thread's stack while the blocking call is still running
+and reports where it is by file and line.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from app.core.config import settings
+from app.core.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Code under this directory is preferred when naming the blocking location
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def blocking_location(stack: traceback.StackSummary) -> str:
+    """Name the frame to blame for a stall as ``path:line function``.
+
+    That is the innermost frame in the app's own code (the call it made is
+    what blocks), or the innermost frame at all if no app code is running.
+    """
+    if not stack:
+        return "unknown"
+    frame = next(
+        (frame for frame in reversed(stack) if frame.filename.startswith(_APP_DIR)),
+        stack[-1],
+    )
+    filename = frame.filename
+    if filename.startswith(_APP_DIR):
+        filename = os.path.relpath(filename, os.path.dirname(_APP_DIR))
+    return f"{filename}:{frame.lineno} {frame.name}"
+
+
+class LoopLagMonitor:
+    """Measure event loop lag and capture the stack of long stalls.
+
+    The loop is probed every ``interval`` seconds. The watchdog checks
+    several times per ``threshold`` and reports a stall once per episode:
+    a count per blocking location and a warning log with the full stack.
+    A location that keeps stalling the loop (e.g. one on every request) is
+    logged at most once per ``report_interval`` seconds; it is still counted
+    every time.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.05,
+        threshold: float = 0.1,
+        report_interval: float = 60.0,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        metrics = get_metrics()
+        self.lag = metrics.histogram(
+            "event_loop_lag_seconds",
+            "Delay between when a loop callback was due and when it ran",
+            LAG_BUCKETS,
+        )
+        self.stalls = metrics.counter(
+            "event_loop_stalls_total",
+            "Event loop stalls over the lag threshold, by blocking location",
+            ("location",),
+        )
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._last_logged: dict[str, float] = {}
+
+    @property
+    def running(self) -> bool:
+        """Whether the monitor is started."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start probing the running loop and watching it from a thread."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._probe())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the probe and the watchdog."""
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    async def _probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag.observe(max(0.0, loop.time() - due))
+            self._heartbeat = time.monotonic()
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopping.wait(self.threshold / 4):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for > self.threshold and heartbeat != reported_heartbeat:
+                reported_heartbeat = heartbeat
+                self.report_stall(stalled_for)
+
+    def report_stall(self, stalled_for: float) -> str | None:
+        """Capture the loop thread's stack and report where it is blocked.
+
+        Returns the blocking location, or None if the loop thread is gone.
+        The stack is logged unless this location's was within the report
+        interval.
+        """
+        frame = sys._current_frames().get(self._loop_thread_id or 0)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)
+        location = blocking_location(stack)
+        self.stalls.inc(location)
+
+        now = time.monotonic()
+        last_logged = self._last_logged.get(location)
+        if last_logged is not None and now - last_logged < self.report_interval:
+            return location
+        self._last_logged[location] = now
+        logger.warning(
+            "Event loop blocked for over %.0fms at %s\n%s",
+            stalled_for * 1000,
+            location,
+            "".join(stack.format()).rstrip(),
+            extra={
+                "fields": {
+                    "blocked_ms": round(stalled_for * 1000, 1),
+                    "location": location,
+                }
+            },
+        )
+        return location
+
+
+# Global instance - started and stopped by the application lifespan
+_loop_monitor = LoopLagMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+    threshold=settings.LOOP_LAG_THRESHOLD_SECONDS,
+    report_interval=settings.LOOP_STALL_LOG_INTERVAL_SECONDS,
+)
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    """Get the event loop lag monitor."""
+    return _loop_monitor
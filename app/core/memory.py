@@ -0,0 +1,279 @@
+"""Memory profiling of the running process.
+
+Two views of where a worker's memory goes. While memory profiling is on,
+tracemalloc traces every allocation (which slows the process down), and
+numbered snapshots of the live allocations can be diffed to show what grew
+in between. Independently of tracing, ``measure_structures`` reports the
+size of the long-lived in-process structures that grow with traffic.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import tracemalloc
+from collections import deque
+from typing import Any, Literal
+
+from limits.storage import MemoryStorage
+from slowapi import Limiter
+
+from app.core.config import settings
+from app.core.database import engine, get_session_router, get_shard_map
+from app.core.idempotency import get_idempotency_store
+from app.core.login_events import get_login_event_writer
+from app.core.security import (
+    get_token_blacklist,
+    get_token_epochs,
+    get_user_loads,
+    get_user_versions,
+)
+from app.core.sessions import MemorySessionStore, get_opaque_token_service
+from app.core.username_filter import get_username_filter
+from app.schemas.memory import (
+    AllocationStat,
+    MemoryDiff,
+    MemorySnapshot,
+    MemoryStructures,
+    StructureSize,
+)
+
+StatGrouping = Literal["lineno", "filename", "traceback"]
+
+# Allocations by tracemalloc itself and by the import system are noise here
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class MemoryProfilingOffError(RuntimeError):
+    """Raised when a snapshot is requested while tracemalloc isn't tracing."""
+
+
+def _stat(
+    traceback: tracemalloc.Traceback,
+    size: int,
+    count: int,
+    size_diff: int | None = None,
+    count_diff: int | None = None,
+) -> AllocationStat:
+    return AllocationStat(
+        location=[f"{frame.filename}:{frame.lineno}" for frame in traceback],
+        size_bytes=size,
+        count=count,
+        size_diff_bytes=size_diff,
+        count_diff=count_diff,
+    )
+
+
+class MemoryProfiler:
+    """Take numbered tracemalloc snapshots and keep the latest for diffing.
+
+    Tracing records ``frames`` frames per allocation. Each snapshot holds a
+    record of every live allocation, so only the ``max_snapshots`` most
+    recent are kept. Taking and comparing snapshots blocks for a while on a
+    large heap; call these from a worker thread.
+    """
+
+    def __init__(self, *, frames: int = 10, max_snapshots: int = 8) -> None:
+        self.frames = frames
+        self.max_snapshots = max_snapshots
+        self._snapshots: dict[int, tracemalloc.Snapshot] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def tracing(self) -> bool:
+        """Whether tracemalloc is tracing allocations."""
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        """Start tracing allocations, unless something else already does."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+
+    def stop(self) -> None:
+        """Stop tracing if ``start`` started it, and drop the kept snapshots.
+
+        Tracing started elsewhere (e.g. PYTHONTRACEMALLOC) is left running.
+        """
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+        with self._lock:
+            self._snapshots.clear()
+
+    def _take(self) -> tuple[int, tracemalloc.Snapshot]:
+        if not tracemalloc.is_tracing():
+            raise MemoryProfilingOffError(
+                "Memory profiling is off; set MEMORY_PROFILING_ENABLED"
+            )
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                del self._snapshots[min(self._snapshots)]
+        return snapshot_id, snapshot
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        with self._lock:
+            return self._snapshots[snapshot_id]
+
+    def snapshot(
+        self, group_by: StatGrouping = "lineno", limit: int = 25
+    ) -> MemorySnapshot:
+        """Take and keep a snapshot; report its largest allocation sites.
+
+        Raises MemoryProfilingOffError unless tracing.
+        """
+        snapshot_id, snapshot = self._take()
+        traced, peak = tracemalloc.get_traced_memory()
+        return MemorySnapshot(
+            id=snapshot_id,
+            traced_bytes=traced,
+            peak_bytes=peak,
+            top=[
+                _stat(stat.traceback, stat.size, stat.count)
+                for stat in snapshot.statistics(group_by)[:limit]
+            ],
+        )
+
+    def diff(
+        self,
+        base_id: int,
+        target_id: int | None = None,
+        group_by: StatGrouping = "lineno",
+        limit: int = 25,
+    ) -> MemoryDiff:
+        """Compare a kept snapshot with a later one, by default a new one.
+
+        Raises KeyError for snapshots that are unknown or were evicted, and
+        MemoryProfilingOffError when a new snapshot is needed but tracing
+        is off.
+        """
+        base = self._get(base_id)
+        if target_id is None:
+            target_id, target = self._take()
+        else:
+            target = self._get(target_id)
+
+        stats = target.compare_to(base, group_by)
+        return MemoryDiff(
+            base_id=base_id,
+            target_id=target_id,
+            size_diff_bytes=sum(stat.size_diff for stat in stats),
+            top=[
+                _stat(
+                    stat.traceback,
+                    stat.size,
+                    stat.count,
+                    stat.size_diff,
+                    stat.count_diff,
+                )
+                for stat in stats[:limit]
+            ],
+        )
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate the bytes an object keeps alive.
+
+    Builtin containers are followed, as are the attributes of this app's own
+    objects. Anything else (locks, tasks, engines...) counts only its own
+    size, so machinery shared by many structures isn't charged to each.
+    """
+    seen: set[int] = set()
+    pending = [obj]
+    total = 0
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            pending.extend(item)
+        elif type(item).__module__.startswith("app.") and hasattr(item, "__dict__"):
+            pending.append(vars(item))
+    return total
+
+
+def _sized(structure: Any) -> StructureSize:
+    return StructureSize(entries=len(structure), size_bytes=deep_sizeof(structure))
+
+
+def measure_structures(limiter: Limiter) -> dict[str, StructureSize]:
+    """Measure the in-process structures that grow with traffic.
+
+    Sizes are taken while the app keeps running, so they are approximate.
+    SQLAlchemy's compiled statement caches are reported by entry count only.
+    """
+    structures = {
+        "token_blacklist": _sized(get_token_blacklist()),
+        "token_epochs": _sized(get_token_epochs()),
+        "user_versions": _sized(get_user_versions()),
+        "user_loads_in_flight": _sized(get_user_loads()),
+        "idempotency_responses": _sized(get_idempotency_store()),
+        "login_event_buffer": StructureSize(
+            entries=get_login_event_writer().pending,
+            size_bytes=deep_sizeof(get_login_event_writer()),
+        ),
+        "username_filter": StructureSize(size_bytes=deep_sizeof(get_username_filter())),
+    }
+
+    store = get_opaque_token_service().store
+    if isinstance(store, MemorySessionStore):
+        structures["token_sessions"] = _sized(store)
+
+    # slowapi keeps its limits storage private; in memory it's a few dicts,
+    # of counters for fixed windows and of timestamps for moving windows
+    storage = getattr(limiter, "_storage", None)
+    if isinstance(storage, MemoryStorage):
+        structures["rate_limiter"] = StructureSize(
+            entries=len(storage.storage) + len(storage.events),
+            size_bytes=deep_sizeof(vars(storage)),
+        )
+
+    engines = {
+        "primary": engine,
+        **{f"replica{i}": e for i, e in enumerate(get_session_router().engines, 1)},
+        **{f"shard{i}": e for i, e in enumerate(get_shard_map().engines, 1)},
+    }
+    for label, db_engine in engines.items():
+        cache = db_engine.sync_engine._compiled_cache
+        structures[f"sqlalchemy_compiled_cache.{label}"] = StructureSize(
+            entries=len(cache) if cache is not None else 0
+        )
+
+    return structures
+
+
+def memory_report(limiter: Limiter) -> MemoryStructures:
+    """Report the traced totals, if tracing, with the structures' sizes."""
+    tracing = tracemalloc.is_tracing()
+    traced, peak = tracemalloc.get_traced_memory() if tracing else (None, None)
+    return MemoryStructures(
+        tracing=tracing,
+        traced_bytes=traced,
+        peak_bytes=peak,
+        structures=measure_structures(limiter),
+    )
+
+
+# Global instance - tracing is started by the application lifespan when enabled
+_memory_profiler = MemoryProfiler(frames=settings.MEMORY_PROFILING_FRAMES)
+
+
+def get_memory_profiler() -> MemoryProfiler:
+    """Get the memory profiler."""
+    return _memory_profiler
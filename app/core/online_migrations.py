@@ -0,0 +1,153 @@
+"""Helpers for migrations that must not lock hot tables.
+
+Import these from migration scripts::
+
+    from app.core.online_migrations import create_index_concurrently
+
+They rely on ``alembic/env.py`` running each migration in its own
+transaction, so an autocommit block only ever commits the current
+migration's work.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
+
+import sqlalchemy as sa
+
+from alembic import context, op
+
+logger = logging.getLogger(__name__)
+
+
+def _index_state(index_name: str) -> bool | None:
+    """Return whether an index is valid, or None if it doesn't exist."""
+    if context.is_offline_mode():
+        return None
+    valid = op.get_bind().scalar(
+        sa.text(
+            "SELECT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND pg_catalog.pg_table_is_visible(c.oid)"
+        ),
+        {"name": index_name},
+    )
+    return None if valid is None else bool(valid)
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str | sa.TextClause],
+    *,
+    unique: bool = False,
+    **kwargs: Any,
+) -> None:
+    """Build an index with CREATE INDEX CONCURRENTLY, outside any transaction.
+
+    Writes to the table continue while the index builds. An INVALID index
+    left behind by an interrupted build is dropped and rebuilt, so the
+    migration can simply be re-run.
+    """
+    with context.get_context().autocommit_block():
+        state = _index_state(index_name)
+        if state is True:
+            logger.info("Index %s already exists, skipping", index_name)
+            return
+        if state is False:
+            logger.warning("Rebuilding invalid index %s", index_name)
+            op.drop_index(
+                index_name, table_name=table_name, postgresql_concurrently=True
+            )
+        op.create_index(
+            index_name,
+            table_name,
+            list(columns),
+            unique=unique,
+            postgresql_concurrently=True,
+            **kwargs,
+        )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """Drop an index with DROP INDEX CONCURRENTLY, outside any transaction."""
+    with context.get_context().autocommit_block():
+        op.drop_index(
+            index_name,
+            table_name=table_name,
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+@contextmanager
+def lock_timeout(
+    timeout: str = "5s", statement_timeout: str | None = None
+) -> Iterator[None]:
+    """Bound how long the enclosed DDL may wait for (and hold) table locks.
+
+    Without a lock timeout, an ALTER TABLE queued behind a long-running
+    query blocks every other query on the table until it gets its lock.
+    The settings are transaction-local and restored when the block
+    completes. If it raises, they are left for the migration's rollback to
+    undo: after a failed statement the transaction accepts no more
+    commands, and trying would hide the original error.
+    """
+    previous: dict[str, str | None] = {"lock_timeout": None, "statement_timeout": None}
+    if not context.is_offline_mode():
+        bind = op.get_bind()
+        for name in previous:
+            previous[name] = bind.scalar(sa.text(f"SHOW {name}"))
+
+    op.execute(f"SET LOCAL lock_timeout = '{timeout}'")
+    if statement_timeout is not None:
+        op.execute(f"SET LOCAL statement_timeout = '{statement_timeout}'")
+    yield
+    for name, value in previous.items():
+        if value is not None:
+            op.execute(f"SET LOCAL {name} = '{value}'")
+
+
+def backfill_in_batches(
+    table_name: str,
+    set_clause: str,
+    pending_condition: str,
+    *,
+    batch_size: int = 5000,
+    pause_seconds: float = 0.1,
+    key: str = "id",
+) -> int:
+    """Run ``UPDATE table SET set_clause`` over pending rows in small batches.
+
+    Each batch commits on its own, holding row locks only briefly, and
+    ``pause_seconds`` between batches throttles the load on the primary
+    and its replicas. ``pending_condition`` must stop matching a row once
+    it has been updated; that is what makes an interrupted backfill
+    resumable. Returns the number of rows updated.
+    """
+    if context.is_offline_mode():
+        op.execute(f"UPDATE {table_name} SET {set_clause} WHERE {pending_condition}")
+        return 0
+
+    bind = op.get_bind()
+    statement = sa.text(
+        f"UPDATE {table_name} SET {set_clause} WHERE {key} IN ("
+        f"SELECT {key} FROM {table_name} WHERE {pending_condition} "
+        f"ORDER BY {key} LIMIT :batch_size)"
+    )
+
+    total = 0
+    with context.get_context().autocommit_block():
+        while True:
+            updated = bind.execute(statement, {"batch_size": batch_size}).rowcount
+            if not updated:
+                break
+            total += updated
+            logger.info("Backfilled %d rows of %s", total, table_name)
+            if pause_seconds:
+                time.sleep(pause_seconds)
+    return total
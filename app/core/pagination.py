@@ -0,0 +1,163 @@
+"""Keyset (cursor) pagination for user listings."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import heapq
+import itertools
+import json
+from collections.abc import Sequence
+from typing import Any, Literal
+
+from sqlalchemy import ColumnElement, Select, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_shard_map
+from app.models import User as UserModel
+
+UserOrder = Literal["id", "username"]
+
+_ORDER_COLUMNS = {"id": UserModel.id, "username": UserModel.username}
+
+# Below this many rows an exact COUNT(*) is cheaper than trusting statistics
+EXACT_COUNT_THRESHOLD = 10_000
+
+
+def encode_cursor(order_by: UserOrder, value: int | str) -> str:
+    """Encode the last seen sort key as an opaque, URL-safe cursor."""
+    raw = json.dumps({"o": order_by, "v": value}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: UserOrder) -> int | str:
+    """Decode a cursor produced by ``encode_cursor`` for the same ordering.
+
+    Raises ValueError if the cursor is malformed or was issued for another
+    ordering.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError("Malformed cursor") from e
+
+    if not isinstance(data, dict) or data.get("o") != order_by:
+        raise ValueError("Cursor does not match the requested ordering")
+
+    value = data.get("v")
+    expected_type = int if order_by == "id" else str
+    if not isinstance(value, expected_type) or isinstance(value, bool):
+        raise ValueError("Malformed cursor")
+    return value
+
+
+def _user_filters(
+    is_active: bool | None, is_superuser: bool | None
+) -> list[ColumnElement[bool]]:
+    filters: list[ColumnElement[bool]] = []
+    if is_active is not None:
+        filters.append(UserModel.is_active.is_(is_active))
+    if is_superuser is not None:
+        filters.append(UserModel.is_superuser.is_(is_superuser))
+    return filters
+
+
+async def list_users_page(
+    session: AsyncSession,
+    *,
+    order_by: UserOrder = "id",
+    limit: int = 50,
+    after: int | str | None = None,
+    is_active: bool | None = None,
+    is_superuser: bool | None = None,
+) -> tuple[Sequence[UserModel], str | None]:
+    """Fetch one page of users after the given sort key.
+
+    Returns the page and the cursor for the next page (None on the last
+    page). Each page is a single index range scan, so latency does not grow
+    with page depth. With sharding, every shard scans for a full page and
+    the pages are merged.
+    """
+    order_column = _ORDER_COLUMNS[order_by]
+    stmt = select(UserModel).where(*_user_filters(is_active, is_superuser))
+    if after is not None:
+        stmt = stmt.where(order_column > after)
+    stmt = stmt.order_by(order_column).limit(limit + 1)
+
+    shards = get_shard_map()
+    shard_pages: list[Sequence[UserModel]] = []
+    for index in range(len(shards)):
+        async with shards.session(index, session) as shard_session:
+            shard_pages.append((await shard_session.execute(stmt)).scalars().all())
+    users = shard_pages[0]
+    if len(shard_pages) > 1:
+        merged = heapq.merge(*shard_pages, key=lambda user: getattr(user, order_by))
+        users = list(itertools.islice(merged, limit + 1))
+    if len(users) <= limit:
+        return users, None
+
+    users = users[:limit]
+    last_value: Any = getattr(users[-1], order_by)
+    return users, encode_cursor(order_by, last_value)
+
+
+def _explain_sql(stmt: Select[Any], session: AsyncSession) -> str:
+    compiled = stmt.compile(
+        dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    return f"EXPLAIN (FORMAT JSON) {compiled}"
+
+
+async def estimate_user_count(
+    session: AsyncSession,
+    *,
+    is_active: bool | None = None,
+    is_superuser: bool | None = None,
+    exact_below: int = EXACT_COUNT_THRESHOLD,
+) -> int:
+    """Estimate how many users match the filters from planner statistics.
+
+    Large tables are never counted: the total comes from ``pg_class`` or,
+    with filters, from the planner's row estimate. Tables with fewer than
+    ``exact_below`` rows (or never analyzed) are counted exactly, which is
+    cheap at that size and avoids the planner's guesses for tiny tables.
+    Databases without these statistics (SQLite) are always counted. With
+    sharding, the shards' estimates are added up.
+    """
+    shards = get_shard_map()
+    total = 0
+    for index in range(len(shards)):
+        async with shards.session(index, session) as shard_session:
+            total += await _estimate_shard_user_count(
+                shard_session, is_active, is_superuser, exact_below
+            )
+    return total
+
+
+async def _estimate_shard_user_count(
+    session: AsyncSession,
+    is_active: bool | None,
+    is_superuser: bool | None,
+    exact_below: int,
+) -> int:
+    filters = _user_filters(is_active, is_superuser)
+
+    reltuples = None
+    if session.get_bind().dialect.name == "postgresql":
+        reltuples = await session.scalar(
+            text("SELECT reltuples FROM pg_class WHERE oid = 'users'::regclass")
+        )
+    if reltuples is None or reltuples < exact_below:
+        count_stmt = select(func.count()).select_from(UserModel).where(*filters)
+        return int(await session.scalar(count_stmt) or 0)
+
+    if not filters:
+        return int(reltuples)
+
+    stmt = select(UserModel.id).where(*filters)
+    result = await session.execute(text(_explain_sql(stmt, session)))
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return max(int(plan[0]["Plan"]["Plan Rows"]), 0)
@@ -0,0 +1,151 @@
+"""On-demand statistical CPU profiling of the running process.
+
+A background thread periodically snapshots the stacks of the other threads
+with ``sys._current_frames()`` and counts identical stacks. Nothing is
+instrumented, so the cost is a stack walk per thread per sample and the
+process runs at full speed between samples. The result is rendered in the
+collapsed-stack format (``frame;frame;frame count``) read by flamegraph.pl,
+speedscope and similar tools.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Collection
+from types import FrameType
+
+from app.core.logging import request_scope, route_template
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_qualname}".replace(";", ",")
+
+
+def _task_route(loop: asyncio.AbstractEventLoop) -> tuple[str | None, str | None]:
+    """Find the request the loop's running task serves, as (template, path)."""
+    task = asyncio.current_task(loop)
+    if task is None:
+        return None, None
+    scope = task.get_context().get(request_scope)
+    if scope is None:
+        return None, None
+    return route_template(scope), scope["path"]
+
+
+class SamplingProfiler:
+    """Sample thread stacks at a fixed interval and aggregate them.
+
+    ``thread_ids`` limits sampling to those threads (all threads but the
+    sampler itself by default). With ``route`` set, only samples of
+    ``loop``'s thread taken while its running task serves a request whose
+    route template or path equals ``route`` are kept; work a request hands
+    off to other threads can't be attributed and is left out.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.01,
+        thread_ids: Collection[int] | None = None,
+        route: str | None = None,
+        loop: asyncio.AbstractEventLoop | None = None,
+        loop_thread_id: int | None = None,
+    ) -> None:
+        if route is not None and (loop is None or loop_thread_id is None):
+            raise ValueError("Filtering by route needs the event loop and its thread")
+        self.interval = interval
+        self.thread_ids = None if thread_ids is None else frozenset(thread_ids)
+        self.route = route
+        self.loop = loop
+        self.loop_thread_id = loop_thread_id
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+
+    def sample(self) -> None:
+        """Take one snapshot of every sampled thread's stack."""
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        if self.route is not None:
+            assert self.loop is not None and self.loop_thread_id is not None
+            loop_frame = frames.get(self.loop_thread_id)
+            serving = self.route in _task_route(self.loop)
+            frames = {self.loop_thread_id: loop_frame} if serving and loop_frame else {}
+
+        for thread_id, frame in frames.items():
+            if thread_id == own_id:
+                continue
+            if self.thread_ids is not None and thread_id not in self.thread_ids:
+                continue
+
+            labels = []
+            current: FrameType | None = frame
+            while current is not None:
+                labels.append(_frame_label(current))
+                current = current.f_back
+            labels.append(names.get(thread_id, f"thread-{thread_id}"))
+            labels.reverse()
+            self.stacks[";".join(labels)] += 1
+        self.samples += 1
+
+    def run(self, duration: float) -> None:
+        """Sample on the calling thread for ``duration`` seconds."""
+        deadline = time.monotonic() + duration
+        next_sample = time.monotonic()
+        while next_sample < deadline:
+            self.sample()
+            next_sample += self.interval
+            # Skip samples we fell behind on instead of bursting to catch up
+            now = time.monotonic()
+            if next_sample < now:
+                next_sample = now
+            time.sleep(max(0.0, min(next_sample, deadline) - now))
+
+    def collapsed(self) -> str:
+        """Render the aggregated stacks in collapsed-stack format."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+# One profile at a time per process: overlapping samplers only add overhead
+_profile_lock = threading.Lock()
+
+
+def profile_process(
+    duration: float,
+    *,
+    interval: float = 0.01,
+    thread_ids: Collection[int] | None = None,
+    route: str | None = None,
+    loop: asyncio.AbstractEventLoop | None = None,
+    loop_thread_id: int | None = None,
+) -> SamplingProfiler:
+    """Profile the process for ``duration`` seconds. Blocks the calling thread.
+
+    Raises ProfilerBusyError if a profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    try:
+        profiler = SamplingProfiler(
+            interval=interval,
+            thread_ids=thread_ids,
+            route=route,
+            loop=loop,
+            loop_thread_id=loop_thread_id,
+        )
+        profiler.run(duration)
+        return profiler
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,211 @@
+"""Moving users between shards after shards are added.
+
+Jump hashing only ever moves users from the existing shards onto the added
+ones, so a rebalance is a scan of every shard for users that now belong
+elsewhere. Each batch of them is copied to its new shard together with its
+login events, then deleted at the source, while the rows stay locked at the
+source so the app can't change them mid-move. Copies are idempotent: if a
+move is interrupted between the two steps, the next run finds the copies
+already in place and just finishes the deletes.
+
+Users keep their ids when they move, so ids must be unique across shards:
+``prepare_id_sequences`` gives every shard's id sequence its own residue
+class modulo ``SHARD_ID_STRIDE``.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import RowMapping, Table, delete, func, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.database import jump_hash, shard_key
+from app.models import EmailDirectoryEntry, LoginEvent
+from app.models import User as UserModel
+
+# Most shards a deployment can grow to while keeping ids unique
+SHARD_ID_STRIDE = 1024
+
+ShardSessions = Sequence[async_sessionmaker[AsyncSession]]
+
+
+class RebalanceError(Exception):
+    """A user can't be moved without losing or overwriting data."""
+
+
+def _table(model: Any) -> Table:
+    table = model.__table__
+    assert isinstance(table, Table)
+    return table
+
+
+async def prepare_id_sequences(shards: ShardSessions) -> list[int]:
+    """Make each shard hand out ids no other shard can, past every existing id.
+
+    Shard ``i`` gets ids congruent to ``i + 1`` modulo ``SHARD_ID_STRIDE``.
+    Returns the next id of each shard. Run it before the app writes to
+    newly added shards.
+    """
+    if len(shards) > SHARD_ID_STRIDE:
+        raise ValueError(f"At most {SHARD_ID_STRIDE} shards are supported")
+
+    max_id = 0
+    for shard in shards:
+        async with shard() as session:
+            max_id = max(
+                max_id, await session.scalar(select(func.max(UserModel.id))) or 0
+            )
+
+    next_ids = []
+    for index, shard in enumerate(shards):
+        next_id = max_id + 1 + (index - max_id) % SHARD_ID_STRIDE
+        async with shard() as session, session.begin():
+            sequence = await session.scalar(
+                text("SELECT pg_get_serial_sequence('users', 'id')")
+            )
+            await session.execute(
+                text(
+                    f"ALTER SEQUENCE {sequence} "
+                    f"INCREMENT BY {SHARD_ID_STRIDE} RESTART WITH {next_id}"
+                )
+            )
+        next_ids.append(next_id)
+    return next_ids
+
+
+async def backfill_email_directory(shards: ShardSessions) -> int:
+    """Record every user's email in the directory on the primary (shard 0).
+
+    Emails already in the directory are left alone, so this can be rerun.
+    Returns how many entries were added.
+    """
+    directory = _table(EmailDirectoryEntry)
+    added = 0
+    async with shards[0]() as primary:
+        for shard in shards:
+            async with shard() as session:
+                result = await session.execute(
+                    select(UserModel.email_normalized, UserModel.username_normalized)
+                )
+                entries = [dict(row) for row in result.mappings()]
+            if not entries:
+                continue
+            inserted = await primary.execute(
+                pg_insert(directory)
+                .values(entries)
+                .on_conflict_do_nothing()
+                .returning(directory.c.email_normalized)
+            )
+            added += len(inserted.all())
+        await primary.commit()
+    return added
+
+
+async def _copy_users(
+    source: AsyncSession,
+    target: async_sessionmaker[AsyncSession],
+    rows: Sequence[RowMapping],
+) -> None:
+    """Copy users and their login events to their new shard, and commit there."""
+    users = _table(UserModel)
+    login_events = _table(LoginEvent)
+    ids = [row["id"] for row in rows]
+    events = (
+        await source.execute(
+            select(login_events).where(login_events.c.user_id.in_(ids))
+        )
+    ).mappings()
+
+    async with target() as session, session.begin():
+        result = await session.execute(
+            pg_insert(users)
+            .values([dict(row) for row in rows])
+            .on_conflict_do_nothing()
+            .returning(users.c.id)
+        )
+        copied = set(result.scalars())
+
+        # Skipped rows must be copies from an interrupted run, not other users
+        skipped = {row["id"]: row["username_normalized"] for row in rows}
+        for user_id in copied:
+            skipped.pop(user_id)
+        if skipped:
+            existing = dict(
+                (
+                    await session.execute(
+                        select(users.c.id, users.c.username_normalized).where(
+                            users.c.id.in_(skipped)
+                        )
+                    )
+                ).all()
+            )
+            if existing != skipped:
+                raise RebalanceError(
+                    "Ids or usernames collide on the target shard; "
+                    "run prepare_id_sequences before adding shards"
+                )
+
+        event_rows = [
+            {key: value for key, value in event.items() if key != "id"}
+            for event in events
+            if event["user_id"] in copied
+        ]
+        if event_rows:
+            await session.execute(insert(login_events), event_rows)
+
+
+async def rebalance_shard(
+    shards: ShardSessions,
+    source: int,
+    *,
+    batch_size: int = 500,
+    dry_run: bool = False,
+) -> int:
+    """Move the users on one shard that belong on another to their shard.
+
+    Returns how many users were moved, or would be with ``dry_run``.
+    """
+    users = _table(UserModel)
+    login_events = _table(LoginEvent)
+    moved = 0
+    after_id = 0
+    while True:
+        async with shards[source]() as session, session.begin():
+            rows = (
+                (
+                    await session.execute(
+                        select(users)
+                        .where(users.c.id > after_id)
+                        .order_by(users.c.id)
+                        .limit(batch_size)
+                        .with_for_update()
+                    )
+                )
+                .mappings()
+                .all()
+            )
+            if not rows:
+                return moved
+            after_id = rows[-1]["id"]
+
+            targets: dict[int, list[RowMapping]] = {}
+            for row in rows:
+                target = jump_hash(shard_key(row["username_normalized"]), len(shards))
+                if target != source:
+                    targets.setdefault(target, []).append(row)
+            misplaced = [
+                row["id"] for target_rows in targets.values() for row in target_rows
+            ]
+            moved += len(misplaced)
+            if dry_run or not misplaced:
+                continue
+
+            for target, target_rows in targets.items():
+                await _copy_users(session, shards[target], target_rows)
+            await session.execute(
+                delete(login_events).where(login_events.c.user_id.in_(misplaced))
+            )
+            await session.execute(delete(users).where(users.c.id.in_(misplaced)))
@@ -0,0 +1,152 @@
+"""Host-local token revocation table in a memory-mapped file.
+
+Every worker on a host maps the same file, so a logout handled by one
+worker is seen by all of them, and revocations survive restarts with no
+network dependency.
+
+The file is a fixed-size open-addressing hash table (linear probing) of
+16-byte slots: an 8-byte digest of the JTI and the token's expiry as Unix
+seconds. Readers never lock. Writers serialize on an exclusive ``flock``
+and publish a slot by writing its expiry before its digest, so a reader
+that finds a digest also finds its expiry. A digest is never cleared, so
+probe chains never break; slots of expired tokens are reused instead.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+MAGIC = b"RVK1"
+HEADER = struct.Struct("<4sIQ")  # magic, format version, slot count
+HEADER_SIZE = 64
+SLOT = struct.Struct("<QQ")  # JTI digest, expiry
+FIELD = struct.Struct("<Q")
+SLOT_SIZE = SLOT.size
+NEVER = 2**63 - 1
+
+
+class RevocationTableFull(RuntimeError):
+    """Raised when no slot is free for a new revocation."""
+
+
+def jti_digest(jti: str) -> int:
+    """Non-zero 64-bit digest of a JTI (zero marks an empty slot)."""
+    value = int.from_bytes(
+        hashlib.blake2b(jti.encode(), digest_size=8).digest(), "little"
+    )
+    return value or 1
+
+
+class MmapRevocationTable:
+    """Revoked JTIs shared by every process mapping the same file.
+
+    Drop-in for ``TokenBlacklist``. ``capacity`` (rounded up to a power of
+    two) only applies when the file is created; an existing file keeps its
+    size. Keep it well above the number of tokens revoked within a token
+    lifetime, since lookups slow down as the table fills.
+    """
+
+    def __init__(self, path: str, capacity: int = 1 << 20) -> None:
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                self.capacity = self._init_file(fd, capacity)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, HEADER_SIZE + self.capacity * SLOT_SIZE)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._mask = self.capacity - 1
+
+    @staticmethod
+    def _init_file(fd: int, capacity: int) -> int:
+        """Validate the file's header, or lay out an empty table."""
+        header = os.pread(fd, HEADER.size, 0)
+        if len(header) == HEADER.size and any(header):
+            magic, version, slots = HEADER.unpack(header)
+            if magic != MAGIC or version != 1:
+                raise ValueError("Not a revocation table file")
+            return int(slots)
+
+        slots = 1 << max(capacity - 1, 1).bit_length()
+        os.ftruncate(fd, HEADER_SIZE + slots * SLOT_SIZE)
+        os.pwrite(fd, HEADER.pack(MAGIC, 1, slots), 0)
+        return slots
+
+    def _slot_offset(self, index: int) -> int:
+        return HEADER_SIZE + (index & self._mask) * SLOT_SIZE
+
+    def blacklist_token(self, jti: str, expires_at: float | None = None) -> None:
+        """Revoke a JTI until ``expires_at`` (Unix seconds; default forever).
+
+        Raises RevocationTableFull if every slot holds a live revocation.
+        """
+        digest = jti_digest(jti)
+        expiry = NEVER if expires_at is None else int(expires_at) + 1
+        now = time.time()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            target = None
+            for probe in range(self.capacity):
+                offset = self._slot_offset(digest + probe)
+                slot_digest, slot_expiry = SLOT.unpack_from(self._map, offset)
+                if slot_digest == digest:
+                    if slot_expiry < expiry:
+                        FIELD.pack_into(self._map, offset + 8, expiry)
+                        self._flush(offset)
+                    return
+                if slot_digest == 0:
+                    # End of the chain; prefer an expired slot seen on the way
+                    target = offset if target is None else target
+                    break
+                if target is None and slot_expiry <= now:
+                    target = offset
+            if target is None:
+                raise RevocationTableFull(f"No free slot in {self.path}")
+            FIELD.pack_into(self._map, target + 8, expiry)
+            FIELD.pack_into(self._map, target, digest)
+            self._flush(target)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def is_blacklisted(self, jti: str) -> bool:
+        """Check whether a JTI is revoked (lock-free)."""
+        digest = jti_digest(jti)
+        for probe in range(self.capacity):
+            offset = self._slot_offset(digest + probe)
+            (slot_digest,) = FIELD.unpack_from(self._map, offset)
+            if slot_digest == digest:
+                (expiry,) = FIELD.unpack_from(self._map, offset + 8)
+                return bool(expiry > time.time())
+            if slot_digest == 0:
+                return False
+        return False
+
+    def __len__(self) -> int:
+        """Number of live revocations (scans the whole table)."""
+        now = time.time()
+        return sum(
+            1
+            for digest, expiry in SLOT.iter_unpack(self._map[HEADER_SIZE:])
+            if digest and expiry > now
+        )
+
+    def _flush(self, offset: int) -> None:
+        """Write the page holding a slot back to the file."""
+        page_start = offset - offset % mmap.PAGESIZE
+        length = min(mmap.PAGESIZE, len(self._map) - page_start)
+        self._map.flush(page_start, length)
+
+    def close(self) -> None:
+        """Unmap and close the file."""
+        self._map.close()
+        os.close(self._fd)
@@ -2,16 +2,37 @@
 
 from __future__ import annotations
 
+import asyncio
+import math
 import secrets
+import time
+from collections.abc import (
+    Awaitable,
+    Callable,
+    Collection,
+    Hashable,
+    Mapping,
+    Sequence,
+)
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any
+from typing import Any, Generic, TypeVar
 
 import bcrypt
 import jwt
-from sqlalchemy import select
+from sqlalchemy import delete, exists, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.database import (
+    ShardIdCollisionError,
+    get_session_router,
+    get_shard_map,
+)
+from app.core.revocation import MmapRevocationTable
+from app.core.tracing import traced
+from app.core.username_filter import get_username_filter
+from app.models import EmailDirectoryEntry, normalize_identity
 from app.models import User as UserModel
 from app.schemas.user import User, UserInDB
 
@@ -20,26 +41,189 @@ class TokenBlacklist:
     """Simple in-memory token blacklist service."""
 
     def __init__(self) -> None:
-        self._blacklisted_tokens: set[str] = set()
+        self._blacklisted_tokens: dict[str, float] = {}
 
-    def blacklist_token(self, jti: str) -> None:
-        """Add a token JTI to the blacklist."""
-        self._blacklisted_tokens.add(jti)
+    def __len__(self) -> int:
+        return len(self._blacklisted_tokens)
+
+    def blacklist_token(self, jti: str, expires_at: float | None = None) -> None:
+        """Add a token JTI to the blacklist until ``expires_at`` (if given)."""
+        self._blacklisted_tokens[jti] = math.inf if expires_at is None else expires_at
 
     def is_blacklisted(self, jti: str) -> bool:
         """Check if a token JTI is blacklisted."""
-        return jti in self._blacklisted_tokens
+        expires_at = self._blacklisted_tokens.get(jti)
+        return expires_at is not None and expires_at >= time.time()
+
+
+RevocationList = TokenBlacklist | MmapRevocationTable
 
 
-# Global instance - in production this should be Redis or database
-_token_blacklist = TokenBlacklist()
+def build_token_blacklist() -> RevocationList:
+    """Per-process blacklist, or the host-wide table when a path is configured."""
+    if settings.REVOCATION_TABLE_PATH:
+        return MmapRevocationTable(
+            settings.REVOCATION_TABLE_PATH, settings.REVOCATION_TABLE_SLOTS
+        )
+    return TokenBlacklist()
 
 
-def get_token_blacklist() -> TokenBlacklist:
+# Global instance - shared by the workers on a host when REVOCATION_TABLE_PATH is set
+_token_blacklist = build_token_blacklist()
+
+
+def get_token_blacklist() -> RevocationList:
     """Get the token blacklist service."""
     return _token_blacklist
 
 
+class TokenEpochRegistry:
+    """In-memory map of the latest known token epoch for each user.
+
+    Tokens carry the user's epoch at issue time; bumping the epoch revokes
+    every token issued before it with a single integer per user.
+    """
+
+    def __init__(self) -> None:
+        self._epochs: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._epochs)
+
+    def get(self, username: str) -> int:
+        """Get the latest known epoch for a user (0 if never revoked)."""
+        return self._epochs.get(username, 0)
+
+    def observe(self, username: str, epoch: int) -> None:
+        """Record an epoch read from the database; epochs only move forward."""
+        if epoch > self._epochs.get(username, 0):
+            self._epochs[username] = epoch
+
+
+# Global instance - refreshed from the database on every user load
+_token_epochs = TokenEpochRegistry()
+
+
+def get_token_epochs() -> TokenEpochRegistry:
+    """Get the token epoch registry."""
+    return _token_epochs
+
+
+class UserVersionCache:
+    """Recently observed row versions of users, keyed by username.
+
+    Lets conditional requests be answered from memory. Entries older than
+    the caller's ``max_age`` are ignored since another worker may have
+    changed the row since; the least recently observed entries are evicted
+    beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._versions: dict[str, tuple[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def get(self, username: str, max_age: float) -> int | None:
+        """Get a user's version if it was observed within ``max_age`` seconds."""
+        entry = self._versions.get(username)
+        if entry is None or time.monotonic() - entry[1] > max_age:
+            return None
+        return entry[0]
+
+    def observe(self, username: str, version: int) -> None:
+        """Record a version read from the database."""
+        self._versions.pop(username, None)
+        self._versions[username] = (version, time.monotonic())
+        if len(self._versions) > self.max_entries:
+            del self._versions[next(iter(self._versions))]
+
+
+# Global instance - refreshed from the database on every user load
+_user_versions = UserVersionCache()
+
+
+def get_user_versions() -> UserVersionCache:
+    """Get the user version cache."""
+    return _user_versions
+
+
+T = TypeVar("T")
+K = TypeVar("K")
+
+
+class SingleFlight(Generic[T]):
+    """Coalesce concurrent calls for the same key into one in-flight call.
+
+    The first caller for a key (the leader) runs the call in its own task;
+    callers arriving while it runs wait for and share its result, or its
+    exception. Results are not cached: the next call after the flight lands
+    starts a new one.
+
+    Cancelling a waiting caller never affects the others. If the leader is
+    cancelled its call is abandoned, since it may be using the leader's
+    resources, and the waiters start a fresh flight instead.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, asyncio.Future[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Check whether a call for the key is currently running."""
+        return key in self._flights
+
+    def forget(self, key: Hashable) -> None:
+        """Stop sharing the running call for a key with new callers.
+
+        Callers arriving afterwards start a new flight, e.g. after a write
+        that the running call might not have seen.
+        """
+        self._flights.pop(key, None)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn`` for the key, or join the call already running for it."""
+        while (flight := self._flights.get(key)) is not None:
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                current = asyncio.current_task()
+                if flight.cancelled() and not (current and current.cancelling()):
+                    continue  # the leader was cancelled, not us: try again
+                raise
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await fn()
+        except Exception as e:
+            flight.set_exception(e)
+            # The leader re-raises it; don't warn when nobody else was waiting
+            flight.exception()
+            raise
+        except BaseException:
+            flight.cancel()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+
+# Global instance - shared by every request in this process
+_user_loads: SingleFlight[UserInDB | None] = SingleFlight()
+
+
+def get_user_loads() -> SingleFlight[UserInDB | None]:
+    """Get the single-flight group for user loads by username."""
+    return _user_loads
+
+
 class OAuth2Error(Exception):
     """OAuth2 compliant error exception."""
 
@@ -64,6 +248,7 @@ class TokenService:
         self.secret_key = secret_key
         self.algorithm = algorithm
 
+    @traced("jwt.encode")
     def _create_token(
         self,
         user: User,
@@ -80,6 +265,7 @@ class TokenService:
             "exp": expire,
             "iat": datetime.now(timezone.utc),
             "jti": secrets.token_urlsafe(jti_length),
+            "epoch": get_token_epochs().get(user.username),
         }
 
         return jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
@@ -108,10 +294,14 @@ class TokenService:
 
         return self._create_token(user, TokenType.REFRESH, expires_delta, jti_length=16)
 
+    @traced("jwt.decode")
     def _decode_token(
-        self, token: str, expected_type: TokenType
+        self, token: str, expected_type: TokenType | None
     ) -> dict[str, Any] | None:
-        """Decode and validate a JWT token with common logic."""
+        """Decode and validate a JWT token with common logic.
+
+        Any known token type is accepted when ``expected_type`` is None.
+        """
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
 
@@ -120,7 +310,10 @@ class TokenService:
                 return None
 
             # Verify token type
-            if payload.get("type") != expected_type.value:
+            if expected_type is None:
+                if payload.get("type") not in {t.value for t in TokenType}:
+                    return None
+            elif payload.get("type") != expected_type.value:
                 return None
 
             # Check if token is blacklisted
@@ -128,6 +321,10 @@ class TokenService:
             if jti and get_token_blacklist().is_blacklisted(jti):
                 return None
 
+            # Check if all of the user's tokens were revoked after this one
+            if not is_token_epoch_current(payload):
+                return None
+
             return payload
         except jwt.PyJWTError:
             return None
@@ -140,16 +337,65 @@ class TokenService:
         """Decode and verify a JWT refresh token."""
         return self._decode_token(token, TokenType.REFRESH)
 
+    def decode_token(self, token: str) -> dict[str, Any] | None:
+        """Decode and verify a JWT token of any type."""
+        return self._decode_token(token, None)
+
+    # Async interface shared with OpaqueTokenService (see app.core.sessions)
+
+    async def issue_token(
+        self, user: User, token_type: TokenType, expires_delta: timedelta
+    ) -> str:
+        """Create a token of the given type for a user."""
+        jti_length = 16 if token_type == TokenType.REFRESH else 8
+        return self._create_token(user, token_type, expires_delta, jti_length)
+
+    async def resolve_token(
+        self, token: str, expected_type: TokenType | None
+    ) -> dict[str, Any] | None:
+        """Get a token's claims, or None if it's invalid, expired or revoked."""
+        return self._decode_token(token, expected_type)
+
+    async def resolve_tokens(
+        self, tokens: Sequence[str]
+    ) -> list[dict[str, Any] | None]:
+        """Resolve tokens of any type."""
+        return [self._decode_token(token, None) for token in tokens]
+
+    async def revoke_token(self, token: str) -> None:
+        """Revoke a token by blacklisting its JTI."""
+        payload = self._decode_token(token, None)
+        if payload and payload.get("jti"):
+            get_token_blacklist().blacklist_token(payload["jti"], payload.get("exp"))
+
+
+def is_token_epoch_current(payload: dict[str, Any], epoch: int | None = None) -> bool:
+    """Check a token's epoch against the user's current epoch.
+
+    Falls back to the in-memory registry when no epoch is given.
+    """
+    username = payload.get("sub")
+    if epoch is None:
+        if not isinstance(username, str):
+            return True
+        epoch = get_token_epochs().get(username)
+    token_epoch = payload.get("epoch", 0)
+    return isinstance(token_epoch, int) and token_epoch >= epoch
+
 
 def get_token_service() -> TokenService:
     """Get configured TokenService instance."""
-    from app.core.config import settings
-
     return TokenService(
         secret_key=settings.SECRET_KEY.get_secret_value(), algorithm=settings.ALGORITHM
     )
 
 
+# bcrypt hash (default cost) of a throwaway password. Checked against when the
+# username is unknown, so misses cost as much as wrong passwords
+_TIMING_EQUALIZER_HASH = "$2b$12$xoivtaB9R3/Ee7k1UlxRyO5a1VZTjDByE./QxmRPlFJvqxyESOVm2"
+
+
+@traced("verify_password")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plaintext password against its hash using bcrypt."""
     return bcrypt.checkpw(
@@ -171,9 +417,18 @@ def convert_user_model_to_schema(user_model: UserModel) -> UserInDB:
         full_name=user_model.full_name,
         disabled=not user_model.is_active,
         hashed_password=user_model.hashed_password,
+        token_epoch=user_model.token_epoch,
+        is_superuser=user_model.is_superuser,
+        version=user_model.version,
     )
 
 
+def _observe_user(user_model: UserModel) -> None:
+    """Refresh the in-memory token epoch and version for a loaded user."""
+    get_token_epochs().observe(user_model.username, user_model.token_epoch)
+    get_user_versions().observe(user_model.username, user_model.version)
+
+
 def convert_user_in_db_to_user(user_in_db: UserInDB) -> User:
     """Convert UserInDB to User schema (without password)."""
     return User(
@@ -184,43 +439,189 @@ def convert_user_in_db_to_user(user_in_db: UserInDB) -> User:
     )
 
 
+@traced("get_user")
 async def get_user(session: AsyncSession, username: str) -> UserInDB | None:
-    """Get user from the database by username."""
-    stmt = select(UserModel).where(UserModel.username == username)
-    result = await session.execute(stmt)
-    user_model = result.scalar_one_or_none()
+    """Get user from the database by username (case-insensitive).
+
+    Concurrent loads of the same username share a single query (see
+    ``SingleFlight``), so a burst of requests from one account costs one
+    round trip. The returned schema may be shared and must not be mutated.
+    """
+    key = normalize_identity(username)
+    return await get_user_loads().do(key, lambda: _load_user(session, key))
+
+
+async def _load_user(session: AsyncSession, username_key: str) -> UserInDB | None:
+    stmt = select(UserModel).where(UserModel.username_normalized == username_key)
+    shards = get_shard_map()
+    for index in shards.candidates(username_key):
+        async with shards.session(index, session) as shard_session:
+            user_model = (await shard_session.execute(stmt)).scalar_one_or_none()
+        if user_model is not None:
+            _observe_user(user_model)
+            return convert_user_model_to_schema(user_model)
+
+    return None
+
+
+async def _username_exists(session: AsyncSession, username_key: str) -> bool:
+    """Check for a (normalized) username with an index probe, loading nothing."""
+    stmt = select(exists().where(UserModel.username_normalized == username_key))
+    shards = get_shard_map()
+    for index in shards.candidates(username_key):
+        async with shards.session(index, session) as shard_session:
+            if await shard_session.scalar(stmt):
+                return True
+    return False
+
+
+async def _select_users_on_shards(
+    session: AsyncSession,
+    shard_keys: Mapping[int, K],
+    where: Callable[[K], Any],
+) -> list[UserModel]:
+    """Select users from several shards concurrently, one query per shard.
+
+    ``shard_keys`` maps each shard to query to the keys to look for there,
+    which ``where`` turns into the query's filter.
+    """
+
+    async def select_on(index: int, keys: K) -> Sequence[UserModel]:
+        async with get_shard_map().session(index, session) as shard_session:
+            result = await shard_session.execute(select(UserModel).where(where(keys)))
+            return result.scalars().all()
+
+    results = await asyncio.gather(
+        *(select_on(index, keys) for index, keys in shard_keys.items())
+    )
+    return [user_model for user_models in results for user_model in user_models]
 
-    if not user_model:
-        return None
 
-    return convert_user_model_to_schema(user_model)
+async def get_users_by_usernames(
+    session: AsyncSession, usernames: Collection[str]
+) -> dict[str, UserInDB]:
+    """Get many users by username with a single IN query per shard.
+
+    The mapping is keyed by normalized username (see ``normalize_identity``);
+    usernames that don't exist are absent from it.
+    """
+    if not usernames:
+        return {}
+
+    normalized = {normalize_identity(username) for username in usernames}
+    user_models = await _select_users_on_shards(
+        session,
+        get_shard_map().group(normalized),
+        UserModel.username_normalized.in_,
+    )
+
+    users: dict[str, UserInDB] = {}
+    for user_model in user_models:
+        _observe_user(user_model)
+        users[user_model.username_normalized] = convert_user_model_to_schema(user_model)
+    return users
+
+
+async def get_users_by_ids(
+    session: AsyncSession, user_ids: Collection[int]
+) -> dict[int, UserInDB]:
+    """Get many users by primary key with a single IN query per shard.
+
+    Ids say nothing about the shard, so every shard is asked. Ids that
+    don't exist are absent from the returned mapping. A user found on two
+    shards, as while a rebalance moves it, is returned once; two different
+    users under one id raise ShardIdCollisionError.
+    """
+    if not user_ids:
+        return {}
+
+    ids = set(user_ids)
+    user_models = await _select_users_on_shards(
+        session,
+        dict.fromkeys(range(len(get_shard_map())), ids),
+        UserModel.id.in_,
+    )
+
+    users: dict[int, UserInDB] = {}
+    for user_model in user_models:
+        found = users.get(user_model.id)
+        if found is not None:
+            if normalize_identity(found.username) != user_model.username_normalized:
+                raise ShardIdCollisionError(
+                    f"Users {found.username!r} and {user_model.username!r} "
+                    f"share id {user_model.id} on different shards; run "
+                    f"prepare_id_sequences on every shard"
+                )
+            continue
+        _observe_user(user_model)
+        users[user_model.id] = convert_user_model_to_schema(user_model)
+    return users
 
 
 async def user_exists(
     session: AsyncSession, username: str, email: str
 ) -> dict[str, bool]:
-    """Check if username or email already exists."""
-    # Check username
-    username_stmt = select(UserModel).where(UserModel.username == username)
-    username_result = await session.execute(username_stmt)
-    username_exists = username_result.scalar_one_or_none() is not None
+    """Check if username or email already exists (case-insensitive).
+
+    With sharding, the username is looked up on its shard and the email in
+    the email directory on the primary.
+    """
+    username_key = normalize_identity(username)
+    email_key = normalize_identity(email)
+
+    shards = get_shard_map()
+    if shards.sharded:
+        email_owner = await session.scalar(
+            select(EmailDirectoryEntry.username_normalized).where(
+                EmailDirectoryEntry.email_normalized == email_key
+            )
+        )
+        return {
+            "username_exists": await _load_user(session, username_key) is not None,
+            "email_exists": email_owner is not None,
+        }
 
-    # Check email
-    email_stmt = select(UserModel).where(UserModel.email == email)
-    email_result = await session.execute(email_stmt)
-    email_exists = email_result.scalar_one_or_none() is not None
+    # One round trip, one unique-index probe per key
+    stmt = select(UserModel.username_normalized, UserModel.email_normalized).where(
+        or_(
+            UserModel.username_normalized == username_key,
+            UserModel.email_normalized == email_key,
+        )
+    )
+    rows = (await session.execute(stmt)).all()
 
-    return {"username_exists": username_exists, "email_exists": email_exists}
+    return {
+        "username_exists": any(row.username_normalized == username_key for row in rows),
+        "email_exists": any(row.email_normalized == email_key for row in rows),
+    }
 
 
+@traced("authenticate_user")
 async def authenticate_user(
     session: AsyncSession, username: str, password: str
 ) -> User | None:
-    """Authenticate a user with username and password."""
-    user = await get_user(session, username)
+    """Authenticate a user with username and password.
+
+    Usernames the username filter rules out are only confirmed missing with
+    an index probe rather than loaded; one the filter hadn't seen yet is
+    added to it and loaded as usual. Unknown usernames still pay for a
+    password check, so responses take as long whether or not the account
+    exists. Password checks run in a worker thread so they don't block the
+    event loop.
+    """
+    username_key = normalize_identity(username)
+    username_filter = get_username_filter()
+    user = None
+    if username_filter.might_exist(username_key):
+        user = await get_user(session, username)
+    elif await _username_exists(session, username_key):
+        # Created on another worker since the last refresh, or skipped by it
+        username_filter.add(username_key)
+        user = await get_user(session, username)
     if not user:
+        await asyncio.to_thread(verify_password, password, _TIMING_EQUALIZER_HASH)
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await asyncio.to_thread(verify_password, password, user.hashed_password):
         return None
     if user.disabled:
         return None
@@ -243,8 +644,75 @@ async def create_user(
         is_superuser=False,
     )
 
-    session.add(user_model)
-    await session.commit()
-    await session.refresh(user_model)
+    shards = get_shard_map()
+    if shards.sharded:
+        # Claim the email first; the directory's key keeps it unique across shards
+        session.add(
+            EmailDirectoryEntry(
+                email_normalized=user_model.email_normalized,
+                username_normalized=user_model.username_normalized,
+            )
+        )
+        await session.commit()
+
+    index = shards.shard_for(user_model.username_normalized)
+    try:
+        async with shards.session(index, session) as shard_session:
+            shard_session.add(user_model)
+            await shard_session.commit()
+            await shard_session.refresh(user_model)
+    except Exception:
+        if shards.sharded:
+            await _release_email(session, user_model.email_normalized)
+        raise
+
+    # Serve this process's next lookups from the primary so the new user is visible
+    get_session_router().record_write()
+    get_user_loads().forget(normalize_identity(username))
+    get_username_filter().add(user_model.username_normalized)
 
     return convert_user_in_db_to_user(convert_user_model_to_schema(user_model))
+
+
+async def _release_email(session: AsyncSession, email_key: str) -> None:
+    """Give up an email claimed for a user that couldn't be created."""
+    if session.in_transaction():
+        await session.rollback()
+    await session.execute(
+        delete(EmailDirectoryEntry).where(
+            EmailDirectoryEntry.email_normalized == email_key
+        )
+    )
+    await session.commit()
+
+
+async def revoke_user_tokens(session: AsyncSession, username: str) -> int | None:
+    """Revoke every token issued to a user by bumping their token epoch.
+
+    Returns the new epoch, or None if the user does not exist.
+    """
+    username_key = normalize_identity(username)
+    stmt = (
+        update(UserModel)
+        .where(UserModel.username_normalized == username_key)
+        .values(token_epoch=UserModel.token_epoch + 1)
+        .returning(UserModel.username, UserModel.token_epoch, UserModel.version)
+    )
+    shards = get_shard_map()
+    for index in shards.candidates(username_key):
+        async with shards.session(index, session) as shard_session:
+            row = (await shard_session.execute(stmt)).one_or_none()
+            await shard_session.commit()
+        if row is not None:
+            break
+
+    if row is None:
+        return None
+
+    # The caches are keyed by the username as stored, whatever its spelling here
+    epoch = int(row.token_epoch)
+    get_token_epochs().observe(row.username, epoch)
+    get_user_versions().observe(row.username, row.version)
+    get_session_router().record_write()
+    get_user_loads().forget(username_key)
+    return epoch
@@ -0,0 +1,426 @@
+"""Opaque reference tokens backed by a server-side session store.
+
+In ``TOKEN_MODE=opaque`` the API issues short random tokens instead of
+JWTs. Each token maps to a session record (the same claims a JWT would
+carry) in a pluggable store: a sharded in-memory dict, a Redis-protocol
+server, or a Postgres table. Resolving a token is one hash lookup, and
+revoking one is one delete, so there's no blacklist to consult or grow.
+
+Stores are keyed by the SHA-256 of the token rather than the token itself,
+so the store's contents can't be replayed as credentials.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import secrets
+import time
+from collections.abc import Callable, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.security import (
+    TokenService,
+    TokenType,
+    get_token_epochs,
+    get_token_service,
+    is_token_epoch_current,
+)
+from app.core.tracing import traced
+from app.models import TokenSession
+from app.schemas.user import User
+
+# Longest token worth hashing; anything longer can't be one of ours
+MAX_OPAQUE_TOKEN_LENGTH = 128
+
+
+class MemorySessionStore:
+    """In-process session store: a dict split into shards, with TTLs.
+
+    Expired records are dropped when read, and one shard is swept every
+    ``sweep_interval`` seconds on writes, so expiry never needs a pause to
+    scan every session. Sessions are per process: use a shared store when
+    running several workers.
+    """
+
+    def __init__(self, shards: int = 64, sweep_interval: float = 1.0) -> None:
+        self._shards: list[dict[str, dict[str, Any]]] = [{} for _ in range(shards)]
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_shard = 0
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def _shard(self, key: str) -> dict[str, dict[str, Any]]:
+        return self._shards[hash(key) % len(self._shards)]
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Get the live record stored under a key."""
+        shard = self._shard(key)
+        record = shard.get(key)
+        if record is not None and record["exp"] <= time.time():
+            del shard[key]
+            return None
+        return record
+
+    async def get_many(self, keys: Sequence[str]) -> list[dict[str, Any] | None]:
+        """Get the live records for many keys, in order."""
+        return [await self.get(key) for key in keys]
+
+    async def put(self, key: str, record: dict[str, Any]) -> None:
+        """Store a record until its ``exp`` (a Unix timestamp)."""
+        self._shard(key)[key] = record
+        self._maybe_sweep()
+
+    async def delete(self, key: str) -> bool:
+        """Delete a record. Returns whether it existed."""
+        return self._shard(key).pop(key, None) is not None
+
+    async def close(self) -> None:
+        """Release resources (nothing to release)."""
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        shard = self._shards[self._sweep_shard]
+        self._sweep_shard = (self._sweep_shard + 1) % len(self._shards)
+        cutoff = time.time()
+        for key in [key for key, record in shard.items() if record["exp"] <= cutoff]:
+            del shard[key]
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RespClient:
+    """Minimal asyncio client for the Redis serialization protocol (RESP2).
+
+    Speaks just enough of the protocol for the session store, against any
+    compatible server (Redis, Valkey, KeyDB, ...). Connections are opened
+    lazily and pooled, one command in flight per connection.
+    """
+
+    def __init__(self, host: str, port: int, pool_size: int = 8) -> None:
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: asyncio.Semaphore | None = None
+
+    @staticmethod
+    def encode(*args: str | bytes | int) -> bytes:
+        """Encode a command as an array of bulk strings."""
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    @classmethod
+    async def read_reply(cls, reader: asyncio.StreamReader) -> Any:
+        """Read one reply; error replies are raised as RespError."""
+        line = await reader.readuntil(b"\r\n")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = await reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            if count < 0:
+                return None
+            return [await cls.read_reply(reader) for _ in range(count)]
+        raise RespError(f"Unexpected reply: {line!r}")
+
+    async def execute(self, *args: str | bytes | int) -> Any:
+        """Send one command and return its reply."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            if self._idle:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                writer.write(self.encode(*args))
+                await writer.drain()
+                reply = await self.read_reply(reader)
+            except RespError:
+                self._idle.append((reader, writer))
+                raise
+            except BaseException:
+                # The connection may hold a half-read reply: don't reuse it
+                writer.close()
+                raise
+            self._idle.append((reader, writer))
+            return reply
+
+    async def close(self) -> None:
+        """Close every pooled connection."""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+            with contextlib.suppress(OSError):
+                await writer.wait_closed()
+
+
+class RespSessionStore:
+    """Session store on a Redis-protocol server, expiring keys server-side."""
+
+    def __init__(self, client: RespClient, prefix: str = "session:") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Get the live record stored under a key."""
+        data = await self.client.execute("GET", self.prefix + key)
+        return None if data is None else json.loads(data)
+
+    async def get_many(self, keys: Sequence[str]) -> list[dict[str, Any] | None]:
+        """Get the live records for many keys with one MGET."""
+        if not keys:
+            return []
+        values = await self.client.execute("MGET", *(self.prefix + key for key in keys))
+        return [None if data is None else json.loads(data) for data in values]
+
+    async def put(self, key: str, record: dict[str, Any]) -> None:
+        """Store a record until its ``exp`` (a Unix timestamp)."""
+        ttl_ms = max(1, int((record["exp"] - time.time()) * 1000))
+        await self.client.execute(
+            "SET", self.prefix + key, json.dumps(record), "PX", ttl_ms
+        )
+
+    async def delete(self, key: str) -> bool:
+        """Delete a record. Returns whether it existed."""
+        return bool(await self.client.execute("DEL", self.prefix + key))
+
+    async def close(self) -> None:
+        """Close the client's connections."""
+        await self.client.close()
+
+
+def _utc_timestamp(value: datetime) -> int:
+    """Unix time of a stored UTC datetime (SQLite hands them back naive)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class PostgresSessionStore:
+    """Session store in the ``token_sessions`` table.
+
+    Lookups are primary key probes. Expired rows are ignored on read and
+    removed by ``purge_expired``.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession]) -> None:
+        self._session_factory = session_factory
+
+    @staticmethod
+    def _to_record(row: TokenSession) -> dict[str, Any]:
+        return {
+            "sub": row.username,
+            "type": row.token_type,
+            "exp": _utc_timestamp(row.expires_at),
+            "iat": _utc_timestamp(row.issued_at),
+            "jti": row.jti,
+            "epoch": row.epoch,
+        }
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Get the live record stored under a key."""
+        return (await self.get_many([key]))[0]
+
+    async def get_many(self, keys: Sequence[str]) -> list[dict[str, Any] | None]:
+        """Get the live records for many keys with one query."""
+        if not keys:
+            return []
+        async with self._session_factory() as session:
+            result = await session.execute(
+                select(TokenSession).where(
+                    TokenSession.id.in_(set(keys)),
+                    TokenSession.expires_at > datetime.now(timezone.utc),
+                )
+            )
+            rows = {row.id: self._to_record(row) for row in result.scalars()}
+        return [rows.get(key) for key in keys]
+
+    async def put(self, key: str, record: dict[str, Any]) -> None:
+        """Store a record until its ``exp`` (a Unix timestamp)."""
+        async with self._session_factory() as session:
+            session.add(
+                TokenSession(
+                    id=key,
+                    username=record["sub"],
+                    token_type=record["type"],
+                    jti=record["jti"],
+                    epoch=record["epoch"],
+                    issued_at=datetime.fromtimestamp(record["iat"], timezone.utc),
+                    expires_at=datetime.fromtimestamp(record["exp"], timezone.utc),
+                )
+            )
+            await session.commit()
+
+    async def delete(self, key: str) -> bool:
+        """Delete a record. Returns whether it existed."""
+        async with self._session_factory() as session:
+            result = await session.execute(
+                delete(TokenSession)
+                .where(TokenSession.id == key)
+                .returning(TokenSession.id)
+            )
+            deleted = result.one_or_none() is not None
+            await session.commit()
+        return deleted
+
+    async def purge_expired(self) -> int:
+        """Delete expired sessions. Returns how many were deleted."""
+        async with self._session_factory() as session:
+            result = await session.execute(
+                delete(TokenSession)
+                .where(TokenSession.expires_at <= datetime.now(timezone.utc))
+                .returning(TokenSession.id)
+            )
+            purged = len(result.all())
+            await session.commit()
+        return purged
+
+    async def close(self) -> None:
+        """Release resources (sessions are closed after every call)."""
+
+
+SessionStore = MemorySessionStore | RespSessionStore | PostgresSessionStore
+
+
+class OpaqueTokenService:
+    """Issue random bearer tokens and resolve them through a session store.
+
+    Mirrors the async token interface of ``TokenService``; resolved records
+    have the same claims as decoded JWTs, so callers treat both alike.
+    """
+
+    def __init__(self, store: SessionStore, token_bytes: int = 32) -> None:
+        self.store = store
+        self.token_bytes = token_bytes
+
+    @staticmethod
+    def store_key(token: str) -> str:
+        """Key a token's record is stored under."""
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    async def issue_token(
+        self, user: User, token_type: TokenType, expires_delta: timedelta
+    ) -> str:
+        """Create a session for the user and return its token."""
+        token = secrets.token_urlsafe(self.token_bytes)
+        now = int(time.time())
+        await self.store.put(
+            self.store_key(token),
+            {
+                "sub": user.username,
+                "type": token_type.value,
+                "exp": now + int(expires_delta.total_seconds()),
+                "iat": now,
+                "jti": secrets.token_urlsafe(8),
+                "epoch": get_token_epochs().get(user.username),
+            },
+        )
+        return token
+
+    def _check(
+        self, record: dict[str, Any] | None, expected_type: TokenType | None
+    ) -> dict[str, Any] | None:
+        if record is None or record["exp"] <= time.time():
+            return None
+        if expected_type is None:
+            if record.get("type") not in {t.value for t in TokenType}:
+                return None
+        elif record.get("type") != expected_type.value:
+            return None
+        if not is_token_epoch_current(record):
+            return None
+        return record
+
+    @traced("session.lookup")
+    async def resolve_token(
+        self, token: str, expected_type: TokenType | None
+    ) -> dict[str, Any] | None:
+        """Get a token's claims, or None if it's unknown, expired or revoked.
+
+        Any known token type is accepted when ``expected_type`` is None.
+        """
+        if len(token) > MAX_OPAQUE_TOKEN_LENGTH:
+            return None
+        record = await self.store.get(self.store_key(token))
+        return self._check(record, expected_type)
+
+    async def resolve_tokens(
+        self, tokens: Sequence[str]
+    ) -> list[dict[str, Any] | None]:
+        """Resolve tokens of any type with a single store round trip."""
+        valid = [token for token in tokens if len(token) <= MAX_OPAQUE_TOKEN_LENGTH]
+        records = dict(
+            zip(
+                valid,
+                await self.store.get_many([self.store_key(t) for t in valid]),
+                strict=True,
+            )
+        )
+        return [self._check(records.get(token), None) for token in tokens]
+
+    async def revoke_token(self, token: str) -> None:
+        """Revoke a token by deleting its session."""
+        if len(token) <= MAX_OPAQUE_TOKEN_LENGTH:
+            await self.store.delete(self.store_key(token))
+
+
+TokenProvider = TokenService | OpaqueTokenService
+
+
+def build_session_store() -> SessionStore:
+    """Build the session store selected by settings."""
+    if settings.SESSION_STORE == "redis":
+        if not settings.REDIS_HOST:
+            raise ValueError("SESSION_STORE=redis requires REDIS_HOST")
+        return RespSessionStore(
+            RespClient(settings.REDIS_HOST, settings.REDIS_PORT or 6379)
+        )
+    if settings.SESSION_STORE == "postgres":
+        return PostgresSessionStore(AsyncSessionLocal)
+    return MemorySessionStore(shards=settings.SESSION_STORE_SHARDS)
+
+
+# Global instance - only used when TOKEN_MODE is "opaque"
+_opaque_token_service = OpaqueTokenService(build_session_store())
+
+
+def get_opaque_token_service() -> OpaqueTokenService:
+    """Get the opaque token service."""
+    return _opaque_token_service
+
+
+def get_token_provider() -> TokenProvider:
+    """Get the token service for the configured TOKEN_MODE."""
+    if settings.TOKEN_MODE == "opaque":
+        return get_opaque_token_service()
+    return get_token_service()
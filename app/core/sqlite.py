@@ -0,0 +1,77 @@
+"""Embedded SQLite engines for single-node installs.
+
+SQLite in WAL mode lets readers run alongside a writer, but only one
+connection can write at a time, and a transaction that reads and then
+writes fails outright (rather than waiting) if another connection wrote in
+between. So instead of letting every pooled connection contend for the
+write lock, the primary engine holds exactly one connection, and requests
+queue for it in the pool; read-only sessions use a separate pool of
+``query_only`` connections, wired in as the session router's replica.
+
+Every connection applies the same pragmas: ``synchronous=NORMAL`` (durable
+at each WAL checkpoint, never corrupt), a memory-mapped read path and a
+larger page cache. ``busy_timeout`` covers the short waits on other
+processes, e.g. several uvicorn workers or a migration.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import settings
+
+
+def sqlite_pragmas(*, read_only: bool = False) -> dict[str, Any]:
+    """Pragmas applied to every new connection, in order."""
+    pragmas: dict[str, Any] = {
+        "journal_mode": "WAL",
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        # Negative sizes are in KiB rather than pages
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KIB,
+        "foreign_keys": "ON",
+        "temp_store": "MEMORY",
+    }
+    if read_only:
+        # journal_mode is stored in the file; only the writer needs to set it
+        del pragmas["journal_mode"]
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def _apply_pragmas(engine: AsyncEngine, pragmas: dict[str, Any]) -> None:
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection: Any, _record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def create_sqlite_engines(
+    url: str, *, reader_pool_size: int | None = None
+) -> tuple[AsyncEngine, AsyncEngine]:
+    """Create the single-connection writer engine and a reader engine."""
+    writer = create_async_engine(
+        url,
+        future=True,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITER_TIMEOUT_SECONDS,
+    )
+    _apply_pragmas(writer, sqlite_pragmas())
+
+    reader = create_async_engine(
+        url,
+        future=True,
+        pool_size=reader_pool_size or settings.SQLITE_READER_POOL_SIZE,
+        max_overflow=0,
+    )
+    _apply_pragmas(reader, sqlite_pragmas(read_only=True))
+    return writer, reader
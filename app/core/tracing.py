@@ -0,0 +1,454 @@
+"""Lightweight request tracing with OpenTelemetry-compatible semantics.
+
+Spans use OpenTelemetry's id formats, span kinds and attribute names, and
+trace context is propagated with W3C ``traceparent`` headers, so exported
+spans line up with traces from other services. Spans go to an exporter:
+in memory (for tests) or an NDJSON file (for offline analysis).
+
+When tracing is disabled every hook reduces to a single attribute check.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, Any, Literal, ParamSpec, TypeVar, cast
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logging import bind_request_context, route_template
+
+SpanKind = Literal["internal", "server", "client"]
+StatusCode = Literal["UNSET", "OK", "ERROR"]
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# Longest SQL statement kept in a span attribute
+MAX_STATEMENT_LENGTH = 1000
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: str | None = None,
+        kind: SpanKind = "internal",
+        attributes: Mapping[str, Any] | None = None,
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: dict[str, Any] = dict(attributes or {})
+        self.events: list[dict[str, Any]] = []
+        self.status: StatusCode = "UNSET"
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+
+    @property
+    def duration_ms(self) -> float | None:
+        """Duration in milliseconds, or None while the span is open."""
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1_000_000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set one attribute."""
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Mark the span as failed and attach an exception event."""
+        self.status = "ERROR"
+        self.events.append(
+            {
+                "name": "exception",
+                "time_ns": time.time_ns(),
+                "attributes": {
+                    "exception.type": type(exc).__qualname__,
+                    "exception.message": str(exc),
+                },
+            }
+        )
+
+    def traceparent(self) -> str:
+        """W3C traceparent header value for calls made within this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize in the shape of OpenTelemetry's JSON span output."""
+        return {
+            "name": self.name,
+            "context": {"trace_id": self.trace_id, "span_id": self.span_id},
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start_time_ns": self.start_ns,
+            "end_time_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": {"status_code": self.status},
+            "events": self.events,
+        }
+
+
+class InMemorySpanExporter:
+    """Keep finished spans in a list, for tests."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        """Store a finished span."""
+        self.spans.append(span)
+
+    def clear(self) -> None:
+        """Forget all stored spans."""
+        self.spans.clear()
+
+    def shutdown(self) -> None:
+        """Nothing to release."""
+
+
+class FileSpanExporter:
+    """Append finished spans to a file as NDJSON, for offline analysis.
+
+    Writes go to a large userspace buffer, so exporting a span rarely
+    touches the disk; ``shutdown`` flushes it.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20) -> None:
+        self.path = path
+        self.buffer_size = buffer_size
+        self._file: IO[str] | None = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        """Append a finished span."""
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(  # noqa: SIM115 - closed in shutdown()
+                    self.path, "a", buffering=self.buffer_size, encoding="utf-8"
+                )
+            self._file.write(line)
+
+    def shutdown(self) -> None:
+        """Flush and close the file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+SpanExporter = InMemorySpanExporter | FileSpanExporter
+
+# The innermost open span in the current task or thread
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+# Set within a trace that was not sampled, so nested spans stay unrecorded
+_sampled_out: ContextVar[bool] = ContextVar("sampled_out", default=False)
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str, bool] | None:
+    """Parse a W3C traceparent header into (trace id, parent id, sampled)."""
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 0x01)
+
+
+class Tracer:
+    """Create spans and hand finished ones to an exporter."""
+
+    def __init__(
+        self,
+        exporter: SpanExporter | None = None,
+        *,
+        enabled: bool = False,
+        sample_rate: float = 1.0,
+    ) -> None:
+        self.exporter = exporter
+        self.enabled = enabled and exporter is not None
+        self.sample_rate = sample_rate
+
+    def configure(
+        self,
+        exporter: SpanExporter | None,
+        *,
+        enabled: bool = True,
+        sample_rate: float = 1.0,
+    ) -> None:
+        """Swap the exporter and switch tracing on or off."""
+        if self.exporter is not None and self.exporter is not exporter:
+            self.exporter.shutdown()
+        self.exporter = exporter
+        self.enabled = enabled and exporter is not None
+        self.sample_rate = sample_rate
+
+    def shutdown(self) -> None:
+        """Flush the exporter; it reopens on the next export."""
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+    def current_span(self) -> Span | None:
+        """Get the innermost open span, if any."""
+        return _current_span.get()
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        *,
+        kind: SpanKind = "internal",
+        attributes: Mapping[str, Any] | None = None,
+        parent: tuple[str, str, bool] | None = None,
+    ) -> Iterator[Span | None]:
+        """Open a span around the enclosed block.
+
+        Without an explicit ``parent`` (from ``parse_traceparent``) the span
+        joins the current trace; a new trace is started, and sampled, only
+        when there is no current span. Yields None when not recording.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            current = _current_span.get()
+            if current is not None:
+                trace_id, parent_id, sampled = current.trace_id, current.span_id, True
+            elif _sampled_out.get():
+                yield None
+                return
+            else:
+                trace_id, parent_id = secrets.token_hex(16), None
+                sampled = random.random() < self.sample_rate
+        if not sampled:
+            sampled_token = _sampled_out.set(True)
+            try:
+                yield None
+            finally:
+                _sampled_out.reset(sampled_token)
+            return
+
+        span = Span(name, trace_id, parent_id, kind, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end(span)
+
+    def start_span(
+        self,
+        name: str,
+        *,
+        kind: SpanKind = "internal",
+        attributes: Mapping[str, Any] | None = None,
+    ) -> Span | None:
+        """Start a child of the current span without making it current.
+
+        For operations whose start and end happen in different callbacks;
+        finish it with ``end``. Returns None outside a recorded trace.
+        """
+        current = _current_span.get()
+        if not self.enabled or current is None:
+            return None
+        return Span(name, current.trace_id, current.span_id, kind, attributes)
+
+    def end(self, span: Span) -> None:
+        """Finish a span and export it."""
+        span.end_ns = time.time_ns()
+        exporter = self.exporter
+        if exporter is not None:
+            exporter.export(span)
+
+
+def build_exporter() -> SpanExporter | None:
+    """Create the exporter selected by settings."""
+    if settings.TRACING_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    if settings.TRACING_EXPORTER == "memory":
+        return InMemorySpanExporter()
+    return None
+
+
+# Global instance - the hooks below all report to it
+_tracer = Tracer(
+    build_exporter(),
+    enabled=settings.TRACING_ENABLED,
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+)
+
+
+def get_tracer() -> Tracer:
+    """Get the application tracer."""
+    return _tracer
+
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+def _keep_signature(wrapper: Callable[..., Any], func: Callable[..., Any]) -> None:
+    """Give ``wrapper`` the signature of ``func``, annotations evaluated.
+
+    FastAPI before 0.118 evaluates string annotations (from ``from __future__
+    import annotations``) in the wrapper's globals, which are this module's.
+    If a name isn't defined yet, the plain signature is kept.
+    """
+    try:
+        signature = inspect.signature(func, eval_str=True)
+    except NameError:
+        return
+    setattr(wrapper, "__signature__", signature)  # noqa: B010
+
+
+def traced(
+    name: str, *, kind: SpanKind = "internal"
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Wrap a function, sync or async, in a span named ``name``.
+
+    The wrapper keeps the function's signature, so it is safe on FastAPI
+    dependencies.
+    """
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        if inspect.iscoroutinefunction(func):
+            async_func = cast(Callable[P, Awaitable[Any]], func)
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> Any:
+                if not _tracer.enabled:
+                    return await async_func(*args, **kwargs)
+                with _tracer.span(name, kind=kind):
+                    return await async_func(*args, **kwargs)
+
+            _keep_signature(async_wrapper, func)
+            return cast(Callable[P, R], async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with _tracer.span(name, kind=kind):
+                return func(*args, **kwargs)
+
+        _keep_signature(wrapper, func)
+        return wrapper
+
+    return decorator
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_sql_span(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    if not _tracer.enabled:
+        return
+    span = _tracer.start_span(
+        statement.lstrip().split(" ", 1)[0].upper(),
+        kind="client",
+        attributes={
+            "db.system.name": conn.dialect.name,
+            "db.query.text": statement[:MAX_STATEMENT_LENGTH],
+        },
+    )
+    if span is not None:
+        conn.info["trace_span"] = span
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_sql_span(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    span = conn.info.pop("trace_span", None)
+    if span is not None:
+        _tracer.end(span)
+
+
+@event.listens_for(Engine, "handle_error")
+def _fail_sql_span(exception_context: Any) -> None:
+    connection = exception_context.connection
+    span = connection.info.pop("trace_span", None) if connection is not None else None
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        _tracer.end(span)
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a server span for each HTTP request.
+
+    Continues the caller's trace when the request carries a valid
+    ``traceparent`` header and returns the server span's own
+    ``traceparent`` on the response.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+
+        method = scope["method"]
+        with _tracer.span(
+            method,
+            kind="server",
+            parent=parent,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            bind_request_context(trace_id=span.trace_id)
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "ERROR"
+                    headers = list(message.get("headers", []))
+                    headers.append((b"traceparent", span.traceparent().encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                template = route_template(scope)
+                if template is not None:
+                    span.set_attribute("http.route", template)
+                    span.name = f"{method} {template}"
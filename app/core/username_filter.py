@@ -0,0 +1,239 @@
+"""Per-worker Bloom filter of existing usernames.
+
+Credential-stuffing traffic mostly tries usernames that don't exist. The
+filter answers "definitely not a user" from memory, so those attempts skip
+loading a user and only get an index probe to confirm it. It never misses a
+username it has seen, and a false "maybe" (about ``error_rate`` of unknown
+names) just falls through to the normal lookup.
+
+The filter is advisory: it can miss users it hasn't seen yet, so a "no" is
+never taken as final. Each worker builds its filter at startup from a
+streamed scan of the users table, adds users it creates itself, and picks up
+users created by other workers by re-scanning the tail of the table every
+``refresh_interval`` seconds. Until then, and for rows a tail scan skipped
+because they committed long after their id was assigned, the probe finds
+the user and adds it. The filter is also rebuilt from scratch every
+``rebuild_interval`` seconds. Until the first build completes every username
+is a "maybe".
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import math
+import time
+from collections.abc import Callable, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_shard_map
+from app.core.pagination import estimate_user_count
+from app.models import User as UserModel
+
+logger = logging.getLogger(__name__)
+
+# Ids are assigned before commit, so rows can land out of id order; tail
+# scans re-read this many rows up to the highest id seen to catch stragglers.
+# Counted in rows, not ids: with sharding, consecutive ids on a shard are
+# SHARD_ID_STRIDE apart.
+TAIL_OVERLAP = 1000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Sized for ``capacity`` items at the given false positive rate; indexes
+    come from one BLAKE2b digest by double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        """Add an item."""
+        for index in self._indexes(item):
+            self._bits[index >> 3] |= 1 << (index & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[i >> 3] & (1 << (i & 7)) for i in self._indexes(item))
+
+
+class UsernameFilter:
+    """Bloom filter of normalized usernames, kept in sync with the table."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        min_capacity: int = 100_000,
+        error_rate: float = 0.01,
+        refresh_interval: float = 5.0,
+        rebuild_interval: float = 600.0,
+        batch_size: int = 10_000,
+    ) -> None:
+        self._session_factory = session_factory
+        self.min_capacity = min_capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.batch_size = batch_size
+        self._filter: BloomFilter | None = None
+        self._added_while_building: list[str] | None = None
+        # Highest user id scanned on each shard
+        self._max_ids: dict[int, int] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the filter has been built and can rule usernames out."""
+        return self._filter is not None
+
+    def might_exist(self, username_key: str) -> bool:
+        """Check a normalized username; False means it definitely doesn't exist."""
+        return self._filter is None or username_key in self._filter
+
+    def add(self, username_key: str) -> None:
+        """Record a newly created (normalized) username."""
+        if self._filter is not None:
+            self._filter.add(username_key)
+        if self._added_while_building is not None:
+            self._added_while_building.append(username_key)
+
+    async def build(self) -> None:
+        """(Re)build the filter from a streamed scan of every username.
+
+        The filter is sized from the table's estimated row count (with room
+        to grow) and swapped in once complete.
+        """
+        self._added_while_building = []
+        try:
+            async with self._session_factory() as session:
+                estimate = await estimate_user_count(session)
+                bloom = BloomFilter(
+                    max(self.min_capacity, 2 * estimate), self.error_rate
+                )
+                max_ids = await self._scan_shards(session, bloom, after_ids=None)
+            for username_key in self._added_while_building:
+                bloom.add(username_key)
+        finally:
+            self._added_while_building = None
+        self._filter = bloom
+        self._advance(max_ids)
+
+    async def refresh(self) -> None:
+        """Add users created since the last scan, e.g. by other workers."""
+        if self._filter is None:
+            return
+        async with self._session_factory() as session:
+            max_ids = await self._scan_shards(
+                session, self._filter, after_ids=self._max_ids
+            )
+        self._advance(max_ids)
+
+    def _advance(self, max_ids: dict[int, int]) -> None:
+        for index, max_id in max_ids.items():
+            self._max_ids[index] = max(self._max_ids.get(index, 0), max_id)
+
+    async def _scan_shards(
+        self,
+        session: AsyncSession,
+        bloom: BloomFilter,
+        after_ids: dict[int, int] | None,
+    ) -> dict[int, int]:
+        """Scan every user shard, each past its own last seen id if given."""
+        shards = get_shard_map()
+        max_ids: dict[int, int] = {}
+        for index in range(len(shards)):
+            async with shards.session(index, session) as shard_session:
+                after_id = None
+                if after_ids is not None:
+                    after_id = await self._tail_start(
+                        shard_session, after_ids.get(index, 0)
+                    )
+                max_ids[index] = await self._scan(shard_session, bloom, after_id)
+        return max_ids
+
+    async def _tail_start(self, session: AsyncSession, max_id: int) -> int:
+        """Get the id a tail scan starts after: TAIL_OVERLAP rows below ``max_id``."""
+        start = await session.scalar(
+            select(UserModel.id)
+            .where(UserModel.id <= max_id)
+            .order_by(UserModel.id.desc())
+            .offset(TAIL_OVERLAP)
+            .limit(1)
+        )
+        return start or 0
+
+    async def _scan(
+        self, session: AsyncSession, bloom: BloomFilter, after_id: int | None
+    ) -> int:
+        stmt = select(UserModel.id, UserModel.username_normalized)
+        if after_id is not None:
+            stmt = stmt.where(UserModel.id > after_id)
+        max_id = 0
+        result = await session.stream(stmt.execution_options(yield_per=self.batch_size))
+        async for partition in result.partitions():
+            for user_id, username_key in partition:
+                bloom.add(username_key)
+                max_id = max(max_id, user_id)
+        return max_id
+
+    def start(self) -> None:
+        """Build the filter and keep it fresh in the background."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop background building and refreshing."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.build()
+            except Exception:
+                # A previously built filter stays in use meanwhile
+                logger.exception("Failed to build the username filter, will retry")
+                await asyncio.sleep(self.refresh_interval)
+                continue
+            rebuild_at = time.monotonic() + self.rebuild_interval
+            while time.monotonic() < rebuild_at:
+                await asyncio.sleep(self.refresh_interval)
+                try:
+                    await self.refresh()
+                except Exception:
+                    logger.exception("Failed to refresh the username filter")
+
+
+# Global instance - built and refreshed by the application lifespan
+_username_filter = UsernameFilter(
+    AsyncSessionLocal,
+    error_rate=settings.USERNAME_FILTER_ERROR_RATE,
+    refresh_interval=settings.USERNAME_FILTER_REFRESH_SECONDS,
+    rebuild_interval=settings.USERNAME_FILTER_REBUILD_SECONDS,
+)
+
+
+def get_username_filter() -> UsernameFilter:
+    """Get the username filter."""
+    return _username_filter
@@ -1,15 +1,69 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 from app.api import router
-from app.api.exceptions import oauth2_exception_handler, validation_exception_handler
+from app.api.exceptions import (
+    database_unavailable_handler,
+    oauth2_exception_handler,
+    validation_exception_handler,
+)
 from app.api.health import router as health_router
+from app.api.metrics import router as metrics_router
 from app.core.config import settings
+from app.core.database import DatabaseUnavailableError, get_session_router
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.load_shedding import LoadSheddingMiddleware
+from app.core.logging import RequestContextMiddleware, setup_logging, shutdown_logging
+from app.core.login_events import get_login_event_writer
+from app.core.loop_monitor import get_loop_monitor
+from app.core.memory import get_memory_profiler
 from app.core.middleware import limiter, rate_limit_exceeded_handler
 from app.core.security import OAuth2Error
+from app.core.sessions import get_opaque_token_service
+from app.core.tracing import TracingMiddleware, get_tracer
+from app.core.username_filter import get_username_filter
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run background services for the lifetime of the application."""
+    setup_logging()
+    login_event_writer = get_login_event_writer()
+    login_event_writer.start()
+    username_filter = get_username_filter()
+    if settings.USERNAME_FILTER_ENABLED:
+        username_filter.start()
+    loop_monitor = get_loop_monitor()
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    memory_profiler = get_memory_profiler()
+    if settings.MEMORY_PROFILING_ENABLED:
+        memory_profiler.start()
+    session_router = get_session_router()
+    if session_router.has_replicas:
+        session_router.start()
+    try:
+        yield
+    finally:
+        await session_router.stop()
+        if settings.MEMORY_PROFILING_ENABLED:
+            memory_profiler.stop()
+        await loop_monitor.stop()
+        await username_filter.stop()
+        # Flush buffered login events and log records before the process exits
+        await login_event_writer.stop()
+        await get_opaque_token_service().store.close()
+        get_tracer().shutdown()
+        shutdown_logging()
+
 
 # Add OpenAPI customization
 app = FastAPI(
@@ -18,8 +72,24 @@ app = FastAPI(
     version=settings.VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+# Shed load with fast 503s once a route class is over capacity
+if settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        retry_after_seconds=settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS,
+    )
+
+# Answer retried logins and registrations from the first attempt's response;
+# outside load shedding so replays don't take a concurrency slot
+if settings.IDEMPOTENCY_ENABLED:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        paths=[f"{settings.V1_STR}/register", f"{settings.V1_STR}/token"],
+    )
+
 # Add rate limiting
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
@@ -34,13 +104,22 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+# Server span per request; no-op unless TRACING_ENABLED
+app.add_middleware(TracingMiddleware)
+
+# Outermost: bind request context and log every request, including rejections
+app.add_middleware(RequestContextMiddleware)
+
 # Register exception handlers
 app.add_exception_handler(OAuth2Error, oauth2_exception_handler)  # type: ignore[arg-type]
 app.add_exception_handler(RequestValidationError, validation_exception_handler)  # type: ignore[arg-type]
 app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)  # type: ignore[arg-type]
+for error in (DatabaseUnavailableError, DBAPIError, PoolTimeoutError):
+    app.add_exception_handler(error, database_unavailable_handler)
 
 # Include health endpoint at root level for orchestration tools
 app.include_router(health_router)
+app.include_router(metrics_router)
 
 # Include versioned API routes
 app.include_router(router, prefix=settings.V1_STR)
@@ -1,5 +1,15 @@
 # This file makes the models directory a Python package
 from app.models.base import Base
-from app.models.user import User
+from app.models.email_directory import EmailDirectoryEntry
+from app.models.login_event import LoginEvent
+from app.models.token_session import TokenSession
+from app.models.user import User, normalize_identity
 
-__all__ = ["Base", "User"]
+__all__ = [
+    "Base",
+    "EmailDirectoryEntry",
+    "LoginEvent",
+    "TokenSession",
+    "User",
+    "normalize_identity",
+]
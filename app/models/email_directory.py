@@ -0,0 +1,22 @@
+"""Email directory database model."""
+
+from __future__ import annotations
+
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class EmailDirectoryEntry(Base):
+    """Which user owns an email, kept on the primary when users are sharded.
+
+    Users are spread across shards by username, so the per-shard unique
+    index alone can't stop two shards taking the same email; claiming a row
+    here first can.
+    """
+
+    __tablename__ = "email_directory"
+
+    email_normalized: Mapped[str] = mapped_column(String(255), primary_key=True)
+    username_normalized: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -0,0 +1,44 @@
+"""Login event database model."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class LoginEvent(Base):
+    """One login attempt, successful or not, kept for security review."""
+
+    __tablename__ = "login_events"
+    __table_args__ = (
+        # Per-user login history, newest first
+        Index("ix_login_events_user_id_occurred_at", "user_id", "occurred_at"),
+    )
+
+    # SQLite only auto-assigns ids to INTEGER PRIMARY KEY columns
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True
+    )
+    # Null when the attempted username doesn't exist (or was since deleted)
+    user_id: Mapped[int | None] = mapped_column(
+        ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    username: Mapped[str] = mapped_column(String(50), nullable=False)
+    occurred_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    ip_address: Mapped[str | None] = mapped_column(String(45), nullable=True)
+    user_agent: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    success: Mapped[bool] = mapped_column(Boolean, nullable=False)
@@ -0,0 +1,28 @@
+"""Token session database model."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class TokenSession(Base):
+    """Server-side record of an opaque token, keyed by the token's hash."""
+
+    __tablename__ = "token_sessions"
+
+    # SHA-256 of the token, so the table never holds usable tokens
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    username: Mapped[str] = mapped_column(String(50), nullable=False)
+    token_type: Mapped[str] = mapped_column(String(16), nullable=False)
+    jti: Mapped[str] = mapped_column(String(32), nullable=False)
+    epoch: Mapped[int] = mapped_column(Integer, nullable=False)
+    issued_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Indexed for purging expired sessions
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
@@ -2,16 +2,55 @@
 
 from __future__ import annotations
 
-from sqlalchemy import Boolean, String
-from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import (
+    Boolean,
+    Connection,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Table,
+    event,
+    text,
+)
+from sqlalchemy.orm import Mapped, mapped_column, validates
 
 from app.models.base import Base
 
 
+def normalize_identity(value: str) -> str:
+    """Normalize a username or email for case-insensitive lookups."""
+    return value.lower()
+
+
 class User(Base):
     """User database model."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        # Partial indexes backing keyset pagination over filtered listings
+        Index(
+            "ix_users_active_id",
+            "id",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active"),
+        ),
+        Index(
+            "ix_users_active_username",
+            "username",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active"),
+        ),
+        Index(
+            "ix_users_superuser_id",
+            "id",
+            postgresql_where=text("is_superuser"),
+            sqlite_where=text("is_superuser"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     username: Mapped[str] = mapped_column(
@@ -20,7 +59,79 @@ class User(Base):
     email: Mapped[str] = mapped_column(
         String(255), unique=True, index=True, nullable=False
     )
+    # Lookup keys: every login, registration and duplicate check probes these
+    username_normalized: Mapped[str] = mapped_column(
+        String(50), unique=True, index=True, nullable=False
+    )
+    email_normalized: Mapped[str] = mapped_column(
+        String(255), unique=True, index=True, nullable=False
+    )
     full_name: Mapped[str] = mapped_column(String(100), nullable=False)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     is_superuser: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    token_epoch: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    last_login_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Profile version, behind the /users/me ETag: the users_bump_version
+    # trigger bumps it when a column the User schema shows changes, so
+    # logins and token revocations leave it alone
+    version: Mapped[int] = mapped_column(Integer, server_default="1", nullable=False)
+
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+    @validates("username", "email")
+    def _set_normalized(self, key: str, value: str) -> str:
+        """Keep the normalized lookup columns in sync with their sources."""
+        setattr(self, f"{key}_normalized", normalize_identity(value))
+        return value
+
+
+# The trigger also covers bulk UPDATE statements, which the ORM never sees.
+# Keep its column list in step with what the User schema shows.
+USER_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION users_bump_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+USER_VERSION_TRIGGER = """
+CREATE TRIGGER users_bump_version
+BEFORE UPDATE ON users
+FOR EACH ROW WHEN (
+    (OLD.username, OLD.email, OLD.full_name, OLD.is_active, OLD.is_superuser)
+    IS DISTINCT FROM
+    (NEW.username, NEW.email, NEW.full_name, NEW.is_active, NEW.is_superuser)
+)
+EXECUTE FUNCTION users_bump_version()
+"""
+# SQLite triggers can't assign to NEW, so bump the row again after the update
+SQLITE_USER_VERSION_TRIGGER = """
+CREATE TRIGGER users_bump_version
+AFTER UPDATE ON users
+FOR EACH ROW WHEN NEW.version = OLD.version AND (
+    NEW.username IS NOT OLD.username
+    OR NEW.email IS NOT OLD.email
+    OR NEW.full_name IS NOT OLD.full_name
+    OR NEW.is_active IS NOT OLD.is_active
+    OR NEW.is_superuser IS NOT OLD.is_superuser
+)
+BEGIN
+    UPDATE users SET version = OLD.version + 1 WHERE id = NEW.id;
+END
+"""
+
+
+@event.listens_for(User.__table__, "after_create")
+def _create_version_trigger(target: Table, connection: Connection, **kw: Any) -> None:
+    """Install the version trigger whenever the table is created outside Alembic."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(USER_VERSION_FUNCTION))
+        connection.execute(text(USER_VERSION_TRIGGER))
+    elif connection.dialect.name == "sqlite":
+        connection.execute(text(SQLITE_USER_VERSION_TRIGGER))
@@ -0,0 +1,53 @@
+"""Memory profiling schemas."""
+
+from __future__ import annotations
+
+from pydantic import BaseModel, Field
+
+
+class AllocationStat(BaseModel):
+    """Memory allocated from one source line, file or traceback."""
+
+    location: list[str] = Field(
+        ..., description="Frames as file:line, oldest first (one unless traceback)"
+    )
+    size_bytes: int
+    count: int
+    size_diff_bytes: int | None = None
+    count_diff: int | None = None
+
+
+class MemorySnapshot(BaseModel):
+    """A stored tracemalloc snapshot and its largest allocation sites."""
+
+    id: int
+    traced_bytes: int
+    peak_bytes: int
+    top: list[AllocationStat]
+
+
+class MemoryDiff(BaseModel):
+    """What grew (or shrank) between two snapshots, largest change first."""
+
+    base_id: int
+    target_id: int
+    size_diff_bytes: int
+    top: list[AllocationStat]
+
+
+class StructureSize(BaseModel):
+    """Size of one long-lived in-process structure."""
+
+    entries: int | None = None
+    size_bytes: int | None = Field(
+        None, description="Approximate heap bytes, when they can be measured"
+    )
+
+
+class MemoryStructures(BaseModel):
+    """Sizes of the in-process structures that grow with traffic."""
+
+    tracing: bool
+    traced_bytes: int | None = None
+    peak_bytes: int | None = None
+    structures: dict[str, StructureSize]
@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+MAX_INTROSPECTION_TOKENS = 100
 
 
 class Token(BaseModel):
@@ -32,3 +34,32 @@ class TokenData(BaseModel):
     """Token payload data."""
 
     username: str | None = None
+
+
+class IntrospectionRequest(BaseModel):
+    """Schema for batch token introspection requests."""
+
+    tokens: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_INTROSPECTION_TOKENS,
+        description=f"Between 1 and {MAX_INTROSPECTION_TOKENS} tokens",
+    )
+
+
+class TokenIntrospection(BaseModel):
+    """Introspection result for a single token (RFC 7662 claims)."""
+
+    active: bool
+    sub: str | None = None
+    username: str | None = None
+    token_type: str | None = None
+    exp: int | None = None
+    iat: int | None = None
+    jti: str | None = None
+
+
+class IntrospectionResponse(BaseModel):
+    """Introspection results, in the same order as the requested tokens."""
+
+    results: list[TokenIntrospection]
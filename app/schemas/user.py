@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
-from pydantic import BaseModel, EmailStr, Field
+from typing import Self
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
+
+MAX_LOOKUP_KEYS = 100
 
 
 class UserBase(BaseModel):
@@ -41,3 +45,58 @@ class UserInDB(UserBase):
     """User schema as stored in database (with hashed password)."""
 
     hashed_password: str
+    token_epoch: int = 0
+    is_superuser: bool = False
+    version: int = 1
+
+
+class UserLookupRequest(BaseModel):
+    """Schema for batched user lookups by username or by id (not both)."""
+
+    usernames: list[str] | None = Field(
+        default=None, min_length=1, max_length=MAX_LOOKUP_KEYS
+    )
+    ids: list[int] | None = Field(
+        default=None, min_length=1, max_length=MAX_LOOKUP_KEYS
+    )
+
+    @model_validator(mode="after")
+    def check_exactly_one_key_list(self) -> Self:
+        if (self.usernames is None) == (self.ids is None):
+            raise ValueError("Provide exactly one of 'usernames' or 'ids'")
+        return self
+
+
+class UserLookupResult(BaseModel):
+    """Lookup result for one requested key; ``user`` is None on a miss."""
+
+    key: str | int
+    found: bool
+    user: User | None = None
+
+
+class UserLookupResponse(BaseModel):
+    """Lookup results, in the same order as the requested keys."""
+
+    results: list[UserLookupResult]
+
+
+class UserListItem(BaseModel):
+    """User as shown in administrative listings."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: str
+    email: str
+    full_name: str
+    is_active: bool
+    is_superuser: bool
+
+
+class UserPage(BaseModel):
+    """One page of a keyset-paginated user listing."""
+
+    items: list[UserListItem]
+    next_cursor: str | None = None
+    estimated_total: int
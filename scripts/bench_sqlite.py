@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark the embedded SQLite mode against Postgres.
+
+Runs the same database workloads through each backend's engines, as the
+app configures them: registrations (one INSERT per transaction), username
+lookups on the read path, and a mixed 90/10 read/write load, all at the
+given concurrency. Password hashing is left out so the numbers reflect the
+database alone.
+
+SQLite runs against a fresh file (WAL, one writer connection and a reader
+pool). Postgres runs in a throwaway schema, dropped afterwards, of the
+database at --postgres-url (default: the configured DATABASE_URL).
+
+Usage:
+    python scripts/bench_sqlite.py --users 5000 --lookups 20000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import secrets
+import statistics
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.sqlite import create_sqlite_engines
+from app.models import User as UserModel
+from app.models.base import Base
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FAKE_HASH = "$2b$12$" + "x" * 53
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--postgres-url",
+        default=None if settings.is_sqlite else str(settings.DATABASE_URL),
+        help="Postgres database to benchmark against (omit to skip Postgres)",
+    )
+    parser.add_argument(
+        "--sqlite-path",
+        default=None,
+        help="SQLite file to create (default: a temporary file)",
+    )
+    return parser.parse_args()
+
+
+async def run_concurrently(
+    count: int, concurrency: int, operation: Callable[[int], Awaitable[object]]
+) -> dict[str, str]:
+    """Run ``operation(i)`` for every i over ``concurrency`` workers."""
+    latencies: list[float] = []
+    next_index = iter(range(count))
+
+    async def worker() -> None:
+        for index in next_index:
+            started = time.perf_counter()
+            await operation(index)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "ops/s": f"{count / elapsed:.0f}",
+        "p50 ms": f"{quantiles[49] * 1000:.2f}",
+        "p99 ms": f"{quantiles[98] * 1000:.2f}",
+    }
+
+
+async def bench(
+    name: str, writer: AsyncEngine, reader: AsyncEngine, args: argparse.Namespace
+) -> list[dict[str, str]]:
+    """Run every workload against one backend."""
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    def write_session() -> AsyncSession:
+        return AsyncSession(writer, expire_on_commit=False)
+
+    def read_session() -> AsyncSession:
+        return AsyncSession(reader, expire_on_commit=False)
+
+    async def register(index: int) -> None:
+        async with write_session() as session:
+            session.add(
+                UserModel(
+                    username=f"BenchUser{index}",
+                    email=f"benchuser{index}@example.com",
+                    full_name=f"Bench User {index}",
+                    hashed_password=FAKE_HASH,
+                    is_active=True,
+                    is_superuser=False,
+                )
+            )
+            await session.commit()
+
+    async def lookup(_: int) -> None:
+        key = f"benchuser{random.randrange(args.users)}"
+        async with read_session() as session:
+            user = await session.scalar(
+                select(UserModel).where(UserModel.username_normalized == key)
+            )
+        assert user is not None
+
+    async def record_login(_: int) -> None:
+        key = f"benchuser{random.randrange(args.users)}"
+        async with write_session() as session:
+            await session.execute(
+                update(UserModel)
+                .where(UserModel.username_normalized == key)
+                .values(last_login_at=datetime.now(timezone.utc))
+            )
+            await session.commit()
+
+    async def mixed(index: int) -> None:
+        await (record_login if index % 10 == 0 else lookup)(index)
+
+    rows = []
+    for workload, count, operation in (
+        ("register", args.users, register),
+        ("lookup", args.lookups, lookup),
+        ("mixed 90/10", args.lookups, mixed),
+    ):
+        result = await run_concurrently(count, args.concurrency, operation)
+        rows.append({"backend": name, "workload": workload, **result})
+        logger.info(f"{name} {workload}: {result}")
+    return rows
+
+
+async def bench_sqlite(args: argparse.Namespace) -> list[dict[str, str]]:
+    """Benchmark SQLite in a fresh database file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.sqlite_path or Path(tmp) / "bench.db")
+        if path.exists():
+            raise SystemExit(f"{path} already exists; pass a new file")
+        writer, reader = create_sqlite_engines(
+            f"sqlite+aiosqlite:///{path}", reader_pool_size=args.concurrency
+        )
+        try:
+            return await bench("sqlite", writer, reader, args)
+        finally:
+            await reader.dispose()
+            await writer.dispose()
+
+
+async def bench_postgres(args: argparse.Namespace) -> list[dict[str, str]]:
+    """Benchmark Postgres in a throwaway schema."""
+    schema = f"bench_{secrets.token_hex(4)}"
+    admin = create_async_engine(args.postgres_url)
+    async with admin.begin() as conn:
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+
+    def engine() -> AsyncEngine:
+        return create_async_engine(
+            args.postgres_url,
+            pool_size=args.concurrency,
+            connect_args={"server_settings": {"search_path": schema}},
+        )
+
+    writer, reader = engine(), engine()
+    try:
+        return await bench("postgres", writer, reader, args)
+    finally:
+        await reader.dispose()
+        await writer.dispose()
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        await admin.dispose()
+
+
+def print_table(rows: list[dict[str, str]]) -> None:
+    """Print results as an aligned table."""
+    columns = list(rows[0])
+    widths = [max(len(col), *(len(row[col]) for row in rows)) for col in columns]
+    print(
+        "  ".join(col.ljust(width) for col, width in zip(columns, widths, strict=True))
+    )
+    for row in rows:
+        print(
+            "  ".join(
+                row[col].ljust(width)
+                for col, width in zip(columns, widths, strict=True)
+            )
+        )
+
+
+async def main() -> None:
+    """Entry point for the benchmark script."""
+    args = parse_args()
+    rows = []
+    try:
+        rows += await bench_sqlite(args)
+        if args.postgres_url:
+            rows += await bench_postgres(args)
+    except Exception as e:
+        logger.error(f"❌ SQLite benchmark failed: {e}")
+        exit(1)
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark JWT tokens against opaque session tokens.
+
+Compares, per token mode: the Authorization header size, the cost of
+issuing and resolving an access token, and the cost of revoking one along
+with the state revocation leaves behind. JWT revocation adds a JTI to the
+blacklist, which every later decode consults and which only grows; opaque
+revocation deletes the session record.
+
+Usage:
+    python scripts/bench_tokens.py --iterations 20000 --stores memory postgres
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from datetime import timedelta
+from typing import TypeVar
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.core.security import (
+    TokenType,
+    get_token_blacklist,
+    get_token_service,
+)
+from app.core.sessions import (
+    MemorySessionStore,
+    OpaqueTokenService,
+    PostgresSessionStore,
+    RespClient,
+    RespSessionStore,
+    SessionStore,
+    TokenProvider,
+)
+from app.schemas.user import User
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument(
+        "--stores",
+        nargs="+",
+        choices=["memory", "redis", "postgres"],
+        default=["memory"],
+        help="Session stores to benchmark opaque tokens with",
+    )
+    return parser.parse_args()
+
+
+def build_store(name: str) -> SessionStore:
+    """Build a session store to benchmark."""
+    if name == "redis":
+        return RespSessionStore(
+            RespClient(settings.REDIS_HOST or "localhost", settings.REDIS_PORT or 6379)
+        )
+    if name == "postgres":
+        return PostgresSessionStore(AsyncSessionLocal)
+    return MemorySessionStore()
+
+
+async def per_op_us(
+    items: Sequence[T], operation: Callable[[T], Awaitable[object]]
+) -> float:
+    """Run an operation over every item; return the mean microseconds per call."""
+    started = time.perf_counter()
+    for item in items:
+        await operation(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+async def bench(name: str, provider: TokenProvider, iterations: int) -> dict[str, str]:
+    """Measure one token mode."""
+    user = User(
+        username="benchuser",
+        email="benchuser@example.com",
+        full_name="Bench User",
+        disabled=False,
+    )
+    expires = timedelta(minutes=30)
+
+    tokens: list[str] = []
+
+    async def issue(_: int) -> None:
+        tokens.append(await provider.issue_token(user, TokenType.ACCESS, expires))
+
+    issue_us = await per_op_us(range(iterations), issue)
+    header = f"Authorization: Bearer {tokens[0]}"
+
+    async def resolve(token: str) -> None:
+        assert await provider.resolve_token(token, TokenType.ACCESS) is not None
+
+    resolve_us = await per_op_us(tokens, resolve)
+
+    # Revoke half the tokens, then resolve the live half again
+    revoked, live = tokens[: iterations // 2], tokens[iterations // 2 :]
+    revoke_us = await per_op_us(revoked, provider.revoke_token)
+    resolve_after_us = await per_op_us(live, resolve)
+
+    if isinstance(provider, OpaqueTokenService):
+        state = "0 (sessions deleted)"
+    else:
+        state = f"{len(get_token_blacklist())} blacklisted JTIs"
+
+    return {
+        "mode": name,
+        "header bytes": str(len(header.encode())),
+        "issue us/op": f"{issue_us:.1f}",
+        "resolve us/op": f"{resolve_us:.1f}",
+        "revoke us/op": f"{revoke_us:.1f}",
+        "resolve after revoke us/op": f"{resolve_after_us:.1f}",
+        "revocation state": state,
+    }
+
+
+def print_table(rows: list[dict[str, str]]) -> None:
+    """Print results as an aligned table."""
+    columns = list(rows[0])
+    widths = [max(len(col), *(len(row[col]) for row in rows)) for col in columns]
+    print(
+        "  ".join(col.ljust(width) for col, width in zip(columns, widths, strict=True))
+    )
+    for row in rows:
+        print(
+            "  ".join(
+                row[col].ljust(width)
+                for col, width in zip(columns, widths, strict=True)
+            )
+        )
+
+
+async def main() -> None:
+    """Entry point for the benchmark script."""
+    args = parse_args()
+    rows = []
+    try:
+        rows.append(await bench("jwt", get_token_service(), args.iterations))
+        for store_name in args.stores:
+            store = build_store(store_name)
+            try:
+                rows.append(
+                    await bench(
+                        f"opaque/{store_name}",
+                        OpaqueTokenService(store),
+                        args.iterations,
+                    )
+                )
+            finally:
+                await store.close()
+    except Exception as e:
+        logger.error(f"❌ Token benchmark failed: {e}")
+        exit(1)
+    finally:
+        await engine.dispose()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
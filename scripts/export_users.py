@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Export the users table for analytics.
+
+Streams every user as NDJSON or CSV through a server-side cursor, so memory
+stays flat no matter how large the table is.
+
+Usage:
+    python scripts/export_users.py --format csv --gzip --output users.csv.gz
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from typing import BinaryIO
+
+from app.core.database import AsyncSessionLocal, engine
+from app.core.export import ExportFormat, stream_users
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument(
+        "--fetch-size", type=int, default=1000, help="Rows fetched per round trip"
+    )
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+    parser.add_argument(
+        "--output", default="-", help="Output file path, or '-' for stdout"
+    )
+    return parser.parse_args()
+
+
+async def export_users(
+    output: BinaryIO, export_format: ExportFormat, fetch_size: int, compress: bool
+) -> int:
+    """Write the export to ``output`` and return the number of bytes written."""
+    written = 0
+    async with AsyncSessionLocal() as session:
+        async for chunk in stream_users(session, export_format, fetch_size, compress):
+            output.write(chunk)
+            written += len(chunk)
+    output.flush()
+    return written
+
+
+async def main() -> None:
+    """Entry point for the export script."""
+    args = parse_args()
+    try:
+        if args.output == "-":
+            written = await export_users(
+                sys.stdout.buffer, args.format, args.fetch_size, args.gzip
+            )
+        else:
+            with open(args.output, "wb") as output:
+                written = await export_users(
+                    output, args.format, args.fetch_size, args.gzip
+                )
+        logger.info(f"✅ Exported users ({written} bytes)")
+    except Exception as e:
+        logger.error(f"❌ User export failed: {e}")
+        exit(1)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
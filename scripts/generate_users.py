@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for performance testing.
+
+Generates N deterministic users (same --seed, same rows) and bulk-loads
+them with asyncpg COPY in streamed batches, so millions of rows load in
+minutes with flat memory. Optionally writes revoked-token and login-history
+fixtures alongside them as NDJSON, timestamped relative to --now so they are
+just as reproducible.
+
+Passwords:
+    shared    every user gets --password, hashed once (fast, the default)
+    parallel  user <n> gets "<password><n>", hashed across CPU cores; use
+              --bcrypt-rounds to trade realism for speed
+
+The password scheme is logged, and written as JSON to --password-scheme-out
+so load tests can log in as any generated user.
+
+Usage:
+    python scripts/generate_users.py --count 1000000 --seed 42
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any
+
+import bcrypt
+
+from app.core.database import engine
+from app.models import normalize_identity
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+USER_COLUMNS = (
+    "username",
+    "email",
+    "username_normalized",
+    "email_normalized",
+    "full_name",
+    "hashed_password",
+    "is_active",
+    "is_superuser",
+    "token_epoch",
+)
+
+FIRST_NAMES = (
+    "Ada", "Alan", "Barbara", "Claude", "Dennis", "Edsger", "Frances", "Grace",
+    "Guido", "Ken", "Linus", "Margaret", "Niklaus", "Radia", "Sophie", "Tim",
+)  # fmt: skip
+LAST_NAMES = (
+    "Allen", "Dijkstra", "Hamilton", "Hopper", "Kernighan", "Knuth", "Liskov",
+    "Lovelace", "Perlman", "Ritchie", "Shannon", "Thompson", "Turing", "Wirth",
+)  # fmt: skip
+USER_AGENTS = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Gecko/20100101 Firefox/128.0",
+    "okhttp/4.12.0",
+    "MobileApp/3.2.1 (iPhone; iOS 17.5)",
+)
+# Fixture timestamps are relative to this unless --now says otherwise
+FIXTURES_NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def utc_time(value: str) -> datetime:
+    """Parse an ISO time, taken as UTC unless it has an offset."""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[1].strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--count", type=int, required=True, help="Users to create")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--start", type=int, default=0, help="First user number, to append batches"
+    )
+    parser.add_argument("--prefix", default="synth", help="Username prefix")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--password", default="synthetic-password")
+    parser.add_argument("--hash-mode", choices=["shared", "parallel"], default="shared")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=None, help="Hashing processes")
+    parser.add_argument("--inactive-ratio", type=float, default=0.05)
+    parser.add_argument("--superuser-ratio", type=float, default=0.001)
+    parser.add_argument(
+        "--revoked-tokens-out", help="Write revoked token JTIs (NDJSON) to this path"
+    )
+    parser.add_argument("--revoked-ratio", type=float, default=0.1)
+    parser.add_argument(
+        "--login-history-out", help="Write login events (NDJSON) to this path"
+    )
+    parser.add_argument("--logins-per-user", type=int, default=3)
+    parser.add_argument(
+        "--password-scheme-out", help="Write the password scheme (JSON) to this path"
+    )
+    parser.add_argument(
+        "--now",
+        type=utc_time,
+        default=FIXTURES_NOW,
+        help="ISO time the fixtures are generated relative to",
+    )
+    return parser.parse_args()
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """Hash one password with bcrypt at the given cost."""
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def user_password(args: argparse.Namespace, n: int | str) -> str:
+    """The password user ``n`` is created with under --hash-mode."""
+    if args.hash_mode == "parallel":
+        return f"{args.password}{n}"
+    return args.password
+
+
+def password_scheme(args: argparse.Namespace) -> dict[str, Any]:
+    """Describe how to log in as the generated users.
+
+    ``username`` and ``password`` are templates to fill in with
+    ``.format(n=n)`` for any user number ``n`` in ``numbers``.
+    """
+    return {
+        "hash_mode": args.hash_mode,
+        "username": f"{args.prefix}{{n:09d}}",
+        "password": user_password(args, "{n}"),
+        "numbers": [args.start, args.start + args.count],
+    }
+
+
+def _hash_password_chunk(args: tuple[list[str], int]) -> list[str]:
+    passwords, rounds = args
+    return [hash_password(password, rounds) for password in passwords]
+
+
+def user_rows(
+    args: argparse.Namespace, number: int, count: int
+) -> Iterator[tuple[Any, ...]]:
+    """Yield rows for users ``number`` .. ``number + count - 1``, sans hashes.
+
+    Each user's attributes depend only on the seed and its number, so any
+    slice of the dataset can be regenerated on its own.
+    """
+    for n in range(number, number + count):
+        rng = random.Random(f"{args.seed}:{n}")
+        username = f"{args.prefix}{n:09d}"
+        email = f"{username}@example.com"
+        yield (
+            username,
+            email,
+            normalize_identity(username),
+            normalize_identity(email),
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            None,
+            rng.random() >= args.inactive_ratio,
+            rng.random() < args.superuser_ratio,
+            0,
+        )
+
+
+def write_fixtures(
+    args: argparse.Namespace,
+    rows: list[tuple[Any, ...]],
+    revoked_out: IO[str] | None,
+    logins_out: IO[str] | None,
+) -> None:
+    """Write revoked-token and login-history records for a batch of users."""
+    now = args.now.replace(microsecond=0)
+    for row in rows:
+        username = row[0]
+        rng = random.Random(f"{args.seed}:fixtures:{username}")
+        if revoked_out is not None and rng.random() < args.revoked_ratio:
+            record = {
+                "jti": rng.randbytes(8).hex(),
+                "sub": username,
+                "exp": int((now + timedelta(minutes=rng.randint(1, 30))).timestamp()),
+            }
+            revoked_out.write(json.dumps(record) + "\n")
+        if logins_out is not None:
+            for _ in range(rng.randint(0, 2 * args.logins_per_user)):
+                occurred_at = now - timedelta(seconds=rng.randint(0, 90 * 86400))
+                record = {
+                    "username": username,
+                    "occurred_at": occurred_at.isoformat(),
+                    "ip_address": f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}."
+                    f"{rng.randint(1, 254)}",
+                    "user_agent": rng.choice(USER_AGENTS),
+                    "success": rng.random() < 0.9,
+                }
+                logins_out.write(json.dumps(record) + "\n")
+
+
+async def generate(args: argparse.Namespace) -> None:
+    """Generate and load the dataset batch by batch."""
+    scheme = password_scheme(args)
+    logger.info(f"Password scheme: {json.dumps(scheme)}")
+    if args.password_scheme_out:
+        with open(args.password_scheme_out, "w") as scheme_out:
+            json.dump(scheme, scheme_out, indent=2)
+
+    shared_hash = hash_password(args.password, args.bcrypt_rounds)
+    workers = args.workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+
+    with ExitStack() as stack:
+        pool = None
+        if args.hash_mode == "parallel":
+            pool = stack.enter_context(ProcessPoolExecutor(workers))
+        revoked_out = logins_out = None
+        if args.revoked_tokens_out:
+            revoked_out = stack.enter_context(open(args.revoked_tokens_out, "w"))
+        if args.login_history_out:
+            logins_out = stack.enter_context(open(args.login_history_out, "w"))
+
+        async with engine.connect() as conn:
+            # COPY straight through asyncpg; outside a transaction each batch
+            # commits on its own, so an interrupted load resumes with --start
+            raw = await conn.get_raw_connection()
+            copy_conn = raw.driver_connection
+            assert copy_conn is not None
+
+            loaded = 0
+            for number in range(args.start, args.start + args.count, args.batch_size):
+                size = min(args.batch_size, args.start + args.count - number)
+                rows = list(user_rows(args, number, size))
+
+                if pool is not None:
+                    passwords = [user_password(args, number + i) for i in range(size)]
+                    step = max(1, len(passwords) // (4 * workers))
+                    chunks = [
+                        (passwords[i : i + step], args.bcrypt_rounds)
+                        for i in range(0, len(passwords), step)
+                    ]
+                    hashes = [
+                        hashed
+                        for chunk in await asyncio.gather(
+                            *(
+                                loop.run_in_executor(pool, _hash_password_chunk, c)
+                                for c in chunks
+                            )
+                        )
+                        for hashed in chunk
+                    ]
+                else:
+                    hashes = [shared_hash] * len(rows)
+
+                records = [
+                    (*row[:5], hashed, *row[6:])
+                    for row, hashed in zip(rows, hashes, strict=True)
+                ]
+                await copy_conn.copy_records_to_table(
+                    "users", records=records, columns=USER_COLUMNS
+                )
+                write_fixtures(args, rows, revoked_out, logins_out)
+
+                loaded += len(records)
+                logger.info(f"Loaded {loaded}/{args.count} users")
+
+
+async def main() -> None:
+    """Entry point for the generator script."""
+    args = parse_args()
+    try:
+        await generate(args)
+        logger.info(f"✅ Generated {args.count} synthetic users")
+    except Exception as e:
+        logger.error(f"❌ Synthetic data generation failed: {e}")
+        exit(1)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,22 +3,34 @@
 Database seeding script for initial data setup.
 
 This script creates the initial user and any other required data
-for the application to function properly.
+for the application to function properly. With --migrate it also brings
+the schema to the Alembic head first, skipping Alembic entirely when the
+database is already at head so unchanged deploys start fast.
 """
 
+import argparse
 import asyncio
 import logging
+from pathlib import Path
 
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from alembic import command
 from app.core.config import settings
 from app.core.database import AsyncSessionLocal, engine
 from app.core.security import create_user, user_exists
-from app.models.base import Base
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# alembic.ini's logging config lowers the root level while migrations run
+logger.setLevel(logging.INFO)
 
 
 async def create_initial_user(session: AsyncSession) -> None:
@@ -54,26 +66,55 @@ async def create_initial_user(session: AsyncSession) -> None:
         raise
 
 
-async def create_tables() -> None:
-    """Create all database tables."""
-    logger.info("Creating database tables...")
+def get_alembic_config() -> Config:
+    """Get the Alembic configuration for this project."""
+    return Config(str(ALEMBIC_INI))
+
+
+def get_head_revisions() -> set[str]:
+    """Get the head revisions of the migration scripts on disk."""
+    return set(ScriptDirectory.from_config(get_alembic_config()).get_heads())
+
+
+async def get_current_revisions() -> set[str]:
+    """Get the revisions the database is stamped with (empty if none)."""
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            return set(result.scalars())
+    except ProgrammingError:
+        # alembic_version doesn't exist yet: a fresh database
+        return set()
+
+
+async def schema_is_current() -> bool:
+    """Check whether the database is already at the migration head."""
+    return await get_current_revisions() == get_head_revisions()
+
+
+async def run_migrations() -> None:
+    """Upgrade the database to the migration head."""
+    logger.info("Running database migrations...")
 
     try:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("✅ Database tables created successfully")
+        # env.py starts its own event loop, so run it off this one
+        await asyncio.to_thread(command.upgrade, get_alembic_config(), "head")
+        logger.info("✅ Database migrations applied successfully")
     except Exception as e:
-        logger.error(f"❌ Failed to create database tables: {e}")
+        logger.error(f"❌ Failed to apply database migrations: {e}")
         raise
 
 
-async def seed_database() -> None:
+async def seed_database(migrate: bool = False, force: bool = False) -> None:
     """Main seeding function."""
     logger.info("🌱 Starting database seeding...")
 
     try:
-        # Create tables first
-        await create_tables()
+        if migrate:
+            if not force and await schema_is_current():
+                logger.info("✅ Schema is at head, skipping migrations")
+            else:
+                await run_migrations()
 
         # Create initial data
         async with AsyncSessionLocal() as session:
@@ -90,10 +131,27 @@ async def seed_database() -> None:
         await engine.dispose()
 
 
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Prepare the database for startup")
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="Upgrade to the Alembic head first, unless already there",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run migrations even if the schema is already at head",
+    )
+    return parser.parse_args()
+
+
 async def main() -> None:
     """Entry point for the seeding script."""
+    args = parse_args()
     try:
-        await seed_database()
+        await seed_database(migrate=args.migrate, force=args.force)
     except Exception as e:
         logger.error(f"Seeding script failed: {e}")
         exit(1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Prepare user shards and move users onto shards added to DATABASE_SHARD_URLS.
+
+Shards can only be appended. To add some (or to start sharding):
+
+    1. Create the databases and run the migrations on each of them.
+    2. python scripts/rebalance_shards.py prepare
+       Gives every shard its own ids, so users keep unique ids when moved.
+    3. python scripts/rebalance_shards.py directory
+       Backfills the email directory (only needed when starting sharding).
+    4. Deploy the app with the new DATABASE_SHARD_URLS and
+       SHARD_PREVIOUS_COUNT set to the old shard count, so users not moved
+       yet are still found on their old shard. Rerun ``directory`` if
+       starting sharding, for users registered in the meantime.
+    5. python scripts/rebalance_shards.py move
+       Moves the users that now belong on another shard (--dry-run counts
+       them), then unset SHARD_PREVIOUS_COUNT.
+
+Every step can be rerun safely. Steps 2 to 5 read DATABASE_URL and the new
+DATABASE_SHARD_URLS from the environment.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import create_postgres_engine, engine
+from app.core.rebalance import (
+    backfill_email_directory,
+    prepare_id_sequences,
+    rebalance_shard,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("step", choices=["prepare", "directory", "move"])
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="Users moved per transaction"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Count the users to move, move none"
+    )
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace, engines: list[AsyncEngine]) -> None:
+    """Run one step against every shard."""
+    shards = [async_sessionmaker(e, class_=AsyncSession) for e in engines]
+
+    if args.step == "prepare":
+        next_ids = await prepare_id_sequences(shards)
+        for index, next_id in enumerate(next_ids):
+            logger.info(f"Shard {index}: next user id {next_id}")
+    elif args.step == "directory":
+        added = await backfill_email_directory(shards)
+        logger.info(f"Added {added} emails to the directory")
+    else:
+        for index in range(len(shards)):
+            moved = await rebalance_shard(
+                shards, index, batch_size=args.batch_size, dry_run=args.dry_run
+            )
+            verb = "would move" if args.dry_run else "moved"
+            logger.info(f"Shard {index}: {verb} {moved} users")
+
+
+async def main() -> None:
+    """Entry point for the rebalancing script."""
+    args = parse_args()
+    engines = [engine, *(create_postgres_engine(url) for url in settings.shard_urls)]
+    logger.info(f"{len(engines)} shards configured")
+    try:
+        await run(args, engines)
+        logger.info(f"✅ {args.step} finished")
+    except Exception as e:
+        logger.error(f"❌ {args.step} failed: {e}")
+        exit(1)
+    finally:
+        for shard_engine in engines:
+            await shard_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
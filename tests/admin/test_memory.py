@@ -0,0 +1,288 @@
+"""Tests for memory profiling and per-request allocation budgets."""
+
+from __future__ import annotations
+
+import sys
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+
+from app.core.config import settings
+from app.core.login_events import LoginEventWriter
+from app.core.memory import (
+    MemoryProfiler,
+    MemoryProfilingOffError,
+    deep_sizeof,
+    get_memory_profiler,
+)
+from app.core.security import get_token_blacklist
+from tests.allocations import measure_allocations
+
+KIB = 1024
+
+
+@pytest.fixture(autouse=True)
+def no_loop_monitor(monkeypatch):
+    """Tracing slows the loop down; stall reports would count as allocations."""
+    monkeypatch.setattr(settings, "LOOP_MONITOR_ENABLED", False)
+
+
+@pytest.fixture()
+def tracing():
+    """Trace allocations for the duration of a test."""
+    profiler = get_memory_profiler()
+    profiler.start()
+    yield profiler
+    profiler.stop()
+
+
+def test_snapshot_diff_shows_growth(tracing: MemoryProfiler):
+    """Test that a diff attributes new allocations to their source line."""
+    base = tracing.snapshot()
+    line = sys._getframe().f_lineno + 1
+    hoard = [bytearray(1000) for _ in range(200)]  # noqa: F841
+
+    diff = tracing.diff(base.id, group_by="lineno", limit=5)
+
+    assert diff.base_id == base.id
+    assert diff.target_id > base.id
+    assert diff.size_diff_bytes >= 200 * 1000
+    grown = diff.top[0]
+    assert grown.location[-1] == f"{__file__}:{line}"
+    assert (grown.size_diff_bytes or 0) >= 200 * 1000
+    assert (grown.count_diff or 0) >= 200
+
+
+def test_old_snapshots_are_evicted():
+    """Test that only the latest snapshots are kept, and none after stopping."""
+    profiler = MemoryProfiler(frames=1, max_snapshots=2)
+    with pytest.raises(MemoryProfilingOffError):
+        profiler.snapshot()
+
+    profiler.start()
+    try:
+        ids = [profiler.snapshot(limit=1).id for _ in range(3)]
+        with pytest.raises(KeyError):
+            profiler.diff(ids[0])
+        assert profiler.diff(ids[1], ids[2]).target_id == ids[2]
+    finally:
+        profiler.stop()
+    with pytest.raises(KeyError):
+        profiler.diff(ids[2])
+
+
+def test_stop_leaves_foreign_tracing_running():
+    """Test that the profiler only stops tracing it started itself."""
+    tracemalloc.start()
+    try:
+        profiler = MemoryProfiler()
+        profiler.start()
+        assert profiler.snapshot(limit=1).id == 1
+        profiler.stop()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+    profiler.start()
+    profiler.stop()
+    assert not tracemalloc.is_tracing()
+
+
+def test_deep_sizeof_follows_containers_and_app_objects():
+    """Test that nested contents count, and shared objects count once."""
+    shared = "x" * 10_000
+
+    assert deep_sizeof([shared, shared]) < deep_sizeof([shared]) + 100
+    assert deep_sizeof({"key": [shared]}) > 10_000
+
+    blacklist = get_token_blacklist()
+    empty = deep_sizeof(blacklist)
+    for n in range(100):
+        blacklist.blacklist_token(f"jti-{n}")
+    assert deep_sizeof(blacklist) > empty + 100 * 50
+
+
+@pytest.mark.asyncio
+async def test_memory_endpoints_require_superuser(client, superuser_token_headers):
+    """Test that regular users can't profile memory."""
+    for method, path in [
+        ("POST", "/api/v1/admin/memory/snapshots"),
+        ("GET", "/api/v1/admin/memory/snapshots/1/diff"),
+        ("GET", "/api/v1/admin/memory/structures"),
+    ]:
+        response = await client.request(method, path, headers=superuser_token_headers)
+        assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_snapshots_conflict_when_profiling_is_off(client, admin_token_headers):
+    """Test that snapshots need memory profiling enabled."""
+    response = await client.post(
+        "/api/v1/admin/memory/snapshots", headers=admin_token_headers
+    )
+
+    assert response.status_code == 409
+    assert "MEMORY_PROFILING_ENABLED" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_and_diff_endpoints(client, admin_token_headers, tracing):
+    """Test taking snapshots and diffing them over the admin API."""
+    response = await client.post(
+        "/api/v1/admin/memory/snapshots",
+        params={"group_by": "filename", "limit": 3},
+        headers=admin_token_headers,
+    )
+    assert response.status_code == 201
+    base = response.json()
+    assert len(base["top"]) == 3
+    assert base["traced_bytes"] > 0
+
+    await client.get("/api/v1/users/me", headers=admin_token_headers)
+    response = await client.get(
+        f"/api/v1/admin/memory/snapshots/{base['id']}/diff",
+        params={"group_by": "traceback", "limit": 2},
+        headers=admin_token_headers,
+    )
+    assert response.status_code == 200
+    diff = response.json()
+    assert diff["base_id"] == base["id"]
+    assert diff["target_id"] > base["id"]
+    assert all("size_diff_bytes" in stat for stat in diff["top"])
+
+    response = await client.get(
+        f"/api/v1/admin/memory/snapshots/{base['id']}/diff",
+        params={"target": 999_999},
+        headers=admin_token_headers,
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_structures_report_known_caches(client, admin_token_headers):
+    """Test that the in-process structures are measured, tracing or not."""
+    await client.post("/api/v1/logout", headers=admin_token_headers)
+    login = await client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME,
+            "password": settings.FIRST_PASSWORD.get_secret_value(),
+        },
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    response = await client.get("/api/v1/admin/memory/structures", headers=headers)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["tracing"] is False
+    assert report["traced_bytes"] is None
+    structures = report["structures"]
+    assert {
+        "token_blacklist",
+        "token_epochs",
+        "user_versions",
+        "user_loads_in_flight",
+        "idempotency_responses",
+        "login_event_buffer",
+        "username_filter",
+        "rate_limiter",
+        "sqlalchemy_compiled_cache.primary",
+    } <= set(structures)
+    assert structures["token_blacklist"]["entries"] == 1
+    assert structures["token_blacklist"]["size_bytes"] > 0
+    assert structures["rate_limiter"]["size_bytes"] > 0
+    assert structures["sqlalchemy_compiled_cache.primary"]["size_bytes"] is None
+
+
+@pytest_asyncio.fixture()
+async def tokens(client: AsyncClient, admin_token_headers) -> dict[str, str]:
+    """A superuser's tokens, as introspection is restricted to superusers."""
+    response = await client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME,
+            "password": settings.FIRST_PASSWORD.get_secret_value(),
+        },
+    )
+    return response.json()
+
+
+def _requests(
+    client: AsyncClient, tokens: dict[str, str]
+) -> dict[str, Callable[[], Awaitable[Any]]]:
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    return {
+        "health": lambda: client.get("/health"),
+        "me": lambda: client.get("/api/v1/users/me", headers=headers),
+        "lookup": lambda: client.post(
+            "/api/v1/users/lookup",
+            json={"usernames": [settings.FIRST_USERNAME, "ghost"]},
+            headers=headers,
+        ),
+        "introspect": lambda: client.post(
+            "/api/v1/introspect",
+            json={"tokens": [tokens["access_token"], "garbage"]},
+            headers=headers,
+        ),
+        "refresh": lambda: client.post(
+            "/api/v1/refresh", json={"refresh_token": tokens["refresh_token"]}
+        ),
+    }
+
+
+# Peak is about one request's working set, retained what requests leave behind
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("endpoint", "peak_budget", "retained_budget"),
+    [
+        ("health", 2048 * KIB, 1 * KIB),
+        ("me", 2048 * KIB, 1 * KIB),
+        ("lookup", 2048 * KIB, 1 * KIB),
+        ("introspect", 2048 * KIB, 1 * KIB),
+        ("refresh", 2048 * KIB, 1 * KIB),
+    ],
+)
+async def test_request_allocation_budget(
+    client, tokens, endpoint, peak_budget, retained_budget
+):
+    """Test that requests stay within their allocation budgets."""
+    send = _requests(client, tokens)[endpoint]
+
+    allocations = await measure_allocations(send, requests=100)
+
+    assert allocations.peak < peak_budget, allocations
+    assert allocations.retained < retained_budget, allocations
+
+
+@pytest.mark.asyncio
+async def test_login_allocation_budget(
+    client: AsyncClient, login_event_writer: LoginEventWriter
+):
+    """Test logins' budget, with login events flushed as the writer would.
+
+    Dependency overrides in tests make FastAPI rebuild the form's fields on
+    every request, which fills typing's (bounded) cache; hence the larger
+    retained budget than the other endpoints.
+    """
+
+    async def login() -> None:
+        response = await client.post(
+            "/api/v1/token",
+            data={
+                "username": settings.FIRST_USERNAME,
+                "password": settings.FIRST_PASSWORD.get_secret_value(),
+            },
+        )
+        assert response.status_code == 200
+        await login_event_writer.flush()
+
+    allocations = await measure_allocations(login, requests=10, warmup=3)
+
+    assert allocations.peak < 2048 * KIB, allocations
+    assert allocations.retained < 16 * KIB, allocations
+    assert not tracemalloc.is_tracing()
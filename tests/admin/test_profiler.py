@@ -0,0 +1,111 @@
+"""Tests for the on-demand sampling profiler."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import settings
+from app.core.profiling import ProfilerBusyError, SamplingProfiler, profile_process
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collapses_thread_stacks():
+    """Test that samples are aggregated as semicolon-joined stacks per thread."""
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        profiler = SamplingProfiler(interval=0.001, thread_ids=[worker.ident or 0])
+        profiler.run(0.1)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.samples > 0
+    lines = profiler.collapsed().splitlines()
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+        assert stack.startswith("spinner;")
+    assert any(f"{__name__}:_spin " in line for line in lines)
+
+
+def test_only_one_profile_at_a_time():
+    """Test that a second profile is refused while one is running."""
+    started = threading.Event()
+    worker = threading.Thread(
+        target=lambda: (started.set(), profile_process(0.3, interval=0.05))
+    )
+    worker.start()
+    started.wait()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            for _ in range(100):
+                profile_process(0.001)
+                threading.Event().wait(0.001)
+    finally:
+        worker.join()
+
+
+@pytest.mark.asyncio
+async def test_profile_requires_superuser(client, superuser_token_headers):
+    """Test that regular users cannot profile the process."""
+    response = await client.get(
+        "/api/v1/admin/profile?seconds=0.01", headers=superuser_token_headers
+    )
+
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_profile_endpoint_returns_collapsed_stacks(client, admin_token_headers):
+    """Test that the endpoint samples the event loop while it serves requests."""
+    response = await client.get(
+        "/api/v1/admin/profile",
+        params={"seconds": 0.2, "interval_ms": 1, "threads": "loop"},
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert int(response.headers["x-profile-samples"]) > 0
+    assert all(line.startswith("MainThread;") for line in response.text.splitlines())
+
+
+async def _login_later(client: AsyncClient) -> None:
+    await asyncio.sleep(0.05)
+    for _ in range(3):
+        await client.post(
+            "/api/v1/token",
+            data={
+                "username": settings.FIRST_USERNAME,
+                "password": settings.FIRST_PASSWORD.get_secret_value(),
+            },
+        )
+
+
+@pytest.mark.asyncio
+async def test_profile_filters_by_route(client, admin_token_headers):
+    """Test that a route filter keeps only samples taken serving that route."""
+    profile, _ = await asyncio.gather(
+        client.get(
+            "/api/v1/admin/profile",
+            params={"seconds": 1, "interval_ms": 1, "route": "/api/v1/token"},
+            headers=admin_token_headers,
+        ),
+        _login_later(client),
+    )
+
+    assert profile.status_code == 200
+    lines = profile.text.splitlines()
+    # Password checks run in worker threads, so only the loop's share shows
+    assert any("app.api.v1.auth:login_for_access_token" in line for line in lines)
+    assert not any("app.api.v1.admin:profile_cpu" in line for line in lines)
@@ -0,0 +1,142 @@
+"""Tests for streaming exports of the users table."""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.export import stream_export, stream_users
+from app.models.user import User
+
+
+@pytest.fixture()
+async def many_users(session: AsyncSession) -> int:
+    """Add extra users and return the total number of users."""
+    session.add_all(
+        User(
+            username=f"exported{index}",
+            email=f"exported{index}@example.com",
+            full_name=f"Exported User {index}",
+            hashed_password="not-a-real-hash",
+            is_active=index % 2 == 0,
+            is_superuser=False,
+        )
+        for index in range(9)
+    )
+    await session.commit()
+    return 10
+
+
+@pytest.mark.asyncio
+async def test_export_requires_superuser(client, superuser_token_headers):
+    """Test that regular users cannot export the users table."""
+    response = await client.get(
+        "/api/v1/admin/users/export", headers=superuser_token_headers
+    )
+
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_export_requires_authentication(client):
+    """Test that anonymous callers cannot export the users table."""
+    response = await client.get("/api/v1/admin/users/export")
+
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson(client, admin_token_headers, many_users):
+    """Test that the NDJSON export has one JSON object per user, without hashes."""
+    response = await client.get(
+        "/api/v1/admin/users/export", headers=admin_token_headers
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == many_users
+    assert rows[0]["username"] == settings.FIRST_USERNAME
+    assert set(rows[0]) == {
+        "id",
+        "username",
+        "email",
+        "full_name",
+        "is_active",
+        "is_superuser",
+    }
+
+
+@pytest.mark.asyncio
+async def test_export_csv_gzip(client, admin_token_headers, many_users):
+    """Test that the CSV export can be gzip-compressed on the wire."""
+    response = await client.get(
+        "/api/v1/admin/users/export",
+        params={"format": "csv", "gzip": "true", "fetch_size": 3},
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == many_users
+    assert rows[-1]["username"] == "exported8"
+
+
+@pytest.mark.asyncio
+async def test_stream_users_emits_one_chunk_per_fetch(
+    session: AsyncSession, many_users
+):
+    """Test that rows are fetched and emitted in batches of ``fetch_size``."""
+    chunks = [chunk async for chunk in stream_users(session, "ndjson", fetch_size=4)]
+
+    assert len(chunks) == 3  # 4 + 4 + 2 rows
+    assert sum(chunk.count(b"\n") for chunk in chunks) == many_users
+
+
+@pytest.mark.asyncio
+async def test_stream_users_gzip_output_is_a_valid_gzip_file(
+    session: AsyncSession, many_users
+):
+    """Test that compressed output decompresses to the plain export."""
+    plain = b"".join(
+        [chunk async for chunk in stream_users(session, "csv", fetch_size=2)]
+    )
+    compressed = b"".join(
+        [
+            chunk
+            async for chunk in stream_users(session, "csv", fetch_size=2, compress=True)
+        ]
+    )
+
+    assert gzip.decompress(compressed) == plain
+
+
+@pytest.mark.asyncio
+async def test_export_streams_from_its_own_session(connection, many_users):
+    """Test that the export body opens its session only once it is sent.
+
+    Before FastAPI 0.118 a request's yield dependencies are torn down before
+    a streamed body is sent, so the body can't use the request's session.
+    """
+    opened: list[AsyncSession] = []
+
+    def open_session() -> AsyncSession:
+        opened.append(AsyncSession(connection, expire_on_commit=False))
+        return opened[-1]
+
+    body = stream_export(open_session, "ndjson", fetch_size=4)
+    assert opened == []
+
+    lines = b"".join([chunk async for chunk in body]).splitlines()
+
+    assert len(lines) == many_users
+    assert len(opened) == 1
@@ -0,0 +1,129 @@
+"""Tests for the keyset-paginated user listing."""
+
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import encode_cursor, estimate_user_count
+from app.models.user import User
+
+
+@pytest.fixture()
+async def listed_users(session: AsyncSession) -> None:
+    """Add 11 users (12 in total), every third one inactive."""
+    session.add_all(
+        User(
+            username=f"listed{index:02d}",
+            email=f"listed{index}@example.com",
+            full_name=f"Listed User {index}",
+            hashed_password="not-a-real-hash",
+            is_active=index % 3 != 0,
+            is_superuser=index == 5,
+        )
+        for index in range(11)
+    )
+    await session.commit()
+
+
+async def _all_pages(
+    client: AsyncClient, headers: dict[str, str], **params
+) -> list[dict]:
+    pages = []
+    cursor = None
+    while True:
+        query = {**params, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(
+            "/api/v1/admin/users", params=query, headers=headers
+        )
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.asyncio
+async def test_list_users_requires_superuser(client, superuser_token_headers):
+    """Test that regular users cannot list users."""
+    response = await client.get("/api/v1/admin/users", headers=superuser_token_headers)
+
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_list_users_walks_every_page_by_id(
+    client, admin_token_headers, listed_users
+):
+    """Test that following cursors visits every user exactly once, in id order."""
+    pages = await _all_pages(client, admin_token_headers, limit=5)
+
+    assert [len(page["items"]) for page in pages] == [5, 5, 2]
+    ids = [item["id"] for page in pages for item in page["items"]]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 12
+    assert all(page["estimated_total"] == 12 for page in pages)
+    assert "hashed_password" not in pages[0]["items"][0]
+
+
+@pytest.mark.asyncio
+async def test_list_users_by_username_with_filters(
+    client, admin_token_headers, listed_users
+):
+    """Test username ordering combined with an is_active filter."""
+    pages = await _all_pages(
+        client, admin_token_headers, order_by="username", is_active="true", limit=3
+    )
+
+    usernames = [item["username"] for page in pages for item in page["items"]]
+    assert usernames == sorted(usernames)
+    assert all(item["is_active"] for page in pages for item in page["items"])
+    assert "listed00" not in usernames
+    assert pages[0]["estimated_total"] == len(usernames)
+
+
+@pytest.mark.asyncio
+async def test_list_users_filters_superusers(client, admin_token_headers, listed_users):
+    """Test the is_superuser filter."""
+    response = await client.get(
+        "/api/v1/admin/users",
+        params={"is_superuser": "true"},
+        headers=admin_token_headers,
+    )
+
+    usernames = {item["username"] for item in response.json()["items"]}
+    assert "listed05" in usernames
+    assert all(item["is_superuser"] for item in response.json()["items"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "cursor",
+    ["not-a-cursor", encode_cursor("username", "listed03")],
+)
+async def test_list_users_rejects_invalid_cursor(client, admin_token_headers, cursor):
+    """Test that malformed cursors, or cursors for another ordering, are rejected."""
+    response = await client.get(
+        "/api/v1/admin/users",
+        params={"cursor": cursor, "order_by": "id"},
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_estimated_total_uses_statistics_for_large_tables(
+    session: AsyncSession, listed_users
+):
+    """Test that totals come from planner statistics instead of COUNT(*)."""
+    await session.execute(text("ANALYZE users"))
+
+    assert await estimate_user_count(session, exact_below=0) == 12
+
+    # Filtered totals come from the planner's row estimate
+    estimate = await estimate_user_count(session, is_active=True, exact_below=0)
+    assert 0 < estimate <= 12
@@ -0,0 +1,68 @@
+"""Measure the memory a request allocates, to catch per-endpoint regressions."""
+
+from __future__ import annotations
+
+import gc
+import logging
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+class Allocations:
+    """Allocations of a run of identical requests, in bytes per request.
+
+    ``peak`` is the most the run had allocated at once above where it
+    started, so roughly one request's working set. ``retained`` is what was
+    still allocated after the run, after garbage collection, averaged over
+    its requests; it stays near zero unless requests leak or fill a cache.
+    Requests are measured in two rounds and the smaller growth is kept, as
+    a leak grows both while one-off allocations land in only one.
+    """
+
+    def __init__(self, peak: int, retained: float) -> None:
+        self.peak = peak
+        self.retained = retained
+
+    def __repr__(self) -> str:
+        return f"Allocations(peak={self.peak}, retained={self.retained:.0f})"
+
+
+async def measure_allocations(
+    send: Callable[[], Awaitable[Any]], *, requests: int = 50, warmup: int = 10
+) -> Allocations:
+    """Trace the allocations of ``requests`` calls of ``send``.
+
+    The ``warmup`` calls before, untraced, fill the caches every first
+    request fills (compiled statements, validators...), so what is left is
+    the steady state. Logging is disabled throughout, as pytest's log
+    capture keeps every record and they would count as retained.
+    """
+    logging.disable(logging.CRITICAL)
+    already_tracing = tracemalloc.is_tracing()
+    try:
+        for _ in range(warmup):
+            await send()
+
+        if not already_tracing:
+            tracemalloc.start()
+        # A first traced round settles what tracing itself first allocates
+        for _ in range(requests):
+            await send()
+        gc.collect()
+        peak, growths = 0, []
+        for _ in range(2):
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            for _ in range(requests):
+                await send()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - start)
+            gc.collect()
+            end, _ = tracemalloc.get_traced_memory()
+            growths.append(end - start)
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+        logging.disable(logging.NOTSET)
+
+    return Allocations(peak=peak, retained=min(growths) / requests)
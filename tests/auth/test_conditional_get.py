@@ -0,0 +1,178 @@
+"""Tests for conditional GETs of the current user's profile."""
+
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.etag import etag_matches, user_etag
+from app.core.login_events import LoginEventWriter
+from app.core.security import revoke_user_tokens
+from app.models.user import User
+
+
+def _user_selects(statements: list[str]) -> list[str]:
+    return [s for s in statements if s.startswith("SELECT") and "FROM users" in s]
+
+
+@pytest.mark.asyncio
+async def test_users_me_sends_etag(client: AsyncClient, superuser_token_headers):
+    """Test that the profile carries a strong ETag and private caching headers."""
+    response = await client.get("/api/v1/users/me", headers=superuser_token_headers)
+
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    assert response.headers["Vary"] == "Authorization"
+
+
+@pytest.mark.asyncio
+async def test_matching_if_none_match_returns_empty_304(
+    client: AsyncClient, superuser_token_headers
+):
+    """Test that an unchanged profile is answered with a bodyless 304."""
+    first = await client.get("/api/v1/users/me", headers=superuser_token_headers)
+    etag = first.headers["ETag"]
+
+    response = await client.get(
+        "/api/v1/users/me",
+        headers={**superuser_token_headers, "If-None-Match": etag},
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_304_is_served_without_a_database_read(
+    client: AsyncClient, superuser_token_headers, executed_statements
+):
+    """Test that a recently seen version answers the poll from memory."""
+    first = await client.get("/api/v1/users/me", headers=superuser_token_headers)
+    executed_statements.clear()
+
+    response = await client.get(
+        "/api/v1/users/me",
+        headers={**superuser_token_headers, "If-None-Match": first.headers["ETag"]},
+    )
+
+    assert response.status_code == 304
+    assert _user_selects(executed_statements) == []
+
+
+@pytest.mark.asyncio
+async def test_changed_profile_gets_new_etag(
+    client: AsyncClient, superuser_token_headers, session: AsyncSession, monkeypatch
+):
+    """Test that an update bumps the version and invalidates the old ETag."""
+    monkeypatch.setattr(settings, "USER_VERSION_CACHE_SECONDS", 0.0)
+    first = await client.get("/api/v1/users/me", headers=superuser_token_headers)
+
+    await session.execute(
+        update(User)
+        .where(User.username == settings.FIRST_USERNAME)
+        .values(full_name="Renamed User")
+    )
+    await session.commit()
+    # The test client shares this session; requests normally get a fresh one
+    session.expire_all()
+
+    response = await client.get(
+        "/api/v1/users/me",
+        headers={**superuser_token_headers, "If-None-Match": first.headers["ETag"]},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Renamed User"
+    assert response.headers["ETag"] != first.headers["ETag"]
+
+
+@pytest.mark.asyncio
+async def test_login_and_revocation_keep_the_etag(
+    client: AsyncClient,
+    superuser_token_headers,
+    session: AsyncSession,
+    login_event_writer: LoginEventWriter,
+    monkeypatch,
+):
+    """Test that writes to columns the profile doesn't show keep its ETag."""
+    monkeypatch.setattr(settings, "USER_VERSION_CACHE_SECONDS", 0.0)
+    first = await client.get("/api/v1/users/me", headers=superuser_token_headers)
+
+    # Record the fixture's login, then revoke its token and log in again
+    assert await login_event_writer.flush() == 1
+    assert await revoke_user_tokens(session, settings.FIRST_USERNAME) == 1
+    login_data = {
+        "username": settings.FIRST_USERNAME,
+        "password": settings.FIRST_PASSWORD.get_secret_value(),
+    }
+    response = await client.post("/api/v1/token", data=login_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    session.expire_all()
+
+    response = await client.get(
+        "/api/v1/users/me",
+        headers={**headers, "If-None-Match": first.headers["ETag"]},
+    )
+
+    assert response.status_code == 304
+    user = await session.scalar(
+        select(User).where(User.username == settings.FIRST_USERNAME)
+    )
+    assert user is not None
+    assert user.last_login_at is not None
+    assert (user.version, user.token_epoch) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_is_rejected_despite_matching_etag(
+    client: AsyncClient, superuser_token_headers
+):
+    """Test that a conditional request still requires valid credentials."""
+    first = await client.get("/api/v1/users/me", headers=superuser_token_headers)
+
+    response = await client.get(
+        "/api/v1/users/me",
+        headers={
+            "Authorization": "Bearer not-a-token",
+            "If-None-Match": first.headers["ETag"],
+        },
+    )
+
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_version_bumps_only_on_real_changes(session: AsyncSession):
+    """Test that the trigger bumps the version on updates that change the row."""
+    user = await session.scalar(
+        select(User).where(User.username == settings.FIRST_USERNAME)
+    )
+    assert user is not None
+    assert user.version == 1
+
+    user.full_name = "Changed Name"
+    await session.commit()
+    assert user.version == 2
+
+    await session.execute(
+        update(User).where(User.id == user.id).values(full_name="Changed Name")
+    )
+    version = await session.scalar(select(User.version).where(User.id == user.id))
+    assert version == 2
+
+
+def test_etag_matching_follows_if_none_match_rules():
+    """Test list, weak and wildcard forms of If-None-Match."""
+    etag = user_etag("alice", 3)
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(user_etag("alice", 4), etag)
+    assert not etag_matches(None, etag)
@@ -0,0 +1,180 @@
+"""Tests for Idempotency-Key support on /register and /token."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.core import idempotency
+from app.core.config import settings
+from app.core.idempotency import IdempotencyStore, StoredResponse
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch) -> IdempotencyStore:
+    """Start each test with an empty idempotency store."""
+    fresh = IdempotencyStore(max_entries=100, ttl=60)
+    monkeypatch.setattr(idempotency, "_idempotency_store", fresh)
+    return fresh
+
+
+def _login(client: AsyncClient, key: str | None, password: str | None = None):
+    return client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME,
+            "password": password or settings.FIRST_PASSWORD.get_secret_value(),
+        },
+        headers={"Idempotency-Key": key} if key else {},
+    )
+
+
+@pytest.mark.asyncio
+async def test_register_retry_is_replayed(client, store):
+    """Test that a retried registration returns the first response, not a 400."""
+    user_data = {
+        "username": "retrier",
+        "email": "retrier@example.com",
+        "full_name": "Retry User",
+        "password": "retrypassword123",
+    }
+    headers = {"Idempotency-Key": "register-1"}
+
+    first = await client.post("/api/v1/register", json=user_data, headers=headers)
+    retry = await client.post("/api/v1/register", json=user_data, headers=headers)
+
+    assert first.status_code == 201
+    assert "idempotent-replayed" not in first.headers
+    assert retry.status_code == 201
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert len(store) == 1
+
+    # Without the key the retry really runs again
+    again = await client.post("/api/v1/register", json=user_data)
+    assert again.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_concurrent_logins_share_one_attempt(client, login_event_writer):
+    """Test that duplicates in flight wait for the first login's result."""
+    responses = await asyncio.gather(*(_login(client, "login-1") for _ in range(3)))
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert len({response.json()["access_token"] for response in responses}) == 1
+    assert sum("idempotent-replayed" in r.headers for r in responses) == 2
+    # Only one password check, so only one login attempt recorded
+    assert login_event_writer.pending == 1
+
+
+@pytest.mark.asyncio
+async def test_key_is_matched_with_the_payload(client, login_event_writer):
+    """Test that reusing a key with a different payload runs the request."""
+    failed = await _login(client, "login-2", password="wrongpassword")
+    succeeded = await _login(client, "login-2")
+
+    assert failed.status_code == 401
+    assert succeeded.status_code == 200
+    assert "idempotent-replayed" not in succeeded.headers
+    assert login_event_writer.pending == 2
+
+
+@pytest.mark.asyncio
+async def test_login_is_not_replayed_after_logout(client, login_event_writer):
+    """Test that a retry after its token was revoked logs in again."""
+    first = await _login(client, "login-3")
+    await client.post(
+        "/api/v1/logout",
+        headers={"Authorization": f"Bearer {first.json()['access_token']}"},
+    )
+
+    retry = await _login(client, "login-3")
+
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
+    assert retry.json()["access_token"] != first.json()["access_token"]
+    assert login_event_writer.pending == 2
+
+    # The fresh response is replayed as usual
+    again = await _login(client, "login-3")
+    assert again.headers["idempotent-replayed"] == "true"
+    assert again.json() == retry.json()
+
+
+@pytest.mark.asyncio
+async def test_login_is_not_replayed_after_revoking_every_token(client):
+    """Test that bumping the user's token epoch also stops the replay."""
+    first = await _login(client, "login-4")
+    await client.post(
+        "/api/v1/logout/all",
+        headers={"Authorization": f"Bearer {first.json()['access_token']}"},
+    )
+
+    retry = await _login(client, "login-4")
+
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
+    me = await client.get(
+        "/api/v1/users/me",
+        headers={"Authorization": f"Bearer {retry.json()['access_token']}"},
+    )
+    assert me.status_code == 200
+
+
+def test_fingerprint_keeps_credentials_out(monkeypatch):
+    """Test that credentials only enter the fingerprint through a keyed HMAC."""
+    scope = {
+        "method": "POST",
+        "path": "/api/v1/token",
+        "headers": [(b"content-type", b"application/x-www-form-urlencoded")],
+    }
+    fingerprint = idempotency.request_fingerprint(
+        scope, b"username=alice&password=secret123"
+    )
+
+    # Field order doesn't matter, the password does
+    assert fingerprint == idempotency.request_fingerprint(
+        scope, b"password=secret123&username=alice"
+    )
+    assert fingerprint != idempotency.request_fingerprint(
+        scope, b"username=alice&password=secret124"
+    )
+    # Without the process's key, the fingerprint can't be recomputed
+    monkeypatch.setattr(idempotency, "_CREDENTIAL_KEY", b"another key")
+    assert fingerprint != idempotency.request_fingerprint(
+        scope, b"username=alice&password=secret123"
+    )
+
+
+@pytest.mark.asyncio
+async def test_requests_without_a_key_are_untouched(client, store):
+    """Test that nothing is stored without an Idempotency-Key."""
+    response = await _login(client, None)
+
+    assert response.status_code == 200
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio
+async def test_overlong_key_is_rejected(client):
+    """Test that keys over the length limit are refused."""
+    response = await _login(client, "k" * 256)
+
+    assert response.status_code == 400
+
+
+def test_store_expires_and_evicts():
+    """Test the store's TTL and size bound."""
+    store = IdempotencyStore(max_entries=2, ttl=0.05)
+    response = StoredResponse(200, [], b"{}")
+    for key in ("a", "b", "c"):
+        store.put((key, "fp"), response)
+
+    assert store.get(("a", "fp")) is None
+    assert store.get(("c", "fp")) is response
+
+    time.sleep(0.06)
+    assert store.get(("c", "fp")) is None
@@ -0,0 +1,174 @@
+"""Tests for write-behind login events and last-login tracking."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.core.config import settings
+from app.core.login_events import LoginEventWriter
+from app.models import LoginEvent
+from app.models.user import User
+
+
+async def _login(client: AsyncClient, password: str | None = None) -> int:
+    response = await client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME,
+            "password": password or settings.FIRST_PASSWORD.get_secret_value(),
+        },
+        headers={"User-Agent": "pytest-client"},
+    )
+    return response.status_code
+
+
+def _statements_on(statements: list[str], table: str) -> list[str]:
+    return [s for s in statements if table in s and not s.startswith("SELECT")]
+
+
+@pytest.mark.asyncio
+async def test_login_does_not_write_events_inline(
+    client: AsyncClient, login_event_writer: LoginEventWriter, executed_statements
+):
+    """Test that logging in only buffers the event."""
+    executed_statements.clear()
+
+    assert await _login(client) == 200
+
+    assert login_event_writer.pending == 1
+    assert _statements_on(executed_statements, "login_events") == []
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_events_and_last_login(
+    client: AsyncClient, login_event_writer: LoginEventWriter, session: AsyncSession
+):
+    """Test that a flush stores the attempts and the user's last login time."""
+    assert await _login(client) == 200
+    assert await _login(client, password="wrong-password") == 401
+
+    assert await login_event_writer.flush() == 2
+
+    events = (
+        await session.scalars(select(LoginEvent).order_by(LoginEvent.occurred_at))
+    ).all()
+    user = await session.scalar(
+        select(User).where(User.username == settings.FIRST_USERNAME)
+    )
+    await session.refresh(user)
+    assert [e.success for e in events] == [True, False]
+    assert all(e.user_id == user.id for e in events)
+    assert events[0].user_agent == "pytest-client"
+    assert user.last_login_at == events[0].occurred_at
+
+
+@pytest.mark.asyncio
+async def test_unknown_username_is_recorded_without_user(
+    client: AsyncClient, login_event_writer: LoginEventWriter, session: AsyncSession
+):
+    """Test that attempts against missing accounts are kept for review."""
+    await client.post(
+        "/api/v1/token", data={"username": "nobody", "password": "whatever123"}
+    )
+    await login_event_writer.flush()
+
+    event = await session.scalar(select(LoginEvent))
+    assert event is not None
+    assert event.username == "nobody"
+    assert event.user_id is None
+    assert event.success is False
+
+
+@pytest.mark.asyncio
+async def test_batch_uses_one_insert_and_one_update(
+    session: AsyncSession,
+    login_event_writer: LoginEventWriter,
+    executed_statements,
+):
+    """Test that a batch is a multi-row insert plus one coalesced update."""
+    start = datetime.now(timezone.utc)
+    for minutes in (3, 1, 2):
+        await login_event_writer.record(
+            settings.FIRST_USERNAME,
+            success=True,
+            occurred_at=start + timedelta(minutes=minutes),
+        )
+    executed_statements.clear()
+
+    await login_event_writer.flush()
+
+    assert len(_statements_on(executed_statements, "INSERT INTO login_events")) == 1
+    assert len(_statements_on(executed_statements, "UPDATE users")) == 1
+    last_login = await session.scalar(
+        select(User.last_login_at).where(User.username == settings.FIRST_USERNAME)
+    )
+    assert last_login == start + timedelta(minutes=3)
+
+
+@pytest.mark.asyncio
+async def test_last_login_never_moves_backwards(
+    session: AsyncSession, login_event_writer: LoginEventWriter
+):
+    """Test that a late batch with older logins keeps the newer time."""
+    now = datetime.now(timezone.utc)
+    await login_event_writer.record(
+        settings.FIRST_USERNAME, success=True, occurred_at=now
+    )
+    await login_event_writer.flush()
+    await login_event_writer.record(
+        settings.FIRST_USERNAME, success=True, occurred_at=now - timedelta(hours=1)
+    )
+    await login_event_writer.flush()
+
+    last_login = await session.scalar(
+        select(User.last_login_at).where(User.username == settings.FIRST_USERNAME)
+    )
+    assert last_login == now
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_drops_after_bounded_wait(connection: AsyncConnection):
+    """Test backpressure: a full buffer delays briefly, then drops the event."""
+    writer = LoginEventWriter(
+        lambda: AsyncSession(connection), max_buffer=2, full_wait=0.01
+    )
+
+    assert await writer.record("a", success=True)
+    assert await writer.record("b", success=True)
+    assert not await writer.record("c", success=True)
+
+    assert writer.pending == 2
+    assert writer.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_background_flush_by_size_and_on_stop(
+    connection: AsyncConnection, session: AsyncSession
+):
+    """Test that a full batch flushes promptly and stop() flushes the rest."""
+    writer = LoginEventWriter(
+        lambda: AsyncSession(connection, expire_on_commit=False),
+        batch_size=2,
+        flush_interval=3600,
+    )
+    writer.start()
+
+    await writer.record(settings.FIRST_USERNAME, success=True)
+    await writer.record(settings.FIRST_USERNAME, success=True)
+    for _ in range(100):
+        if writer.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert writer.pending == 0
+
+    await writer.record(settings.FIRST_USERNAME, success=False)
+    await writer.stop()
+
+    events = (await session.scalars(select(LoginEvent))).all()
+    assert len(events) == 3
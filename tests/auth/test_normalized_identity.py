@@ -0,0 +1,96 @@
+"""Tests for case-insensitive usernames and emails."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import user_exists
+
+
+@pytest.mark.asyncio
+async def test_login_is_case_insensitive(client):
+    """Test that a user can log in regardless of username case."""
+    response = await client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME.upper(),
+            "password": settings.FIRST_PASSWORD.get_secret_value(),
+        },
+    )
+
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+
+    # The token subject is the stored username, not the one typed at login
+    me = await client.get(
+        "/api/v1/users/me", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert me.json()["username"] == settings.FIRST_USERNAME
+
+
+@pytest.mark.asyncio
+async def test_register_rejects_username_differing_only_by_case(client):
+    """Test that usernames are unique regardless of case."""
+    response = await client.post(
+        "/api/v1/register",
+        json={
+            "username": settings.FIRST_USERNAME.swapcase(),
+            "email": "other@example.com",
+            "full_name": "Other User",
+            "password": "securepassword123",
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already registered"
+
+
+@pytest.mark.asyncio
+async def test_register_rejects_email_differing_only_by_case(client):
+    """Test that emails are unique regardless of case."""
+    response = await client.post(
+        "/api/v1/register",
+        json={
+            "username": "otheruser",
+            "email": "TEST@Example.com",
+            "full_name": "Other User",
+            "password": "securepassword123",
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
+@pytest.mark.asyncio
+async def test_register_preserves_display_case(client):
+    """Test that the username keeps the case it was registered with."""
+    response = await client.post(
+        "/api/v1/register",
+        json={
+            "username": "MixedCase",
+            "email": "Mixed@Example.com",
+            "full_name": "Mixed Case",
+            "password": "securepassword123",
+        },
+    )
+
+    assert response.status_code == 201
+    assert response.json()["username"] == "MixedCase"
+    assert response.json()["email"].startswith("Mixed@")
+
+
+@pytest.mark.asyncio
+async def test_duplicate_check_is_a_single_query(
+    session: AsyncSession, executed_statements
+):
+    """Test that username and email duplicates are found in one round trip."""
+    existing = await user_exists(
+        session, settings.FIRST_USERNAME.upper(), "test@EXAMPLE.com"
+    )
+
+    assert existing == {"username_exists": True, "email_exists": True}
+    assert len(executed_statements) == 1
+    assert "username_normalized" in executed_statements[0]
@@ -0,0 +1,194 @@
+"""Tests for opaque reference tokens and their session stores."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.core import sessions
+from app.core.config import settings
+from app.core.sessions import (
+    MemorySessionStore,
+    OpaqueTokenService,
+    PostgresSessionStore,
+    RespClient,
+    RespError,
+)
+
+
+@pytest.fixture()
+def opaque_tokens(monkeypatch) -> OpaqueTokenService:
+    """Switch the API to opaque tokens in a fresh in-memory store."""
+    service = OpaqueTokenService(MemorySessionStore(shards=4))
+    monkeypatch.setattr(settings, "TOKEN_MODE", "opaque")
+    monkeypatch.setattr(sessions, "_opaque_token_service", service)
+    return service
+
+
+async def _login(client: AsyncClient) -> dict[str, str]:
+    response = await client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME,
+            "password": settings.FIRST_PASSWORD.get_secret_value(),
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def _record(exp: float) -> dict[str, object]:
+    return {
+        "sub": "someone",
+        "type": "access",
+        "exp": int(exp),
+        "iat": int(time.time()),
+        "jti": "jti",
+        "epoch": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_login_issues_short_opaque_tokens(client, opaque_tokens):
+    """Test that /token issues random tokens backed by stored sessions."""
+    tokens = await _login(client)
+
+    assert len(tokens["access_token"]) < 64
+    assert "." not in tokens["access_token"]
+    assert len(opaque_tokens.store) == 2
+
+    response = await client.get(
+        "/api/v1/users/me",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert response.status_code == 200
+    assert response.json()["username"] == settings.FIRST_USERNAME
+
+
+@pytest.mark.asyncio
+async def test_logout_deletes_the_session(client, opaque_tokens):
+    """Test that logging out revokes the token by deleting its session."""
+    tokens = await _login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = await client.post("/api/v1/logout", headers=headers)
+    assert response.status_code == 200
+
+    response = await client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 401
+    assert len(opaque_tokens.store) == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_with_opaque_tokens(client, opaque_tokens):
+    """Test that refresh tokens work, and access tokens can't be used instead."""
+    tokens = await _login(client)
+
+    response = await client.post(
+        "/api/v1/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 200
+    new_access = response.json()["access_token"]
+    me_response = await client.get(
+        "/api/v1/users/me", headers={"Authorization": f"Bearer {new_access}"}
+    )
+    assert me_response.status_code == 200
+
+    response = await client.post(
+        "/api/v1/refresh", json={"refresh_token": tokens["access_token"]}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_logout_all_revokes_opaque_tokens(client, opaque_tokens):
+    """Test that bumping the token epoch also revokes stored sessions."""
+    first = await _login(client)
+    second = await _login(client)
+
+    response = await client.post(
+        "/api/v1/logout/all",
+        headers={"Authorization": f"Bearer {first['access_token']}"},
+    )
+    assert response.status_code == 200
+
+    response = await client.get(
+        "/api/v1/users/me",
+        headers={"Authorization": f"Bearer {second['access_token']}"},
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_introspect_opaque_tokens(client, opaque_tokens, admin_token_headers):
+    """Test batch introspection of opaque tokens."""
+    tokens = await _login(client)
+
+    response = await client.post(
+        "/api/v1/introspect",
+        json={"tokens": [tokens["refresh_token"], "not-a-token"]},
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 200
+    first, second = response.json()["results"]
+    assert first["active"] is True
+    assert first["token_type"] == "refresh"
+    assert second["active"] is False
+
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_records():
+    """Test that expired records are dropped on read and by sweeps."""
+    store = MemorySessionStore(shards=2, sweep_interval=0)
+    await store.put("live", _record(time.time() + 60))
+    await store.put("expired", _record(time.time() - 1))
+
+    assert await store.get("expired") is None
+    assert await store.get("live") is not None
+
+    await store.put("expired-a", _record(time.time() - 1))
+    await store.put("expired-b", _record(time.time() - 1))
+    await store.put("live-b", _record(time.time() + 60))
+    assert len(store) == 2
+
+
+@pytest.mark.asyncio
+async def test_postgres_store(connection: AsyncConnection):
+    """Test the Postgres session store round trip."""
+    store = PostgresSessionStore(
+        lambda: AsyncSession(connection, expire_on_commit=False)
+    )
+    await store.put("a" * 64, _record(time.time() + 60))
+    await store.put("b" * 64, _record(time.time() - 1))
+
+    record = await store.get("a" * 64)
+    assert record is not None
+    assert record["sub"] == "someone"
+    assert record["type"] == "access"
+    assert await store.get_many(["b" * 64, "a" * 64, "c" * 64]) == [None, record, None]
+
+    assert await store.purge_expired() == 1
+    assert await store.delete("a" * 64) is True
+    assert await store.delete("a" * 64) is False
+
+
+@pytest.mark.asyncio
+async def test_resp_wire_format():
+    """Test RESP command encoding and reply parsing."""
+    assert RespClient.encode("SET", "k", b"v", "PX", 1500) == (
+        b"*5\r\n$3\r\nSET\r\n$1\r\nk\r\n$1\r\nv\r\n$2\r\nPX\r\n$4\r\n1500\r\n"
+    )
+
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"+OK\r\n:2\r\n$-1\r\n*2\r\n$3\r\nabc\r\n$-1\r\n-ERR nope\r\n")
+    assert await RespClient.read_reply(reader) == "OK"
+    assert await RespClient.read_reply(reader) == 2
+    assert await RespClient.read_reply(reader) is None
+    assert await RespClient.read_reply(reader) == [b"abc", None]
+    with pytest.raises(RespError, match="ERR nope"):
+        await RespClient.read_reply(reader)
@@ -0,0 +1,96 @@
+"""Tests for the memory-mapped revocation table shared by a host's workers."""
+
+from __future__ import annotations
+
+import multiprocessing
+import time
+from pathlib import Path
+
+import pytest
+
+from app.core import security
+from app.core.config import settings
+from app.core.revocation import MmapRevocationTable, RevocationTableFull
+
+
+def _revoke_in_child(path: str, jti: str) -> None:
+    MmapRevocationTable(path).blacklist_token(jti, time.time() + 60)
+
+
+def test_revocations_survive_reopening(tmp_path: Path):
+    """Test that a restarted worker still sees earlier revocations."""
+    path = str(tmp_path / "revoked.bin")
+    table = MmapRevocationTable(path, capacity=1000)
+    assert table.capacity == 1024
+    table.blacklist_token("revoked", time.time() + 60)
+    table.close()
+
+    reopened = MmapRevocationTable(path, capacity=16)
+
+    assert reopened.capacity == 1024
+    assert reopened.is_blacklisted("revoked")
+    assert not reopened.is_blacklisted("other")
+    assert len(reopened) == 1
+
+
+def test_revocations_are_shared_between_processes(tmp_path: Path):
+    """Test that a revocation by another worker process is seen without a reload."""
+    path = str(tmp_path / "revoked.bin")
+    table = MmapRevocationTable(path, capacity=64)
+
+    child = multiprocessing.get_context("fork").Process(
+        target=_revoke_in_child, args=(path, "from-child")
+    )
+    child.start()
+    child.join(10)
+
+    assert child.exitcode == 0
+    assert table.is_blacklisted("from-child")
+
+
+def test_expired_slots_are_reused(tmp_path: Path):
+    """Test that expired revocations stop matching and free their slots."""
+    table = MmapRevocationTable(str(tmp_path / "revoked.bin"), capacity=4)
+    for n in range(4):
+        table.blacklist_token(f"old{n}", time.time() - 10)
+    assert not table.is_blacklisted("old0")
+
+    for n in range(4):
+        table.blacklist_token(f"new{n}", time.time() + 60)
+
+    assert all(table.is_blacklisted(f"new{n}") for n in range(4))
+    assert len(table) == 4
+    with pytest.raises(RevocationTableFull):
+        table.blacklist_token("one-too-many", time.time() + 60)
+
+
+def test_rejects_other_files(tmp_path: Path):
+    """Test that an unrelated file is not mistaken for a table."""
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a table" * 10)
+
+    with pytest.raises(ValueError):
+        MmapRevocationTable(str(path))
+
+
+@pytest.mark.asyncio
+async def test_logout_is_seen_by_other_workers(client, tmp_path: Path, monkeypatch):
+    """Test that a token logged out on one worker is rejected by another."""
+    path = str(tmp_path / "revoked.bin")
+    monkeypatch.setattr(security, "_token_blacklist", MmapRevocationTable(path))
+    response = await client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME,
+            "password": settings.FIRST_PASSWORD.get_secret_value(),
+        },
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = await client.post("/api/v1/logout", headers=headers)
+    assert response.status_code == 200
+
+    # Another worker maps the same file
+    monkeypatch.setattr(security, "_token_blacklist", MmapRevocationTable(path))
+    response = await client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 401
@@ -0,0 +1,155 @@
+"""Tests for the batch token introspection endpoint."""
+
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import settings
+
+
+async def _login(client: AsyncClient, username: str, password: str) -> dict[str, str]:
+    response = await client.post(
+        "/api/v1/token", data={"username": username, "password": password}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_introspect_requires_authentication(client):
+    """Test that introspection is only available to authenticated callers."""
+    response = await client.post("/api/v1/introspect", json={"tokens": ["abc"]})
+
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_introspect_requires_superuser(client, superuser_token_headers):
+    """Test that ordinary users can't probe other users' tokens."""
+    response = await client.post(
+        "/api/v1/introspect",
+        json={"tokens": ["abc"]},
+        headers=superuser_token_headers,
+    )
+
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_introspect_reports_tokens_in_request_order(client, admin_token_headers):
+    """Test that each token gets a result, in the order they were sent."""
+    tokens = await _login(
+        client, settings.FIRST_USERNAME, settings.FIRST_PASSWORD.get_secret_value()
+    )
+
+    response = await client.post(
+        "/api/v1/introspect",
+        json={
+            "tokens": [
+                tokens["access_token"],
+                "not-a-token",
+                tokens["refresh_token"],
+            ]
+        },
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["active"] for result in results] == [True, False, True]
+
+    assert results[0]["sub"] == settings.FIRST_USERNAME
+    assert results[0]["username"] == settings.FIRST_USERNAME
+    assert results[0]["token_type"] == "access"
+    assert isinstance(results[0]["exp"], int)
+    assert results[2]["token_type"] == "refresh"
+
+    # Inactive tokens reveal nothing beyond their state
+    assert results[1] == {
+        "active": False,
+        "sub": None,
+        "username": None,
+        "token_type": None,
+        "exp": None,
+        "iat": None,
+        "jti": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_introspect_marks_logged_out_tokens_inactive(client, admin_token_headers):
+    """Test that blacklisted tokens are reported as inactive."""
+    tokens = await _login(
+        client, settings.FIRST_USERNAME, settings.FIRST_PASSWORD.get_secret_value()
+    )
+    await client.post(
+        "/api/v1/logout",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+
+    response = await client.post(
+        "/api/v1/introspect",
+        json={"tokens": [tokens["access_token"]]},
+        headers=admin_token_headers,
+    )
+
+    assert response.json()["results"] == [
+        {
+            "active": False,
+            "sub": None,
+            "username": None,
+            "token_type": None,
+            "exp": None,
+            "iat": None,
+            "jti": None,
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_introspect_resolves_all_subjects_with_one_query(
+    client, admin_token_headers, executed_statements
+):
+    """Test that many tokens for many users cost a single user query."""
+    tokens = []
+    for index in range(3):
+        username = f"gatewayuser{index}"
+        await client.post(
+            "/api/v1/register",
+            json={
+                "username": username,
+                "email": f"{username}@example.com",
+                "full_name": "Gateway User",
+                "password": "securepassword123",
+            },
+        )
+        login = await _login(client, username, "securepassword123")
+        tokens.extend([login["access_token"], login["refresh_token"]])
+
+    executed_statements.clear()
+    response = await client.post(
+        "/api/v1/introspect",
+        json={"tokens": tokens},
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 200
+    assert all(result["active"] for result in response.json()["results"])
+
+    # One query authenticates the caller, one resolves every token subject
+    user_queries = [s for s in executed_statements if "FROM users" in s]
+    assert len(user_queries) == 2
+    assert " IN " in user_queries[-1]
+
+
+@pytest.mark.asyncio
+async def test_introspect_rejects_too_many_tokens(client, admin_token_headers):
+    """Test that batches above the limit are rejected."""
+    response = await client.post(
+        "/api/v1/introspect",
+        json={"tokens": ["token"] * 101},
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 422
@@ -0,0 +1,118 @@
+"""Tests for revoking all of a user's tokens at once."""
+
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import get_token_epochs, revoke_user_tokens
+from app.models.user import User
+
+
+async def _login(client: AsyncClient) -> dict[str, str]:
+    response = await client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME,
+            "password": settings.FIRST_PASSWORD.get_secret_value(),
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_logout_all_requires_authentication(client):
+    """Test that logging out everywhere requires a valid token."""
+    response = await client.post("/api/v1/logout/all")
+
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_logout_all_revokes_every_access_and_refresh_token(client):
+    """Test that logging out everywhere invalidates all previously issued tokens."""
+    first = await _login(client)
+    second = await _login(client)
+
+    response = await client.post(
+        "/api/v1/logout/all",
+        headers={"Authorization": f"Bearer {first['access_token']}"},
+    )
+    assert response.status_code == 200
+
+    for tokens in (first, second):
+        me_response = await client.get(
+            "/api/v1/users/me",
+            headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        )
+        assert me_response.status_code == 401
+
+        refresh_response = await client.post(
+            "/api/v1/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert refresh_response.status_code == 401
+        assert refresh_response.json()["error"] == "invalid_grant"
+
+
+@pytest.mark.asyncio
+async def test_login_after_logout_all_issues_working_tokens(client):
+    """Test that tokens issued after a revocation are accepted."""
+    old = await _login(client)
+    await client.post(
+        "/api/v1/logout/all",
+        headers={"Authorization": f"Bearer {old['access_token']}"},
+    )
+
+    new = await _login(client)
+    response = await client.get(
+        "/api/v1/users/me", headers={"Authorization": f"Bearer {new['access_token']}"}
+    )
+    assert response.status_code == 200
+
+    refresh_response = await client.post(
+        "/api/v1/refresh", json={"refresh_token": new["refresh_token"]}
+    )
+    assert refresh_response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_epoch_bumped_by_another_worker_revokes_tokens(
+    client, session: AsyncSession
+):
+    """Test that an epoch bump this process never saw still revokes tokens."""
+    tokens = await _login(client)
+
+    await session.execute(
+        update(User)
+        .where(User.username == settings.FIRST_USERNAME)
+        .values(token_epoch=User.token_epoch + 100)
+    )
+    await session.commit()
+
+    response = await client.get(
+        "/api/v1/users/me",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_revocation_matches_usernames_case_insensitively(
+    client, session: AsyncSession
+):
+    """Test that revoking by another spelling of the username still applies."""
+    tokens = await _login(client)
+
+    epoch = await revoke_user_tokens(session, settings.FIRST_USERNAME.upper())
+
+    assert epoch == 1
+    assert get_token_epochs().get(settings.FIRST_USERNAME) == 1
+    response = await client.get(
+        "/api/v1/users/me",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert response.status_code == 401
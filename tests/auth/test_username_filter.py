@@ -0,0 +1,226 @@
+"""Tests for the Bloom filter of usernames on the login path."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import security
+from app.core import username_filter as username_filter_module
+from app.core.config import settings
+from app.core.rebalance import SHARD_ID_STRIDE
+from app.core.username_filter import BloomFilter, UsernameFilter
+from app.models import normalize_identity
+from app.models.user import User
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test that every added item is found and few others are."""
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    for n in range(10_000):
+        bloom.add(f"user{n}")
+
+    assert all(f"user{n}" in bloom for n in range(10_000))
+    false_positives = sum(f"other{n}" in bloom for n in range(10_000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_unbuilt_filter_lets_everything_through(username_filter):
+    """Test that nothing is ruled out before the first build."""
+    assert not username_filter.ready
+    assert username_filter.might_exist("nobody")
+
+
+@pytest.mark.asyncio
+async def test_build_scans_existing_usernames(username_filter: UsernameFilter):
+    """Test that a build includes every user in the table."""
+    await username_filter.build()
+
+    assert username_filter.ready
+    assert username_filter.might_exist(normalize_identity(settings.FIRST_USERNAME))
+    assert not username_filter.might_exist("nobody")
+
+
+def _spy_on_password_checks(monkeypatch) -> list[tuple[str, int]]:
+    """Record the hash and thread of every password check."""
+    checks: list[tuple[str, int]] = []
+    verify_password = security.verify_password
+
+    def spy(plain_password: str, hashed_password: str) -> bool:
+        checks.append((hashed_password, threading.get_ident()))
+        return verify_password(plain_password, hashed_password)
+
+    monkeypatch.setattr(security, "verify_password", spy)
+    return checks
+
+
+@pytest.mark.asyncio
+async def test_unknown_username_is_only_probed(
+    client, username_filter, executed_statements, monkeypatch
+):
+    """Test that ruled-out usernames aren't loaded but still check a hash."""
+    await username_filter.build()
+    checks = _spy_on_password_checks(monkeypatch)
+    executed_statements.clear()
+
+    response = await client.post(
+        "/api/v1/token", data={"username": "nobody", "password": "whatever123"}
+    )
+
+    assert response.status_code == 401
+    user_queries = [s for s in executed_statements if "FROM users" in s]
+    assert len(user_queries) == 1
+    assert user_queries[0].startswith("SELECT EXISTS")
+    # Same bcrypt cost as a wrong password, so timing doesn't reveal the miss
+    assert len(checks) == 1
+
+
+@pytest.mark.asyncio
+async def test_password_checks_run_off_the_event_loop(
+    client, username_filter, monkeypatch
+):
+    """Test that known and unknown usernames both check a hash in a thread."""
+    await username_filter.build()
+    checks = _spy_on_password_checks(monkeypatch)
+
+    for username in ("nobody", settings.FIRST_USERNAME):
+        await client.post(
+            "/api/v1/token",
+            data={
+                "username": username,
+                "password": settings.FIRST_PASSWORD.get_secret_value(),
+            },
+        )
+
+    assert len(checks) == 2
+    assert threading.get_ident() not in {thread for _, thread in checks}
+
+
+@pytest.mark.asyncio
+async def test_registered_user_can_log_in(client, username_filter):
+    """Test that users created by this worker are added to the filter."""
+    await username_filter.build()
+    user_data = {
+        "username": "NewComer",
+        "email": "newcomer@example.com",
+        "full_name": "New Comer",
+        "password": "newcomerpassword123",
+    }
+    response = await client.post("/api/v1/register", json=user_data)
+    assert response.status_code == 201
+
+    response = await client.post(
+        "/api/v1/token",
+        data={"username": "newcomer", "password": user_data["password"]},
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_refresh_picks_up_users_from_other_workers(
+    username_filter: UsernameFilter, session: AsyncSession
+):
+    """Test that a tail scan adds users created elsewhere."""
+    await username_filter.build()
+    session.add(
+        User(
+            username="elsewhere",
+            email="elsewhere@example.com",
+            full_name="Created Elsewhere",
+            hashed_password="not-a-real-hash",
+            is_active=True,
+            is_superuser=False,
+        )
+    )
+    await session.commit()
+    assert not username_filter.might_exist("elsewhere")
+
+    await username_filter.refresh()
+
+    assert username_filter.might_exist("elsewhere")
+
+
+def _user(username: str, user_id: int | None = None) -> User:
+    return User(
+        id=user_id,
+        username=username,
+        email=f"{username}@example.com",
+        full_name="Created Elsewhere",
+        hashed_password="not-a-real-hash",
+        is_active=True,
+        is_superuser=False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_rebuild_catches_users_the_tail_scan_missed(
+    username_filter: UsernameFilter, session: AsyncSession, monkeypatch
+):
+    """Test that a row committed below the scanned tail shows up after a rebuild."""
+    monkeypatch.setattr(username_filter_module, "TAIL_OVERLAP", 0)
+    username_filter.refresh_interval = 0.01
+    username_filter.rebuild_interval = 0.2
+    session.add(_user("latest", user_id=100))
+    await session.commit()
+    await username_filter.build()
+
+    # Its id was assigned before "latest", but it committed after the scan
+    session.add(_user("straggler", user_id=50))
+    await session.commit()
+    await username_filter.refresh()
+    assert not username_filter.might_exist("straggler")
+
+    username_filter.start()
+    try:
+        for _ in range(100):
+            if username_filter.might_exist("straggler"):
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await username_filter.stop()
+
+    assert username_filter.might_exist("straggler")
+
+
+@pytest.mark.asyncio
+async def test_tail_overlap_counts_rows_not_ids(
+    username_filter: UsernameFilter, session: AsyncSession
+):
+    """Test that stragglers are caught when ids are a shard stride apart."""
+    await username_filter.build()
+    session.add(_user("latest", user_id=1 + 2 * SHARD_ID_STRIDE))
+    await session.commit()
+    await username_filter.refresh()
+
+    session.add(_user("straggler", user_id=1 + SHARD_ID_STRIDE))
+    await session.commit()
+    await username_filter.refresh()
+
+    assert username_filter.might_exist("straggler")
+
+
+@pytest.mark.asyncio
+async def test_user_the_filter_missed_can_log_in(
+    client, username_filter: UsernameFilter, session: AsyncSession, monkeypatch
+):
+    """Test that a user added behind the filter's back isn't rejected."""
+    monkeypatch.setattr(settings, "USERNAME_FILTER_ENABLED", True)
+    await username_filter.build()
+    # As if registered on another worker since this one's last refresh
+    user = _user("elsewhere")
+    user.hashed_password = security.get_password_hash("elsewherepassword1")
+    session.add(user)
+    await session.commit()
+    assert not username_filter.might_exist("elsewhere")
+
+    response = await client.post(
+        "/api/v1/token",
+        data={"username": "Elsewhere", "password": "elsewherepassword1"},
+    )
+
+    assert response.status_code == 200
+    assert username_filter.might_exist("elsewhere")
@@ -8,11 +8,21 @@ from fastapi import Request
 from httpx import ASGITransport, AsyncClient
 from pytest_postgresql import factories
 from slowapi import Limiter
+from sqlalchemy import event, update
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
 
-from app.api.deps import get_session
+from app.api.deps import get_read_session_opener, get_session
+from app.core import security
+from app.core import username_filter as username_filter_module
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.login_events import LoginEventWriter, get_login_event_writer
+from app.core.security import (
+    TokenBlacklist,
+    TokenEpochRegistry,
+    UserVersionCache,
+    get_password_hash,
+)
+from app.core.username_filter import UsernameFilter
 from app.main import app
 from app.models.base import Base
 from app.models.user import User
@@ -49,8 +59,9 @@ async def connection(postgresql):
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
         yield conn
-        # Clean up tables after test
-        await conn.run_sync(Base.metadata.drop_all)
+        # Clean up after test: rolling back also drops the tables and closes
+        # any server-side cursors still open in this transaction
+        await conn.rollback()
 
     # Close the engine
     await engine.dispose()
@@ -75,10 +86,59 @@ async def session(connection: AsyncConnection):
         yield _session
 
 
+@pytest.fixture()
+def executed_statements(connection: AsyncConnection):
+    """Collect the SQL statements executed on the test connection."""
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(connection.sync_connection, "before_cursor_execute", record)
+    yield statements
+    event.remove(connection.sync_connection, "before_cursor_execute", record)
+
+
+@pytest.fixture()
+def login_event_writer(connection: AsyncConnection) -> LoginEventWriter:
+    """Buffer login events on the test connection; tests flush explicitly."""
+    return LoginEventWriter(
+        lambda: AsyncSession(connection, expire_on_commit=False),
+        flush_interval=3600,
+    )
+
+
+@pytest.fixture(autouse=True)
+def username_filter(
+    connection: AsyncConnection, monkeypatch: pytest.MonkeyPatch
+) -> UsernameFilter:
+    """Username filter on the test connection; unbuilt until a test builds it."""
+    test_filter = UsernameFilter(
+        lambda: AsyncSession(connection, expire_on_commit=False)
+    )
+    monkeypatch.setattr(settings, "USERNAME_FILTER_ENABLED", False)
+    monkeypatch.setattr(username_filter_module, "_username_filter", test_filter)
+    return test_filter
+
+
+@pytest.fixture(autouse=True)
+def reset_token_state(monkeypatch):
+    """Start every test, like its fresh database, with no revocations cached."""
+    monkeypatch.setattr(security, "_token_blacklist", TokenBlacklist())
+    monkeypatch.setattr(security, "_token_epochs", TokenEpochRegistry())
+    monkeypatch.setattr(security, "_user_versions", UserVersionCache())
+
+
 @pytest_asyncio.fixture(autouse=True)
-async def override_dependency(session: AsyncSession):
+async def override_dependency(
+    session: AsyncSession, login_event_writer: LoginEventWriter
+):
     # Override database dependency
     app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session_opener] = lambda: (
+        lambda: AsyncSession(session.bind, expire_on_commit=False)
+    )
+    app.dependency_overrides[get_login_event_writer] = lambda: login_event_writer
 
     # Override rate limiter for tests
     original_limiter = app.state.limiter
@@ -116,3 +176,23 @@ async def superuser_token_headers(client: AsyncClient) -> Dict[str, str]:
     res = await client.post("/api/v1/token", data=login_data)
     access_token = res.json()["access_token"]
     return {"Authorization": f"Bearer {access_token}"}
+
+
+@pytest_asyncio.fixture()
+async def admin_token_headers(
+    client: AsyncClient, session: AsyncSession
+) -> Dict[str, str]:
+    """Promote the test user to superuser and return its auth headers."""
+    await session.execute(
+        update(User)
+        .where(User.username == settings.FIRST_USERNAME)
+        .values(is_superuser=True)
+    )
+    await session.commit()
+    login_data = {
+        "username": settings.FIRST_USERNAME,
+        "password": settings.FIRST_PASSWORD.get_secret_value(),
+    }
+    res = await client.post("/api/v1/token", data=login_data)
+    access_token = res.json()["access_token"]
+    return {"Authorization": f"Bearer {access_token}"}
@@ -0,0 +1,124 @@
+"""Tests for the synthetic dataset generator."""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+
+from app.core.security import authenticate_user
+from app.models.base import Base
+from tests.scripts import load_script
+
+
+@pytest.fixture(scope="module")
+def generate_users() -> Any:
+    return load_script("generate_users")
+
+
+@pytest_asyncio.fixture()
+async def load_engine(postgresql) -> AsyncIterator[AsyncEngine]:
+    """Engine on the test database, whose schema is committed."""
+    engine = create_async_engine(
+        f"postgresql+asyncpg://{postgresql.info.user}@{postgresql.info.host}:"
+        f"{postgresql.info.port}/{postgresql.info.dbname}"
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture()
+async def connection(load_engine: AsyncEngine) -> AsyncIterator[AsyncConnection]:
+    """Connection for fixtures; unlike elsewhere, the schema is committed.
+
+    COPY commits each batch on its own connection, which the usual
+    rolled-back outer transaction would never see.
+    """
+    async with load_engine.connect() as conn:
+        yield conn
+
+
+def _args(generate_users: Any, *argv: str) -> argparse.Namespace:
+    parser_argv = ["generate_users.py", "--count", "50", "--revoked-ratio", "0.5"]
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr("sys.argv", [*parser_argv, *argv])
+        return generate_users.parse_args()
+
+
+def _generate(generate_users: Any, args: argparse.Namespace) -> tuple[Any, ...]:
+    rows = list(generate_users.user_rows(args, 0, args.count))
+    revoked, logins = io.StringIO(), io.StringIO()
+    generate_users.write_fixtures(args, rows, revoked, logins)
+    return rows, revoked.getvalue(), logins.getvalue()
+
+
+def test_same_seed_generates_the_same_dataset(generate_users):
+    """Test that users and fixtures are reproducible from the seed alone."""
+    first = _generate(generate_users, _args(generate_users, "--seed", "7"))
+    second = _generate(generate_users, _args(generate_users, "--seed", "7"))
+    other = _generate(generate_users, _args(generate_users, "--seed", "8"))
+
+    rows, revoked, logins = first
+    assert revoked and logins
+    assert first == second
+    assert other[0] != rows
+    assert other[1] != revoked
+
+
+def test_fixtures_are_timestamped_relative_to_now(generate_users):
+    """Test that --now, not the wall clock, anchors the fixture timestamps."""
+    args = _args(generate_users, "--now", "2030-06-01T12:00:00")
+    _, revoked, logins = _generate(generate_users, args)
+
+    now = datetime(2030, 6, 1, 12, tzinfo=timezone.utc)
+    for line in revoked.splitlines():
+        assert 0 < json.loads(line)["exp"] - now.timestamp() <= 30 * 60
+    for line in logins.splitlines():
+        occurred_at = datetime.fromisoformat(json.loads(line)["occurred_at"])
+        assert 0 <= (now - occurred_at).days <= 90
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hash_mode", ["shared", "parallel"])
+async def test_generated_users_can_log_in(
+    generate_users, load_engine, monkeypatch, tmp_path, hash_mode
+):
+    """Test that loaded users authenticate with the emitted password scheme."""
+    scheme_path = tmp_path / "passwords.json"
+    args = _args(
+        generate_users,
+        *("--count", "4", "--start", "10", "--batch-size", "3"),
+        *("--hash-mode", hash_mode, "--bcrypt-rounds", "4", "--workers", "2"),
+        *("--inactive-ratio", "0", "--password-scheme-out", str(scheme_path)),
+    )
+    monkeypatch.setattr(generate_users, "engine", load_engine)
+
+    await generate_users.generate(args)
+
+    scheme = json.loads(scheme_path.read_text())
+    assert scheme["hash_mode"] == hash_mode
+    assert scheme["numbers"] == [10, 14]
+    async with AsyncSession(load_engine) as session:
+        for n in (10, 13):
+            username = scheme["username"].format(n=n)
+            password = scheme["password"].format(n=n)
+            user = await authenticate_user(session, username, password)
+            assert user is not None and user.username == username
+            wrong = await authenticate_user(session, username, f"{password}x")
+            assert wrong is None
+    if hash_mode == "parallel":
+        assert scheme["password"].format(n=10) == f"{args.password}10"
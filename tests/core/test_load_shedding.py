@@ -0,0 +1,192 @@
+"""Tests for adaptive concurrency limiting and load shedding."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from app.core import load_shedding
+from app.core.config import settings
+from app.core.load_shedding import AdaptiveLimiter, LoadShedder, RouteClass
+
+
+def _route_class(name: str, prefixes: tuple[str, ...]) -> RouteClass:
+    return RouteClass(
+        name,
+        prefixes,
+        initial_limit=1,
+        max_limit=1,
+        target_latency=10.0,
+        max_queue=0,
+        queue_timeout=0.1,
+    )
+
+
+@pytest.fixture()
+def tight_shedder(monkeypatch) -> LoadShedder:
+    """Install a shedder allowing one request per class and no queueing."""
+    shedder = LoadShedder(
+        [_route_class("credentials", ("/token",)), _route_class("default", ("",))],
+        prefix=settings.V1_STR,
+    )
+    monkeypatch.setattr(load_shedding, "_load_shedder", shedder)
+    return shedder
+
+
+@pytest.mark.asyncio
+async def test_requests_under_the_limit_are_admitted():
+    """Test that slots are granted immediately while below the limit."""
+    limiter = AdaptiveLimiter(initial_limit=2, max_queue=0)
+
+    assert await limiter.acquire()
+    assert await limiter.acquire()
+    assert not await limiter.acquire()
+    assert limiter.in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_queued_request_gets_the_released_slot():
+    """Test that a waiting request is admitted when a slot frees up."""
+    limiter = AdaptiveLimiter(initial_limit=1, max_queue=1, queue_timeout=5.0)
+    assert await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queued == 1
+
+    limiter.release(time.monotonic())
+
+    assert await waiter
+    assert limiter.in_flight == 1
+    assert limiter.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_request_is_shed_after_its_deadline():
+    """Test that a request waiting longer than the queue timeout is rejected."""
+    limiter = AdaptiveLimiter(initial_limit=1, max_queue=1, queue_timeout=0.01)
+    assert await limiter.acquire()
+
+    assert not await limiter.acquire()
+    assert limiter.queued == 0
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    """Test that a cancelled waiter neither blocks the queue nor leaks a slot."""
+    limiter = AdaptiveLimiter(initial_limit=1, max_queue=1, queue_timeout=5.0)
+    assert await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert limiter.queued == 0
+    limiter.release(time.monotonic())
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_requests_shrink_the_limit_once_per_window():
+    """Test multiplicative decrease, applied once for a burst of slow requests."""
+    limiter = AdaptiveLimiter(initial_limit=10, target_latency=0.1, backoff=0.5)
+    admitted_at = time.monotonic()
+    for _ in range(5):
+        assert await limiter.acquire()
+
+    for _ in range(5):
+        limiter.release(admitted_at, latency=1.0)
+
+    assert limiter.limit == 5
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_fast_saturated_requests_grow_the_limit():
+    """Test additive increase when the limit, not latency, was the bottleneck."""
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=3, target_latency=1.0)
+
+    for _ in range(10):
+        assert await limiter.acquire()
+        assert await limiter.acquire()
+        limiter.release(time.monotonic(), latency=0.01)
+        limiter.release(time.monotonic(), latency=0.01)
+
+    assert limiter.limit == 3
+
+
+@pytest.mark.asyncio
+async def test_limit_never_drops_below_minimum():
+    """Test that repeated slow samples stop at the minimum limit."""
+    limiter = AdaptiveLimiter(initial_limit=4, min_limit=2, target_latency=0.0)
+
+    for _ in range(20):
+        assert await limiter.acquire()
+        limiter.release(time.monotonic(), latency=1.0)
+
+    assert limiter.limit == 2
+
+
+def test_paths_map_to_their_route_class():
+    """Test that v1 paths are classified and other paths are not limited."""
+    shedder = LoadShedder(prefix=settings.V1_STR)
+
+    assert shedder.limiter_for("/api/v1/token") is shedder.limiters["credentials"]
+    assert shedder.limiter_for("/api/v1/admin/users") is shedder.limiters["admin"]
+    assert shedder.limiter_for("/api/v1/users/me") is shedder.limiters["default"]
+    assert shedder.limiter_for("/health") is None
+
+
+@pytest.mark.asyncio
+async def test_over_capacity_requests_get_503_with_retry_after(
+    client: AsyncClient, tight_shedder: LoadShedder
+):
+    """Test that a request beyond capacity is rejected immediately."""
+    assert await tight_shedder.limiters["default"].acquire()
+
+    response = await client.post("/api/v1/users/lookup", json={"usernames": ["x"]})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(
+        settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS
+    )
+
+
+@pytest.mark.asyncio
+async def test_saturated_logins_do_not_starve_other_routes(
+    client: AsyncClient, superuser_token_headers, tight_shedder: LoadShedder
+):
+    """Test that each route class has its own capacity."""
+    assert await tight_shedder.limiters["credentials"].acquire()
+
+    login = await client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME,
+            "password": settings.FIRST_PASSWORD.get_secret_value(),
+        },
+    )
+    me = await client.get("/api/v1/users/me", headers=superuser_token_headers)
+
+    assert login.status_code == 503
+    assert me.status_code == 200
+    assert tight_shedder.limiters["default"].in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_health_check_is_never_shed(
+    client: AsyncClient, tight_shedder: LoadShedder
+):
+    """Test that orchestration probes bypass the limits."""
+    for limiter in tight_shedder.limiters.values():
+        assert await limiter.acquire()
+
+    response = await client.get("/health")
+
+    assert response.status_code != 503
@@ -0,0 +1,126 @@
+"""Tests for the structured, queue-based logging pipeline."""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+import queue
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.logging import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    SamplingFilter,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+def _record(name: str = "app.test", **attrs) -> logging.LogRecord:
+    record = logging.LogRecord(
+        name, logging.INFO, __file__, 1, "hello %s", ("world",), None
+    )
+    record.__dict__.update(attrs)
+    return record
+
+
+def _access_lines(buffer: io.StringIO) -> list[dict]:
+    lines = [json.loads(line) for line in buffer.getvalue().splitlines()]
+    return [line for line in lines if line["logger"] == "app.access"]
+
+
+def test_json_formatter_includes_context_and_fields():
+    """Test that records become one JSON object with context merged in."""
+    record = _record(context={"request_id": "abc"}, fields={"status": 200})
+
+    payload = json.loads(JsonFormatter().format(record))
+
+    assert payload["message"] == "hello world"
+    assert payload["level"] == "INFO"
+    assert payload["request_id"] == "abc"
+    assert payload["status"] == 200
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """Test that a slow sink costs dropped records, not a blocked caller."""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+
+    for _ in range(5):
+        handler.handle(_record())
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_sampling_only_thins_successful_access_logs():
+    """Test that failures and other loggers are never sampled away."""
+    sampler = SamplingFilter(rate=0.0)
+
+    assert not sampler.filter(_record("app.access", fields={"status": 200}))
+    assert sampler.filter(_record("app.access", fields={"status": 404}))
+    assert sampler.filter(_record("app.access", fields={"status": 503}))
+    assert sampler.filter(_record("app.other"))
+
+
+def test_prepare_snapshots_the_message():
+    """Test that arguments are interpolated before the record is queued."""
+    handler = DroppingQueueHandler(queue.Queue())
+    args = ["before"]
+    record = logging.LogRecord(
+        "app.test", logging.INFO, __file__, 1, "%s", (args,), None
+    )
+
+    handler.handle(record)
+    args[0] = "after"
+
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "['before']"
+
+
+@pytest.mark.asyncio
+async def test_access_log_carries_request_context(
+    client: AsyncClient, superuser_token_headers
+):
+    """Test that access lines carry request id, route, user and DB time."""
+    buffer = io.StringIO()
+    setup_logging(stream=buffer, json_format=True, sample_rate=1.0)
+    try:
+        response = await client.get(
+            "/api/v1/users/me",
+            headers={**superuser_token_headers, "X-Request-ID": "req-123"},
+        )
+    finally:
+        shutdown_logging()
+
+    assert response.headers["X-Request-ID"] == "req-123"
+    (line,) = _access_lines(buffer)
+    assert line["request_id"] == "req-123"
+    assert line["route"] == "/api/v1/users/me"
+    assert line["user"]
+    assert line["status"] == 200
+    assert line["db_time_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_generated_when_missing(client: AsyncClient):
+    """Test that every response gets a request id."""
+    response = await client.get("/health")
+
+    assert response.headers["X-Request-ID"]
+
+
+@pytest.mark.asyncio
+async def test_sampled_out_successes_are_not_written(client: AsyncClient):
+    """Test that a zero sample rate keeps failed requests only."""
+    buffer = io.StringIO()
+    setup_logging(stream=buffer, json_format=True, sample_rate=0.0)
+    try:
+        await client.get("/health")
+        await client.get("/api/v1/users/me")
+    finally:
+        shutdown_logging()
+
+    assert [line["status"] for line in _access_lines(buffer)] == [401]
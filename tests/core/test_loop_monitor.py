@@ -0,0 +1,101 @@
+"""Tests for the event loop lag monitor and its watchdog."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import bcrypt
+import pytest
+
+from app.core.loop_monitor import LoopLagMonitor
+from app.core.security import verify_password
+
+
+@pytest.fixture()
+async def monitor():
+    """A running monitor with a short interval and threshold."""
+    lag_monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+    lag_monitor.start()
+    yield lag_monitor
+    await lag_monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_lag_is_observed_continuously(monitor):
+    """Test that the probe records a lag sample every interval."""
+    before = monitor.lag.count
+    await asyncio.sleep(0.2)
+
+    assert monitor.lag.count - before >= 5
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_located(monitor, caplog):
+    """Test that the watchdog names the blocking app function by file and line."""
+    hashed = bcrypt.hashpw(b"password", bcrypt.gensalt(rounds=12)).decode()
+    await asyncio.sleep(0.05)
+    before = monitor.lag.count
+
+    verify_password("password", hashed)
+    await asyncio.sleep(0.05)
+
+    locations = [
+        record.fields["location"]
+        for record in caplog.records
+        if record.name == "app.core.loop_monitor"
+    ]
+    assert locations
+    assert locations[-1].startswith("app/core/security.py:")
+    assert locations[-1].endswith(" verify_password")
+    assert "verify_password" in caplog.records[-1].getMessage()
+    assert monitor.stalls.value(locations[-1]) >= 1
+    # The stall shows up in the histogram once the loop is free again
+    assert monitor.lag.count > before
+
+
+@pytest.mark.asyncio
+async def test_one_report_per_stall(monitor, caplog):
+    """Test that a long stall is reported once, not on every watchdog check."""
+    await asyncio.sleep(0.05)
+    time.sleep(0.3)
+    await asyncio.sleep(0.05)
+
+    reports = [r for r in caplog.records if r.name == "app.core.loop_monitor"]
+    assert len(reports) == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_stalls_are_logged_once_per_interval(monitor, caplog):
+    """Test that a location stalling the loop again is counted, not re-logged."""
+
+    async def stall() -> None:
+        time.sleep(0.1)
+        await asyncio.sleep(0.05)
+
+    await asyncio.sleep(0.05)
+    for _ in range(3):
+        await stall()
+
+    reports = [r for r in caplog.records if r.name == "app.core.loop_monitor"]
+    assert len(reports) == 1
+    assert monitor.stalls.value(reports[0].fields["location"]) == 3
+
+    monitor.report_interval = 0.0
+    await stall()
+
+    reports = [r for r in caplog.records if r.name == "app.core.loop_monitor"]
+    assert [r.fields["location"] for r in reports[1:]] == [
+        reports[0].fields["location"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exports_lag(client):
+    """Test that the lag histogram is exposed in the Prometheus format."""
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE event_loop_lag_seconds histogram" in response.text
+    assert 'event_loop_lag_seconds_bucket{le="+Inf"}' in response.text
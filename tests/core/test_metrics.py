@@ -0,0 +1,47 @@
+"""Tests for the Prometheus text rendering of metrics."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.core.metrics import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test that bucket counts include every smaller bucket."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("lag_seconds", "Lag", (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP lag_seconds Lag",
+        "# TYPE lag_seconds histogram",
+        'lag_seconds_bucket{le="0.1"} 2',
+        'lag_seconds_bucket{le="1"} 3',
+        'lag_seconds_bucket{le="+Inf"} 4',
+        "lag_seconds_sum 2.65",
+        "lag_seconds_count 4",
+    ]
+
+
+def test_counter_labels_are_escaped():
+    """Test that label values are quoted and escaped."""
+    registry = MetricsRegistry()
+    counter = registry.counter("stalls_total", "Stalls", ("location",))
+    counter.inc('a "b"\nc')
+    counter.inc('a "b"\nc', amount=2)
+
+    assert 'stalls_total{location="a \\"b\\"\\nc"} 3' in registry.render()
+
+
+def test_metric_names_are_unique_per_kind():
+    """Test that a name can't be registered as two kinds of metric."""
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests")
+
+    assert registry.counter("requests_total", "Requests") is registry.counter(
+        "requests_total", "Requests"
+    )
+    with pytest.raises(TypeError):
+        registry.histogram("requests_total", "Requests", (1.0,))
@@ -0,0 +1,268 @@
+"""Tests for the online migration helpers and the prestart script."""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+from alembic.config import Config
+from alembic.operations import Operations
+from alembic.runtime.environment import EnvironmentContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from alembic import op
+from app.core import online_migrations
+from app.core.config import settings
+from app.core.online_migrations import (
+    backfill_in_batches,
+    create_index_concurrently,
+    drop_index_concurrently,
+    lock_timeout,
+)
+from app.models.base import Base
+from tests.scripts import load_script
+
+
+@pytest_asyncio.fixture()
+async def migration_engine(postgresql) -> AsyncIterator[AsyncEngine]:
+    """Engine on the test database, whose schema is committed."""
+    engine = create_async_engine(
+        f"postgresql+asyncpg://{postgresql.info.user}@{postgresql.info.host}:"
+        f"{postgresql.info.port}/{postgresql.info.dbname}"
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("CREATE TABLE scratch (id int PRIMARY KEY, n int)"))
+        await conn.execute(
+            text("INSERT INTO scratch SELECT i, NULL FROM generate_series(1, 10) i")
+        )
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture()
+async def connection(
+    migration_engine: AsyncEngine,
+) -> AsyncIterator[AsyncConnection]:
+    """Connection for fixtures; unlike elsewhere, the schema is committed.
+
+    The helpers commit as they go, which the usual rolled-back outer
+    transaction can't allow.
+    """
+    async with migration_engine.connect() as conn:
+        yield conn
+
+
+async def run_migration(engine: AsyncEngine, upgrade: Callable[[], Any]) -> Any:
+    """Run ``upgrade`` the way alembic/env.py runs a migration's upgrade()."""
+    config = Config()
+    config.set_main_option("script_location", "alembic")
+
+    def run(sync_conn: Connection) -> Any:
+        with EnvironmentContext(config, ScriptDirectory.from_config(config)) as env:
+            env.configure(connection=sync_conn, transaction_per_migration=True)
+            migration = env.get_context()
+            with (
+                Operations.context(migration),
+                migration.begin_transaction(_per_migration=True),
+            ):
+                return upgrade()
+
+    async with engine.connect() as conn:
+        return await conn.run_sync(run)
+
+
+def _scalar(query: str) -> Any:
+    return op.get_bind().scalar(text(query))
+
+
+async def test_lock_timeout_restores_previous_settings(migration_engine):
+    """Test that lock_timeout applies its timeouts and restores the previous ones."""
+
+    def upgrade() -> dict[str, str]:
+        op.execute("SET LOCAL lock_timeout = '1min'")
+        with lock_timeout("2s", statement_timeout="3s"):
+            inside = {
+                "lock_timeout": _scalar("SHOW lock_timeout"),
+                "statement_timeout": _scalar("SHOW statement_timeout"),
+            }
+        return {
+            **inside,
+            "lock_timeout_after": _scalar("SHOW lock_timeout"),
+            "statement_timeout_after": _scalar("SHOW statement_timeout"),
+        }
+
+    settings_seen = await run_migration(migration_engine, upgrade)
+
+    assert settings_seen == {
+        "lock_timeout": "2s",
+        "statement_timeout": "3s",
+        "lock_timeout_after": "1min",
+        "statement_timeout_after": "0",
+    }
+
+
+async def test_lock_timeout_gives_up_on_a_locked_table(migration_engine):
+    """Test that DDL queued behind a lock fails fast instead of waiting."""
+    async with migration_engine.connect() as holder:
+        await holder.execute(text("LOCK TABLE scratch IN ACCESS SHARE MODE"))
+
+        def upgrade() -> None:
+            with lock_timeout("100ms"):
+                op.add_column("scratch", sa.Column("m", sa.Integer))
+
+        with pytest.raises(Exception, match="lock timeout"):
+            await run_migration(migration_engine, upgrade)
+        await holder.rollback()
+
+
+async def _count_pending(engine: AsyncEngine) -> int:
+    async with engine.connect() as conn:
+        return int(
+            await conn.scalar(text("SELECT count(*) FROM scratch WHERE n IS NULL"))
+        )
+
+
+async def test_backfill_updates_in_batches(migration_engine):
+    """Test that a backfill updates every pending row, a batch at a time."""
+    updated = await run_migration(
+        migration_engine,
+        lambda: backfill_in_batches(
+            "scratch", "n = id * 2", "n IS NULL", batch_size=3, pause_seconds=0
+        ),
+    )
+
+    assert updated == 10
+    assert await _count_pending(migration_engine) == 0
+
+
+async def test_backfill_resumes_after_interruption(migration_engine, monkeypatch):
+    """Test that batches committed before an interruption stay done on re-run."""
+    pauses = 0
+
+    def interrupt_second_pause(seconds: float) -> None:
+        nonlocal pauses
+        pauses += 1
+        if pauses == 2:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(online_migrations.time, "sleep", interrupt_second_pause)
+
+    def upgrade() -> int:
+        return backfill_in_batches(
+            "scratch", "n = id * 2", "n IS NULL", batch_size=3, pause_seconds=0.01
+        )
+
+    with pytest.raises(KeyboardInterrupt):
+        await run_migration(migration_engine, upgrade)
+    # Two batches were committed before the second pause
+    assert await _count_pending(migration_engine) == 4
+
+    assert await run_migration(migration_engine, upgrade) == 4
+    assert await _count_pending(migration_engine) == 0
+    async with migration_engine.connect() as conn:
+        assert await conn.scalar(text("SELECT sum(n) FROM scratch")) == 110
+
+
+async def test_index_helpers_are_idempotent(migration_engine):
+    """Test that the concurrent index helpers can simply be re-run."""
+
+    def create() -> None:
+        create_index_concurrently("ix_scratch_n", "scratch", ["n"])
+
+    def drop() -> None:
+        drop_index_concurrently("ix_scratch_n", "scratch")
+
+    for _ in range(2):
+        await run_migration(migration_engine, create)
+    async with migration_engine.connect() as conn:
+        assert await conn.scalar(
+            text(
+                "SELECT indisvalid FROM pg_index "
+                "WHERE indexrelid = 'ix_scratch_n'::regclass"
+            )
+        )
+
+    for _ in range(2):
+        await run_migration(migration_engine, drop)
+    async with migration_engine.connect() as conn:
+        assert await conn.scalar(text("SELECT to_regclass('ix_scratch_n')")) is None
+
+
+@pytest.fixture()
+def prestart_seed(migration_engine: AsyncEngine, monkeypatch) -> Any:
+    """The prestart script, pointed at the test database."""
+    module = load_script("prestart_seed")
+    monkeypatch.setattr(module, "engine", migration_engine)
+    monkeypatch.setattr(
+        module,
+        "AsyncSessionLocal",
+        async_sessionmaker(migration_engine, expire_on_commit=False),
+    )
+    return module
+
+
+async def _first_user_exists(engine: AsyncEngine) -> bool:
+    async with engine.connect() as conn:
+        return bool(
+            await conn.scalar(
+                text("SELECT count(*) FROM users WHERE username = :username"),
+                {"username": settings.FIRST_USERNAME},
+            )
+        )
+
+
+async def test_prestart_at_head_skips_migrations_but_seeds(
+    prestart_seed, migration_engine, monkeypatch
+):
+    """Test that the at-head fast path skips only the migrations."""
+    async with migration_engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users"))
+        await conn.execute(
+            text("CREATE TABLE alembic_version (version_num varchar(32) PRIMARY KEY)")
+        )
+        for revision in prestart_seed.get_head_revisions():
+            await conn.execute(
+                text("INSERT INTO alembic_version VALUES (:revision)"),
+                {"revision": revision},
+            )
+
+    async def no_migrations() -> None:
+        raise AssertionError("migrations ran although the schema is at head")
+
+    monkeypatch.setattr(prestart_seed, "run_migrations", no_migrations)
+
+    assert await prestart_seed.schema_is_current()
+    await prestart_seed.seed_database(migrate=True)
+
+    assert await _first_user_exists(migration_engine)
+
+
+async def test_prestart_migrates_an_unstamped_database(
+    prestart_seed, migration_engine, monkeypatch
+):
+    """Test that a database without alembic_version is migrated, then seeded."""
+    migrated = []
+
+    async def record_migrations() -> None:
+        migrated.append(True)
+
+    monkeypatch.setattr(prestart_seed, "run_migrations", record_migrations)
+    async with migration_engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users"))
+
+    assert not await prestart_seed.schema_is_current()
+    await prestart_seed.seed_database(migrate=True)
+
+    assert migrated == [True]
+    assert await _first_user_exists(migration_engine)
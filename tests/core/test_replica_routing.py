@@ -0,0 +1,180 @@
+"""Tests for routing read-only sessions between a primary and its replicas."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from pytest_postgresql import factories
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app.core.database import SessionRouter
+
+# A second, independent Postgres instance standing in for a replica
+replica_proc = factories.postgresql_proc(port=None, unixsocketdir="/tmp")
+replica = factories.postgresql("replica_proc")
+
+
+def _engine_for(info) -> AsyncEngine:
+    return create_async_engine(
+        f"postgresql+asyncpg://{info.user}@{info.host}:{info.port}/{info.dbname}"
+    )
+
+
+@pytest_asyncio.fixture()
+async def engines(postgresql, replica):
+    primary_engine = _engine_for(postgresql.info)
+    replica_engine = _engine_for(replica.info)
+    yield primary_engine, replica_engine
+    await primary_engine.dispose()
+    await replica_engine.dispose()
+
+
+async def _served_by(router: SessionRouter) -> int:
+    """Return the port of the server that answered a read session."""
+    async with router.read_session() as session:
+        result = await session.execute(text("SELECT current_setting('port')::int"))
+        return int(result.scalar_one())
+
+
+def _router(primary: AsyncEngine, *replicas: AsyncEngine, **kwargs) -> SessionRouter:
+    return SessionRouter(
+        async_sessionmaker(primary, class_=AsyncSession),
+        replicas,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica(engines, postgresql, replica):
+    """Test that read sessions are served by the replica when it is healthy."""
+    primary_engine, replica_engine = engines
+    router = _router(primary_engine, replica_engine)
+    await router.check_lag()
+
+    assert await _served_by(router) == replica.info.port
+    assert await _served_by(router) == replica.info.port
+
+
+@pytest.mark.asyncio
+async def test_reads_round_robin_across_replicas(engines, postgresql, replica):
+    """Test that reads alternate between several replicas."""
+    primary_engine, replica_engine = engines
+    router = _router(primary_engine, replica_engine, primary_engine)
+    await router.check_lag()
+
+    ports = [await _served_by(router) for _ in range(4)]
+
+    assert ports == [
+        replica.info.port,
+        postgresql.info.port,
+        replica.info.port,
+        postgresql.info.port,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_primary_without_replicas(engines, postgresql):
+    """Test that the primary serves reads when no replicas are configured."""
+    primary_engine, _ = engines
+    router = _router(primary_engine)
+
+    assert await _served_by(router) == postgresql.info.port
+
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_primary_when_replica_lags(
+    engines, postgresql, monkeypatch
+):
+    """Test that a replica lagging beyond the threshold is skipped."""
+    primary_engine, replica_engine = engines
+    router = _router(primary_engine, replica_engine, max_lag_seconds=1.0)
+
+    async def lagging(_replica) -> float:
+        return 30.0
+
+    monkeypatch.setattr(router, "_measure_lag", lagging)
+    await router.check_lag()
+
+    assert await _served_by(router) == postgresql.info.port
+
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_primary_when_replica_unreachable(engines, postgresql):
+    """Test that an unreachable replica is treated as infinitely lagging."""
+    primary_engine, _ = engines
+    unreachable = create_async_engine("postgresql+asyncpg://nobody@127.0.0.1:1/missing")
+    router = _router(primary_engine, unreachable)
+    await router.check_lag()
+
+    assert await _served_by(router) == postgresql.info.port
+    await unreachable.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_pinned_to_primary_after_write(engines, postgresql, replica):
+    """Test read-your-writes: reads use the primary right after a write."""
+    primary_engine, replica_engine = engines
+    router = _router(primary_engine, replica_engine, read_your_writes_seconds=60)
+    await router.check_lag()
+
+    router.record_write()
+    assert await _served_by(router) == postgresql.info.port
+
+    router.read_your_writes_seconds = 0
+    assert await _served_by(router) == replica.info.port
+
+
+@pytest.mark.asyncio
+async def test_reads_never_wait_on_a_lag_probe(engines, postgresql, monkeypatch):
+    """Test that a hung probe neither stalls reads nor keeps a replica in use."""
+    primary_engine, replica_engine = engines
+    router = _router(primary_engine, replica_engine, lag_check_interval_seconds=0.1)
+    await router.check_lag()
+
+    async def hung(_replica) -> float:
+        await asyncio.sleep(3600)
+        return 0.0
+
+    monkeypatch.setattr(router, "_measure_lag", hung)
+    router.start()
+    try:
+        started = time.monotonic()
+        await _served_by(router)
+        assert time.monotonic() - started < 1.0
+
+        # The probe times out after an interval, marking the replica unusable
+        await asyncio.sleep(0.3)
+        assert await _served_by(router) == postgresql.info.port
+    finally:
+        await router.stop()
+
+
+@pytest.mark.asyncio
+async def test_replicas_are_used_once_measured_in_the_background(
+    engines, postgresql, replica
+):
+    """Test that reads use the primary until the background check finds a replica."""
+    primary_engine, replica_engine = engines
+    router = _router(primary_engine, replica_engine, lag_check_interval_seconds=0.05)
+
+    assert await _served_by(router) == postgresql.info.port
+
+    router.start()
+    try:
+        for _ in range(100):
+            if await _served_by(router) == replica.info.port:
+                break
+            await asyncio.sleep(0.05)
+        else:
+            pytest.fail("the replica was never used")
+    finally:
+        await router.stop()
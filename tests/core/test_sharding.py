@@ -0,0 +1,344 @@
+"""Tests for sharding users across several Postgres databases."""
+
+from __future__ import annotations
+
+import itertools
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from pytest_postgresql import factories
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app.core import database
+from app.core.database import ShardIdCollisionError, ShardMap, jump_hash, shard_key
+from app.core.login_events import LoginEventWriter
+from app.core.rebalance import (
+    SHARD_ID_STRIDE,
+    backfill_email_directory,
+    prepare_id_sequences,
+    rebalance_shard,
+)
+from app.core.security import get_users_by_ids
+from app.models import Base, EmailDirectoryEntry, LoginEvent, User
+
+# Two more independent Postgres instances, next to the primary
+shard_a_proc = factories.postgresql_proc(port=None, unixsocketdir="/tmp")
+shard_a = factories.postgresql("shard_a_proc")
+shard_b_proc = factories.postgresql_proc(port=None, unixsocketdir="/tmp")
+shard_b = factories.postgresql("shard_b_proc")
+
+PASSWORD = "securepassword123"
+
+
+@pytest_asyncio.fixture()
+async def shard_engines(shard_a, shard_b) -> list[AsyncEngine]:
+    """Engines for the two extra shards, with the schema in place."""
+    engines = [
+        create_async_engine(
+            f"postgresql+asyncpg://{db.info.user}@{db.info.host}:"
+            f"{db.info.port}/{db.info.dbname}"
+        )
+        for db in (shard_a, shard_b)
+    ]
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    yield engines
+    for engine in engines:
+        await engine.dispose()
+
+
+@pytest.fixture()
+def shard_sessions(
+    connection: AsyncConnection, shard_engines: list[AsyncEngine]
+) -> list[async_sessionmaker[AsyncSession]]:
+    """Session factories for every shard, the test connection being shard 0."""
+    return [
+        async_sessionmaker(bind, expire_on_commit=False)
+        for bind in (connection, *shard_engines)
+    ]
+
+
+def _use(monkeypatch, shard_map: ShardMap) -> ShardMap:
+    monkeypatch.setattr(database, "_shard_map", shard_map)
+    return shard_map
+
+
+def _usernames_on(shard_map: ShardMap, index: int, count: int) -> list[str]:
+    """Pick usernames that the shard map routes to one shard."""
+    names = (f"sharded{n}" for n in itertools.count())
+    return list(
+        itertools.islice(
+            (name for name in names if shard_map.shard_for(name) == index), count
+        )
+    )
+
+
+async def _register(client: AsyncClient, username: str, email: str | None = None):
+    return await client.post(
+        "/api/v1/register",
+        json={
+            "username": username,
+            "email": email or f"{username}@example.com",
+            "full_name": "Sharded User",
+            "password": PASSWORD,
+        },
+    )
+
+
+async def _login(client: AsyncClient, username: str) -> dict[str, str]:
+    response = await client.post(
+        "/api/v1/token", data={"username": username, "password": PASSWORD}
+    )
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _usernames_by_shard(
+    shard_sessions: list[async_sessionmaker[AsyncSession]],
+) -> list[set[str]]:
+    placement = []
+    for shard in shard_sessions:
+        async with shard() as session:
+            result = await session.scalars(select(User.username_normalized))
+            placement.append(set(result))
+    return placement
+
+
+def test_jump_hash_only_moves_keys_onto_the_added_bucket():
+    """Test that growing by one bucket moves about 1/n of the keys, all to it."""
+    keys = [shard_key(f"user{n}") for n in range(4000)]
+
+    before = [jump_hash(key, 3) for key in keys]
+    after = [jump_hash(key, 4) for key in keys]
+
+    assert set(before) == {0, 1, 2}
+    assert all(new in (old, 3) for old, new in zip(before, after, strict=True))
+    moved = sum(old != new for old, new in zip(before, after, strict=True))
+    assert 0.2 < moved / len(keys) < 0.3
+    assert {jump_hash(key, 1) for key in keys} == {0}
+    with pytest.raises(ValueError):
+        jump_hash(keys[0], 0)
+
+
+@pytest.mark.asyncio
+async def test_users_are_stored_and_found_on_their_shard(
+    client, shard_engines, shard_sessions, monkeypatch
+):
+    """Test that registration, login and lookups route by username."""
+    shard_map = _use(monkeypatch, ShardMap(shard_engines))
+    usernames = [
+        name for index in range(3) for name in _usernames_on(shard_map, index, 2)
+    ]
+
+    for username in usernames:
+        assert (await _register(client, username)).status_code == 201
+
+    placement = await _usernames_by_shard(shard_sessions)
+    for username in usernames:
+        holders = [i for i, names in enumerate(placement) if username in names]
+        assert holders == [shard_map.shard_for(username)]
+
+    headers = await _login(client, usernames[-1])
+    me = await client.get("/api/v1/users/me", headers=headers)
+    assert me.json()["username"] == usernames[-1]
+
+    # Lookups are for superusers; promote the user on its own shard
+    async with shard_sessions[shard_map.shard_for(usernames[-1])]() as session:
+        await session.execute(
+            update(User).where(User.username == usernames[-1]).values(is_superuser=True)
+        )
+        await session.commit()
+
+    response = await client.post(
+        "/api/v1/users/lookup", json={"usernames": usernames}, headers=headers
+    )
+    assert all(result["found"] for result in response.json()["results"])
+
+    # Revoking all tokens bumps the epoch on the user's own shard
+    assert (await client.post("/api/v1/logout/all", headers=headers)).status_code == 200
+    assert (await client.get("/api/v1/users/me", headers=headers)).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_emails_are_unique_across_shards(
+    client, session, shard_engines, monkeypatch
+):
+    """Test that the email directory rejects an email taken on another shard."""
+    shard_map = _use(monkeypatch, ShardMap(shard_engines))
+    first = _usernames_on(shard_map, 1, 1)[0]
+    second = _usernames_on(shard_map, 2, 1)[0]
+
+    assert (await _register(client, first, "shared@example.com")).status_code == 201
+    response = await _register(client, second, "SHARED@example.com")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    assert (await _register(client, first.upper())).json()["detail"] == (
+        "Username already registered"
+    )
+    assert (await _register(client, second)).status_code == 201
+    owners = dict(
+        (
+            await session.execute(
+                select(
+                    EmailDirectoryEntry.email_normalized,
+                    EmailDirectoryEntry.username_normalized,
+                )
+            )
+        ).all()
+    )
+    assert owners == {
+        "shared@example.com": first,
+        f"{second}@example.com": second,
+    }
+
+
+@pytest.mark.asyncio
+async def test_admin_listing_merges_shards(
+    client, shard_engines, shard_sessions, monkeypatch
+):
+    """Test keyset pagination over every shard, with ids unique across them."""
+    shard_map = _use(monkeypatch, ShardMap(shard_engines))
+    next_ids = await prepare_id_sequences(shard_sessions)
+    assert [next_id % SHARD_ID_STRIDE for next_id in next_ids] == [1, 2, 3]
+
+    usernames = [
+        name for index in range(3) for name in _usernames_on(shard_map, index, 2)
+    ]
+    for username in usernames:
+        await _register(client, username)
+    admin = usernames[-1]
+    async with shard_sessions[shard_map.shard_for(admin)]() as admin_session:
+        await admin_session.execute(
+            update(User).where(User.username == admin).values(is_superuser=True)
+        )
+        await admin_session.commit()
+    headers = await _login(client, admin)
+
+    ids, listed, cursor = [], [], None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        page = (
+            await client.get("/api/v1/admin/users", params=params, headers=headers)
+        ).json()
+        ids += [item["id"] for item in page["items"]]
+        listed += [item["username"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert page["estimated_total"] == len(usernames) + 1
+    assert ids == sorted(set(ids))
+    assert set(listed) >= set(usernames)
+
+
+@pytest.mark.asyncio
+async def test_rebalance_moves_users_onto_an_added_shard(
+    client,
+    shard_engines,
+    shard_sessions,
+    login_event_writer: LoginEventWriter,
+    monkeypatch,
+):
+    """Test growing from two shards to three while users keep logging in."""
+    await prepare_id_sequences(shard_sessions)
+    two_shards = _use(monkeypatch, ShardMap(shard_engines[:1]))
+    usernames = [
+        name for index in range(2) for name in _usernames_on(two_shards, index, 8)
+    ]
+    for username in usernames:
+        await _register(client, username)
+        await _login(client, username)
+    await login_event_writer.flush()
+
+    # Deployed with the third shard, before any user was moved
+    _use(monkeypatch, ShardMap(shard_engines, previous_count=2))
+    await _login(client, usernames[0])
+    await _login(client, usernames[-1])
+    to_move = sum(
+        [await rebalance_shard(shard_sessions, i, dry_run=True) for i in range(2)]
+    )
+    assert to_move > 0
+
+    moved = [await rebalance_shard(shard_sessions, i, batch_size=3) for i in range(3)]
+    assert sum(moved) == to_move
+    assert moved[2] == 0
+
+    three_shards = _use(monkeypatch, ShardMap(shard_engines))
+    placement = await _usernames_by_shard(shard_sessions)
+    assert placement[2] == {u for u in usernames if three_shards.shard_for(u) == 2}
+    for username in usernames:
+        index = three_shards.shard_for(username)
+        assert [username in names for names in placement].count(True) == 1
+        assert username in placement[index]
+
+        # Login events travelled with their user
+        async with shard_sessions[index]() as session:
+            events = await session.scalar(
+                select(func.count())
+                .select_from(LoginEvent)
+                .join(User, User.id == LoginEvent.user_id)
+                .where(User.username == username)
+            )
+        assert events == 1
+        await _login(client, username)
+
+    # Nothing is left to move, and rerunning is harmless
+    assert [await rebalance_shard(shard_sessions, i) for i in range(3)] == [0, 0, 0]
+
+
+@pytest.mark.asyncio
+async def test_email_directory_backfill(client, session, shard_sessions):
+    """Test that existing users' emails are recorded once, however often it runs."""
+    await _register(client, "beforesharding")
+
+    assert await backfill_email_directory(shard_sessions) == 2
+    assert await backfill_email_directory(shard_sessions) == 0
+    entries = await session.scalars(select(EmailDirectoryEntry.username_normalized))
+    assert set(entries) == {"beforesharding", "testuser"}
+
+
+@pytest.mark.asyncio
+async def test_lookup_by_id_refuses_colliding_ids(
+    client, session, shard_engines, shard_sessions, monkeypatch
+):
+    """Test that shards handing out the same ids fail loudly, not silently."""
+    shard_map = _use(monkeypatch, ShardMap(shard_engines))
+    # Without prepare_id_sequences every shard counts ids from 1
+    for index in range(1, 3):
+        (username,) = _usernames_on(shard_map, index, 1)
+        assert (await _register(client, username)).status_code == 201
+
+    with pytest.raises(ShardIdCollisionError, match="share id 1"):
+        await get_users_by_ids(session, [1])
+
+
+@pytest.mark.asyncio
+async def test_lookup_by_id_returns_a_moving_user_once(
+    client, session, shard_engines, shard_sessions, monkeypatch
+):
+    """Test that a user copied but not yet deleted by a rebalance isn't an error."""
+    await prepare_id_sequences(shard_sessions)
+    shard_map = _use(monkeypatch, ShardMap(shard_engines))
+    (username,) = _usernames_on(shard_map, 1, 1)
+    await _register(client, username)
+    async with shard_sessions[1]() as source:
+        user = await source.scalar(select(User).where(User.username == username))
+        assert user is not None
+        columns = {c.key: getattr(user, c.key) for c in User.__table__.columns}
+    async with shard_sessions[2]() as target:
+        await target.execute(insert(User).values(columns))
+        await target.commit()
+
+    users = await get_users_by_ids(session, [columns["id"]])
+
+    assert [found.username for found in users.values()] == [username]
@@ -0,0 +1,157 @@
+"""Tests for coalescing concurrent loads of the same user."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import settings
+from app.core.security import SingleFlight, get_user, get_user_loads
+
+
+def _user_selects(statements: list[str]) -> list[str]:
+    return [s for s in statements if s.startswith("SELECT") and "FROM users" in s]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_result():
+    """Test that callers arriving during a flight join it instead of calling."""
+    flights = SingleFlight[int]()
+    calls = 0
+    release = asyncio.Event()
+
+    async def load() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return 42
+
+    tasks = [asyncio.create_task(flights.do("key", load)) for _ in range(10)]
+    await asyncio.sleep(0)
+    assert flights.in_flight("key")
+
+    release.set()
+    assert await asyncio.gather(*tasks) == [42] * 10
+    assert calls == 1
+    assert not flights.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_different_keys_do_not_share_a_flight():
+    """Test that only calls for the same key are coalesced."""
+    flights = SingleFlight[str]()
+
+    async def load(value: str) -> str:
+        await asyncio.sleep(0)
+        return value
+
+    results = await asyncio.gather(
+        flights.do("a", lambda: load("a")), flights.do("b", lambda: load("b"))
+    )
+
+    assert results == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_caller():
+    """Test that a failed call raises in the leader and in every waiter."""
+    flights = SingleFlight[int]()
+    release = asyncio.Event()
+
+    async def load() -> int:
+        await release.wait()
+        raise RuntimeError("database unavailable")
+
+    tasks = [asyncio.create_task(flights.do("key", load)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert not flights.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_affect_the_flight():
+    """Test that cancelling a waiter leaves the leader and other waiters alone."""
+    flights = SingleFlight[int]()
+    release = asyncio.Event()
+
+    async def load() -> int:
+        await release.wait()
+        return 7
+
+    leader = asyncio.create_task(flights.do("key", load))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flights.do("key", load))
+    other = asyncio.create_task(flights.do("key", load))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await leader == 7
+    assert await other == 7
+    assert waiter.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_waiters_retry_when_the_leader_is_cancelled():
+    """Test that waiters start a new flight if the leader's call is cancelled."""
+    flights = SingleFlight[int]()
+    calls = 0
+    release = asyncio.Event()
+
+    async def load() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    leader = asyncio.create_task(flights.do("key", load))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(flights.do("key", load)) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert calls == 2
+    release.set()
+
+    assert leader.cancelled()
+    assert await asyncio.gather(*waiters) == [2, 2, 2]
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_user_runs_one_query(session, executed_statements):
+    """Test that parallel loads of one username issue a single query."""
+    results = await asyncio.gather(
+        *(get_user(session, settings.FIRST_USERNAME.upper()) for _ in range(20))
+    )
+
+    assert all(r is not None and r.username == settings.FIRST_USERNAME for r in results)
+    assert len(_user_selects(executed_statements)) == 1
+    assert not get_user_loads().in_flight(settings.FIRST_USERNAME.lower())
+
+
+@pytest.mark.asyncio
+async def test_parallel_requests_share_one_user_query(
+    client: AsyncClient, superuser_token_headers, executed_statements
+):
+    """Test that a burst of authenticated requests loads the user once."""
+    executed_statements.clear()
+
+    responses = await asyncio.gather(
+        *(
+            client.get("/api/v1/users/me", headers=superuser_token_headers)
+            for _ in range(20)
+        )
+    )
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len(_user_selects(executed_statements)) < len(responses)
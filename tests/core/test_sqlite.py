@@ -0,0 +1,122 @@
+"""Tests for the embedded SQLite deployment mode."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from alembic.config import Config
+from pydantic import ValidationError
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from alembic import command
+from app.core.config import Settings, settings
+from app.core.login_events import write_login_events
+from app.core.security import revoke_user_tokens
+from app.core.sqlite import create_sqlite_engines
+from app.models.user import User
+
+
+def test_sqlite_path_replaces_postgres_settings(monkeypatch):
+    """Test that SQLITE_PATH builds the URL and Postgres settings are optional."""
+    for name in ("POSTGRES_HOST", "POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD"):
+        monkeypatch.delenv(name, raising=False)
+
+    sqlite_settings = Settings(_env_file=None, SQLITE_PATH="/var/lib/app/app.db")
+
+    assert sqlite_settings.DATABASE_URL == "sqlite+aiosqlite:////var/lib/app/app.db"
+    assert sqlite_settings.is_sqlite
+    with pytest.raises(ValidationError, match="POSTGRES_HOST"):
+        Settings(_env_file=None)
+
+
+def _migrate(url: str, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    config = Config()
+    config.set_main_option("script_location", "alembic")
+    command.upgrade(config, "head")
+
+
+@pytest.fixture()
+def engines(tmp_path: Path, monkeypatch) -> tuple[AsyncEngine, AsyncEngine]:
+    """Writer and reader engines on a freshly migrated database file."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'app.db'}"
+    _migrate(url, monkeypatch)
+    return create_sqlite_engines(url, reader_pool_size=2)
+
+
+async def _add_user(writer: AsyncEngine) -> None:
+    async with AsyncSession(writer, expire_on_commit=False) as session:
+        session.add(
+            User(
+                username="Edge",
+                email="edge@example.com",
+                full_name="Edge User",
+                hashed_password="not-a-real-hash",
+                is_active=True,
+                is_superuser=False,
+            )
+        )
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_connections_are_tuned(engines):
+    """Test WAL mode, the pragmas and the single writer connection."""
+    writer, reader = engines
+    try:
+        async with writer.connect() as conn:
+            assert await conn.scalar(text("PRAGMA journal_mode")) == "wal"
+            assert await conn.scalar(text("PRAGMA synchronous")) == 1  # NORMAL
+            assert await conn.scalar(text("PRAGMA foreign_keys")) == 1
+        assert writer.pool.size() == 1
+
+        await _add_user(writer)
+        async with reader.connect() as conn:
+            assert await conn.scalar(text("SELECT count(*) FROM users")) == 1
+            with pytest.raises(OperationalError, match="readonly"):
+                await conn.execute(text("DELETE FROM users"))
+    finally:
+        await reader.dispose()
+        await writer.dispose()
+
+
+@pytest.mark.asyncio
+async def test_only_profile_changes_bump_the_version(engines):
+    """Test that the SQLite version trigger skips logins and revocations."""
+    writer, reader = engines
+    try:
+        await _add_user(writer)
+        async with AsyncSession(writer, expire_on_commit=False) as session:
+            assert await revoke_user_tokens(session, "Edge") == 1
+            await write_login_events(
+                session,
+                [
+                    {
+                        "username": "edge",
+                        "occurred_at": datetime.now(timezone.utc),
+                        "ip_address": None,
+                        "user_agent": None,
+                        "success": True,
+                    }
+                ],
+            )
+            await session.commit()
+
+        async with AsyncSession(reader) as session:
+            user = await session.scalar(select(User))
+        assert user is not None
+        assert (user.version, user.token_epoch) == (1, 1)
+        assert user.last_login_at is not None
+
+        async with AsyncSession(writer) as session:
+            await session.execute(update(User).values(full_name="Renamed"))
+            await session.commit()
+        async with AsyncSession(reader) as session:
+            assert await session.scalar(select(User.version)) == 2
+    finally:
+        await reader.dispose()
+        await writer.dispose()
@@ -0,0 +1,171 @@
+"""Tests for request tracing and span export."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import settings
+from app.core.tracing import (
+    FileSpanExporter,
+    InMemorySpanExporter,
+    Span,
+    Tracer,
+    get_tracer,
+    parse_traceparent,
+    traced,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture()
+def exporter():
+    """Enable tracing into memory for one test."""
+    tracer = get_tracer()
+    previous = (tracer.exporter, tracer.enabled, tracer.sample_rate)
+    memory = InMemorySpanExporter()
+    tracer.configure(memory)
+    yield memory
+    tracer.exporter, tracer.enabled, tracer.sample_rate = previous
+
+
+def _by_name(spans: list[Span]) -> dict[str, Span]:
+    return {span.name: span for span in spans}
+
+
+async def _login(client: AsyncClient, **headers: str):
+    return await client.post(
+        "/api/v1/token",
+        data={
+            "username": settings.FIRST_USERNAME,
+            "password": settings.FIRST_PASSWORD.get_secret_value(),
+        },
+        headers=headers,
+    )
+
+
+@pytest.mark.asyncio
+async def test_login_is_broken_down_into_spans(
+    client: AsyncClient, exporter: InMemorySpanExporter
+):
+    """Test that /token shows the lookup, bcrypt and JWT work as child spans."""
+    response = await _login(client)
+    assert response.status_code == 200
+
+    spans = _by_name(exporter.spans)
+    server = spans["POST /api/v1/token"]
+    assert server.kind == "server"
+    assert server.parent_id is None
+    assert server.attributes["http.route"] == "/api/v1/token"
+    assert server.attributes["http.response.status_code"] == 200
+
+    authenticate = spans["authenticate_user"]
+    assert authenticate.parent_id == server.span_id
+    assert spans["get_user"].parent_id == authenticate.span_id
+    assert spans["verify_password"].parent_id == authenticate.span_id
+    assert spans["jwt.encode"].parent_id == server.span_id
+    assert spans["SELECT"].kind == "client"
+    assert spans["SELECT"].attributes["db.system.name"] == "postgresql"
+    assert {span.trace_id for span in exporter.spans} == {server.trace_id}
+
+
+@pytest.mark.asyncio
+async def test_incoming_traceparent_is_continued(
+    client: AsyncClient, exporter: InMemorySpanExporter
+):
+    """Test that a caller's trace context becomes the server span's parent."""
+    response = await _login(client, traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01")
+
+    server = _by_name(exporter.spans)["POST /api/v1/token"]
+    assert server.trace_id == TRACE_ID
+    assert server.parent_id == PARENT_ID
+    assert response.headers["traceparent"] == f"00-{TRACE_ID}-{server.span_id}-01"
+
+
+@pytest.mark.asyncio
+async def test_unsampled_incoming_trace_records_nothing(
+    client: AsyncClient, exporter: InMemorySpanExporter
+):
+    """Test that the caller's sampling decision is respected downstream."""
+    await _login(client, traceparent=f"00-{TRACE_ID}-{PARENT_ID}-00")
+
+    assert exporter.spans == []
+
+
+@pytest.mark.asyncio
+async def test_current_user_dependency_is_traced(
+    client: AsyncClient, superuser_token_headers, exporter: InMemorySpanExporter
+):
+    """Test that authenticating a request shows up under the server span."""
+    await client.get("/api/v1/users/me", headers=superuser_token_headers)
+
+    spans = _by_name(exporter.spans)
+    assert spans["get_current_user"].parent_id == spans["GET /api/v1/users/me"].span_id
+    assert spans["jwt.decode"].parent_id == spans["get_current_user"].span_id
+
+
+@pytest.mark.asyncio
+async def test_disabled_tracing_records_nothing(client: AsyncClient):
+    """Test that the hooks are inert while tracing is off."""
+    assert not get_tracer().enabled
+
+    response = await _login(client)
+
+    assert response.status_code == 200
+    assert "traceparent" not in response.headers
+
+
+def test_exceptions_mark_the_span_as_failed():
+    """Test that an escaping exception is recorded on the span."""
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter, enabled=True)
+
+    with pytest.raises(ValueError), tracer.span("failing"):
+        raise ValueError("boom")
+
+    (span,) = exporter.spans
+    assert span.status == "ERROR"
+    assert span.events[0]["attributes"]["exception.type"] == "ValueError"
+
+
+def test_traced_keeps_results_and_signature():
+    """Test that the decorator is transparent to callers."""
+
+    @traced("add")
+    def add(a: int, b: int = 1) -> int:
+        return a + b
+
+    assert add(2, b=3) == 5
+    assert add.__name__ == "add"
+
+
+def test_traceparent_parsing():
+    """Test valid, unsampled and malformed traceparent headers."""
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (
+        TRACE_ID,
+        PARENT_ID,
+        True,
+    )
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00")[2] is False
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_file_exporter_writes_ndjson(tmp_path):
+    """Test that spans are appended as one JSON object per line."""
+    path = tmp_path / "traces.ndjson"
+    exporter = FileSpanExporter(str(path))
+    tracer = Tracer(exporter, enabled=True)
+
+    with tracer.span("outer"), tracer.span("inner"):
+        pass
+    tracer.shutdown()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["inner", "outer"]
+    assert lines[0]["parent_id"] == lines[1]["context"]["span_id"]
@@ -0,0 +1,243 @@
+"""Fault injection between the app and Postgres.
+
+Tests in this package run the app against its own connection pool, opened
+through a local TCP proxy in front of the pytest-postgresql server. The
+proxy can delay responses, stop responding, or reset connections, so the
+tests see what production sees when the database degrades.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import socket
+import struct
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+
+import pytest
+import pytest_asyncio
+from fastapi import Request
+from slowapi import Limiter
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+)
+
+from app.api.deps import get_session
+from app.core import database, load_shedding
+from app.core.config import settings
+from app.core.database import create_postgres_engine
+from app.core.load_shedding import LoadShedder
+from app.core.login_events import LoginEventWriter, get_login_event_writer
+from app.main import app
+from app.models.base import Base
+
+
+def _fault_client(request: Request) -> str:
+    """Rate limit every fault test client as one, under a limit never hit."""
+    return "faults"
+
+
+unlimited = Limiter(key_func=_fault_client, default_limits=["999999/minute"])
+
+
+class FaultProxy:
+    """TCP proxy that can slow down, stall or reset the connections it relays.
+
+    ``latency`` (plus up to ``jitter`` more, drawn uniformly) delays every
+    chunk the server sends back. While stalled, connections are accepted but
+    nothing is relayed in either direction, like a server that hung or a
+    network that silently drops packets. ``reset_new`` makes every new
+    connection get reset on accept, and ``reset()`` resets the live ones.
+    """
+
+    def __init__(self, target_host: str, target_port: int) -> None:
+        self.target_host = target_host
+        self.target_port = target_port
+        self.latency = 0.0
+        self.jitter = 0.0
+        self.reset_new = False
+        self._flowing = asyncio.Event()
+        self._flowing.set()
+        self._server: asyncio.Server | None = None
+        self._connections: set[asyncio.StreamWriter] = set()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    @property
+    def port(self) -> int:
+        """Port the proxy listens on."""
+        assert self._server is not None
+        return int(self._server.sockets[0].getsockname()[1])
+
+    async def start(self) -> None:
+        """Start listening on an ephemeral local port."""
+        self._server = await asyncio.start_server(self._accept, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        """Stop listening and drop every connection."""
+        self.resume()
+        if self._server is not None:
+            self._server.close()
+        self.reset()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stall(self) -> None:
+        """Stop relaying data, holding connections open."""
+        self._flowing.clear()
+
+    def resume(self) -> None:
+        """Relay data again."""
+        self._flowing.set()
+
+    def reset(self) -> None:
+        """Reset every live connection (TCP RST to both ends)."""
+        for writer in list(self._connections):
+            _abort(writer)
+        self._connections.clear()
+
+    async def _accept(
+        self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter
+    ) -> None:
+        if self.reset_new:
+            _abort(client_writer)
+            return
+        try:
+            server_reader, server_writer = await asyncio.open_connection(
+                self.target_host, self.target_port
+            )
+        except OSError:
+            _abort(client_writer)
+            return
+        self._connections.update((client_writer, server_writer))
+        pipes = [
+            asyncio.create_task(self._pipe(client_reader, server_writer, delay=False)),
+            asyncio.create_task(self._pipe(server_reader, client_writer, delay=True)),
+        ]
+        self._tasks.update(pipes)
+        try:
+            await asyncio.wait(pipes, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pipes:
+                task.cancel()
+                self._tasks.discard(task)
+            for writer in (client_writer, server_writer):
+                self._connections.discard(writer)
+                writer.close()
+
+    async def _pipe(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: bool
+    ) -> None:
+        try:
+            while data := await reader.read(65536):
+                await self._flowing.wait()
+                if delay and (self.latency or self.jitter):
+                    await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+                await self._flowing.wait()
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+
+
+def _abort(writer: asyncio.StreamWriter) -> None:
+    """Close a connection with a reset rather than a clean shutdown."""
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    writer.transport.abort()
+
+
+async def timed[T](
+    requests: Sequence[Callable[[], Awaitable[T]]], concurrency: int
+) -> list[tuple[T, float]]:
+    """Run request thunks ``concurrency`` at a time; return (result, seconds)."""
+    results: dict[int, tuple[T, float]] = {}
+    pending = iter(enumerate(requests))
+
+    async def worker() -> None:
+        for index, request in pending:
+            started = time.perf_counter()
+            result = await request()
+            results[index] = (result, time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return [results[index] for index in range(len(requests))]
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of some samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+@pytest_asyncio.fixture()
+async def fault_proxy(postgresql) -> AsyncIterator[FaultProxy]:
+    """A fault-injecting proxy in front of the test database."""
+    proxy = FaultProxy(postgresql.info.host, postgresql.info.port)
+    await proxy.start()
+    yield proxy
+    await proxy.stop()
+
+
+@pytest_asyncio.fixture()
+async def faulty_engine(
+    postgresql, fault_proxy: FaultProxy, monkeypatch
+) -> AsyncIterator[AsyncEngine]:
+    """The app's kind of engine, connected through the proxy, with short timeouts."""
+    monkeypatch.setattr(settings, "DATABASE_CONNECT_TIMEOUT_SECONDS", 1.0)
+    monkeypatch.setattr(settings, "DATABASE_COMMAND_TIMEOUT_SECONDS", 1.0)
+    engine = create_postgres_engine(
+        f"postgresql+asyncpg://{postgresql.info.user}@127.0.0.1:"
+        f"{fault_proxy.port}/{postgresql.info.dbname}",
+        pool_size=5,
+        max_overflow=5,
+        pool_timeout=2.0,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture()
+async def connection(faulty_engine: AsyncEngine) -> AsyncIterator[AsyncConnection]:
+    """Connection for fixtures; unlike elsewhere, the schema is committed."""
+    async with faulty_engine.connect() as conn:
+        yield conn
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def override_dependency(
+    session: AsyncSession,  # noqa: ARG001 - seeds the test user
+    faulty_engine: AsyncEngine,
+    login_event_writer: LoginEventWriter,
+    monkeypatch,
+) -> None:
+    """Route the app's own get_session through the proxy."""
+    monkeypatch.setattr(
+        load_shedding, "_load_shedder", LoadShedder(prefix=settings.V1_STR)
+    )
+    monkeypatch.setattr(app.state, "limiter", unlimited)
+    monkeypatch.setattr(
+        database,
+        "AsyncSessionLocal",
+        async_sessionmaker(faulty_engine, expire_on_commit=False),
+    )
+    monkeypatch.delitem(app.dependency_overrides, get_session, raising=False)
+    monkeypatch.setitem(
+        app.dependency_overrides, get_login_event_writer, lambda: login_event_writer
+    )
+
+
+@pytest.fixture()
+def user_credentials() -> dict[str, str]:
+    """Form data logging in as the seeded test user."""
+    return {
+        "username": settings.FIRST_USERNAME,
+        "password": settings.FIRST_PASSWORD.get_secret_value(),
+    }
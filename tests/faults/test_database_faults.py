@@ -0,0 +1,181 @@
+"""Scenario tests: how the API behaves when Postgres degrades."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.exc import IntegrityError
+
+from app.api import deps
+from tests.faults.conftest import FaultProxy, percentile, timed
+
+
+async def _login(client: AsyncClient, credentials: dict[str, str]) -> dict[str, str]:
+    response = await client.post("/api/v1/token", data=credentials)
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_health_fails_fast_while_the_database_stalls(
+    client: AsyncClient, fault_proxy: FaultProxy
+):
+    """Test that readiness flips to 503 within its timeout, then recovers."""
+    assert (await client.get("/health")).status_code == 204
+
+    fault_proxy.stall()
+    started = time.perf_counter()
+    response = await client.get("/health")
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 503
+    # 1s probe timeout, plus up to the 1s command timeout asyncpg spends
+    # trying to cancel the query on the silent server
+    assert elapsed < 2.5
+
+    fault_proxy.resume()
+    fault_proxy.reset()  # the stalled connection is beyond saving
+    assert (await client.get("/health")).status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_health_reports_refused_connections(
+    client: AsyncClient, fault_proxy: FaultProxy
+):
+    """Test that readiness is 503, not 500, when connections are reset."""
+    fault_proxy.reset_new = True
+    fault_proxy.reset()
+
+    assert (await client.get("/health")).status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_login_times_out_when_the_database_stops_responding(
+    client: AsyncClient, fault_proxy: FaultProxy, user_credentials
+):
+    """Test that /token gives up after the command timeout with a 503."""
+    fault_proxy.stall()
+    started = time.perf_counter()
+    response = await client.post("/api/v1/token", data=user_credentials)
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    # Command timeout is 1s in these tests; the request must not hang
+    assert elapsed < 2.5
+
+
+@pytest.mark.asyncio
+async def test_reset_connections_fail_once_then_reconnect(
+    client: AsyncClient, fault_proxy: FaultProxy, user_credentials
+):
+    """Test that a dropped pool connection costs one 503, not a stuck pool."""
+    headers = await _login(client, user_credentials)
+    assert (await client.get("/api/v1/users/me", headers=headers)).status_code == 200
+
+    fault_proxy.reset()
+    statuses = [
+        (await client.get("/api/v1/users/me", headers=headers)).status_code
+        for _ in range(3)
+    ]
+
+    assert set(statuses) <= {200, 503}
+    assert statuses[-1] == 200
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_unavailable_while_connections_are_refused(
+    client: AsyncClient, fault_proxy: FaultProxy, user_credentials
+):
+    """Test that get_current_user maps an unreachable database to 503."""
+    headers = await _login(client, user_credentials)
+    fault_proxy.reset_new = True
+    fault_proxy.reset()
+
+    response = await client.get("/api/v1/users/me", headers=headers)
+
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Database unavailable, please retry later"}
+
+
+@pytest.mark.asyncio
+async def test_slow_database_sheds_load_and_bounds_tail_latency(
+    client: AsyncClient, fault_proxy: FaultProxy, user_credentials
+):
+    """Test that a slow database makes the API shed load instead of queueing."""
+    headers = await _login(client, user_credentials)
+    fault_proxy.latency = 0.2
+    fault_proxy.jitter = 0.1
+
+    results = await timed(
+        [lambda: client.get("/api/v1/users/me", headers=headers)] * 200,
+        concurrency=100,
+    )
+    statuses = [response.status_code for response, _ in results]
+    served = [seconds for response, seconds in results if response.status_code == 200]
+    shed = [response for response, _ in results if response.status_code == 503]
+
+    assert set(statuses) <= {200, 503}
+    assert served, "some requests must still be served"
+    assert shed, "overload must be shed, not queued"
+    assert all(response.headers["Retry-After"] == "1" for response in shed)
+    # Shed requests leave quickly; served ones wait at most a few round trips
+    p99 = percentile([seconds for _, seconds in results], 0.99)
+    assert p99 < 5.0, f"p99 {p99:.2f}s"
+
+
+@pytest.mark.asyncio
+async def test_jitter_shows_up_in_the_tail(
+    client: AsyncClient, fault_proxy: FaultProxy, user_credentials
+):
+    """Test the latency distribution of serial requests over a jittery link."""
+    headers = await _login(client, user_credentials)
+    fault_proxy.latency = 0.01
+    fault_proxy.jitter = 0.05
+
+    results = await timed(
+        [lambda: client.get("/api/v1/users/me", headers=headers)] * 30,
+        concurrency=1,
+    )
+    latencies = [seconds for _, seconds in results]
+
+    assert percentile(latencies, 0.5) >= 0.01
+    assert percentile(latencies, 0.99) > percentile(latencies, 0.5)
+    assert percentile(latencies, 0.99) < 1.0
+
+
+@pytest.mark.asyncio
+async def test_rejected_queries_are_errors_not_outages(
+    client: AsyncClient, user_credentials, monkeypatch, caplog
+):
+    """Test that a database rejecting a query is a logged 500, not a 503."""
+    headers = await _login(client, user_credentials)
+
+    async def reject(*args, **kwargs):
+        raise IntegrityError("INSERT INTO users ...", {}, Exception("duplicate key"))
+
+    monkeypatch.setattr(deps, "get_user", reject)
+    response = await client.get("/api/v1/users/me", headers=headers)
+
+    assert response.status_code == 500
+    assert "Retry-After" not in response.headers
+    assert "Unhandled database error: IntegrityError" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_unrelated_os_errors_are_not_outages(
+    client: AsyncClient, user_credentials, monkeypatch
+):
+    """Test that file I/O failures aren't passed off as an unavailable database."""
+    headers = await _login(client, user_credentials)
+
+    async def fail(*args, **kwargs):
+        raise PermissionError("revocation table is not writable")
+
+    monkeypatch.setattr(deps, "get_user", fail)
+
+    # Unhandled, so the test transport re-raises what the server answers 500 to
+    with pytest.raises(PermissionError):
+        await client.get("/api/v1/users/me", headers=headers)
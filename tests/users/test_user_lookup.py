@@ -0,0 +1,122 @@
+"""Tests for the batched user lookup endpoint."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user import User
+
+
+@pytest.mark.asyncio
+async def test_lookup_requires_authentication(client):
+    """Test that user lookups require a valid token."""
+    response = await client.post("/api/v1/users/lookup", json={"usernames": ["x"]})
+
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_lookup_requires_superuser(client, superuser_token_headers):
+    """Test that ordinary users can't harvest other users' emails and names."""
+    response = await client.post(
+        "/api/v1/users/lookup",
+        json={"usernames": [settings.FIRST_USERNAME]},
+        headers=superuser_token_headers,
+    )
+
+    assert response.status_code == 403
+    assert "email" not in response.text
+
+
+@pytest.mark.asyncio
+async def test_lookup_by_username_preserves_order_and_reports_misses(
+    client, admin_token_headers
+):
+    """Test that results follow the request order with explicit misses."""
+    await client.post(
+        "/api/v1/register",
+        json={
+            "username": "lookupuser",
+            "email": "lookup@example.com",
+            "full_name": "Lookup User",
+            "password": "securepassword123",
+        },
+    )
+
+    response = await client.post(
+        "/api/v1/users/lookup",
+        json={"usernames": ["lookupuser", "ghost", settings.FIRST_USERNAME]},
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["key"] for result in results] == [
+        "lookupuser",
+        "ghost",
+        settings.FIRST_USERNAME,
+    ]
+    assert [result["found"] for result in results] == [True, False, True]
+    assert results[0]["user"]["email"] == "lookup@example.com"
+    assert results[1]["user"] is None
+    assert "hashed_password" not in results[2]["user"]
+
+
+@pytest.mark.asyncio
+async def test_lookup_by_id(client, admin_token_headers, session: AsyncSession):
+    """Test that users can be looked up by primary key."""
+    user_id = await session.scalar(
+        select(User.id).where(User.username == settings.FIRST_USERNAME)
+    )
+
+    response = await client.post(
+        "/api/v1/users/lookup",
+        json={"ids": [999999, user_id]},
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0] == {"key": 999999, "found": False, "user": None}
+    assert results[1]["found"] is True
+    assert results[1]["user"]["username"] == settings.FIRST_USERNAME
+
+
+@pytest.mark.asyncio
+async def test_lookup_uses_a_single_query(
+    client, admin_token_headers, executed_statements
+):
+    """Test that a whole batch is fetched with one IN query."""
+    executed_statements.clear()
+    response = await client.post(
+        "/api/v1/users/lookup",
+        json={"usernames": [f"user{index}" for index in range(50)]},
+        headers=admin_token_headers,
+    )
+
+    assert response.status_code == 200
+    user_queries = [s for s in executed_statements if "FROM users" in s]
+    # One query authenticates the caller, one resolves the whole batch
+    assert len(user_queries) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "body",
+    [
+        {},
+        {"usernames": ["a"], "ids": [1]},
+        {"usernames": []},
+        {"ids": list(range(101))},
+    ],
+)
+async def test_lookup_rejects_invalid_requests(client, admin_token_headers, body):
+    """Test that requests need exactly one non-empty key list within the limit."""
+    response = await client.post(
+        "/api/v1/users/lookup", json=body, headers=admin_token_headers
+    )
+
+    assert response.status_code == 422